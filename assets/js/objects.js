@@ -567,6 +567,10 @@ class Favourite extends HTMLElement {
             color: var(--accent-color);
         }
 
+        #name.error {
+            color: #f7523f;
+        }
+
         #head {
             display: flex;
         }
@@ -681,9 +685,15 @@ class Favourite extends HTMLElement {
     }
       
     connectedCallback() {
-        let getting = $.get("/search/{}".format(this.ticker))
-            .fail(function (jqXHR, textStatus) {
+        if ( this.ticker ) {
+            FavouritesStream.request(this);
+        }
+    }
 
+    search() {
+        let getting = $.get("/search/{}".format(this.ticker))
+            .fail((jqXHR, textStatus) => {
+                this.error((jqXHR.responseJSON && jqXHR.responseJSON.error) || textStatus);
             })
             .done((json_data, statusText, xhr) => {
                 this.data(json_data);
@@ -693,6 +703,20 @@ class Favourite extends HTMLElement {
             });
     }
 
+    show(json_data, code) {
+        if ( code < 400 ) {
+            this.data(json_data);
+        } else {
+            this.error((json_data && json_data.error) || `Error ${code}`);
+        }
+        this.unload();
+    }
+
+    error(message) {
+        this.name.textContent = `We had some error: ${message}`;
+        this.name.classList.add("error");
+    }
+
     data(json_data) {
         this.sticker_price.innerHTML += `: ${Value.check_value(json_data.sticker_price.value)}`;
         this.name.innerHTML = `${json_data.shortName}`;
@@ -728,4 +752,77 @@ class Favourite extends HTMLElement {
 
 }
 
-customElements.define("favourite-ticker-display", Favourite);
\ No newline at end of file
+customElements.define("favourite-ticker-display", Favourite);
+
+class FavouritesStream {
+    // Cards connected in the same tick share one streamed request, every card is filled as soon as its ticker arrives
+    static cards = new Map();
+    static scheduled = false;
+
+    static request(card) {
+        if ( !FavouritesStream.cards.has(card.ticker) ) {
+            FavouritesStream.cards.set(card.ticker, []);
+        }
+        FavouritesStream.cards.get(card.ticker).push(card);
+        if ( !FavouritesStream.scheduled ) {
+            FavouritesStream.scheduled = true;
+            setTimeout(() => FavouritesStream.open(), 0);
+        }
+    }
+
+    static async open() {
+        const cards = FavouritesStream.cards;
+        FavouritesStream.cards = new Map();
+        FavouritesStream.scheduled = false;
+
+        if ( window.fetch && window.ReadableStream && window.TextDecoder ) {
+            try {
+                await FavouritesStream.read(cards);
+            } catch (error) {
+                console.error(error);
+            }
+        }
+        // Whatever did not arrive through stream is searched for separately
+        for ( const waiting of cards.values() ) {
+            for ( const card of waiting ) {
+                card.search();
+            }
+        }
+    }
+
+    static async read(cards) {
+        const query = [...cards.keys()].map((ticker) => `ticker=${encodeURIComponent(ticker)}`).join("&");
+        const response = await fetch(`/favourites/stream?${query}`, { headers: { "Accept": "application/x-ndjson" } });
+        if ( !response.ok || !response.body ) {
+            throw new Error(`Favourites stream failed with ${response.status}`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while ( true ) {
+            const { value, done } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = buffer.split("\n");
+            buffer = lines.pop();
+            for ( const line of lines ) {
+                if ( line.trim() ) {
+                    FavouritesStream.deliver(cards, JSON.parse(line));
+                }
+            }
+            if ( done ) {
+                break;
+            }
+        }
+        if ( buffer.trim() ) {
+            FavouritesStream.deliver(cards, JSON.parse(buffer));
+        }
+    }
+
+    static deliver(cards, item) {
+        const waiting = cards.get(item.ticker) || [];
+        cards.delete(item.ticker);
+        for ( const card of waiting ) {
+            card.show(item.data, item.code);
+        }
+    }
+}
\ No newline at end of file
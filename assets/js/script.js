@@ -276,6 +276,27 @@ $(document).ready(function() {
         } 
     });
 
+    let suggest_timeout = null;
+    document.querySelector("#symbol-input").addEventListener("input", (event) => {
+        clearTimeout(suggest_timeout);
+        const prefix = event.target.value.trim();
+        const datalist = document.querySelector("#symbol-suggestions");
+        if (!prefix) {
+            datalist.replaceChildren();
+            return;
+        }
+        suggest_timeout = setTimeout(() => {
+            $.get(`/suggest/${encodeURIComponent(prefix)}`, (json_data) => {
+                datalist.replaceChildren(...json_data.suggestions.map((suggestion) => {
+                    const option = document.createElement("option");
+                    option.value = suggestion.symbol;
+                    option.label = suggestion.name;
+                    return option;
+                }));
+            });
+        }, 150);
+    });
+
     const order = ["dark", "light", "system"] 
     const schemes = {"dark": "moon-outline", "light": "sunny-outline", "system": "desktop-outline"};
 
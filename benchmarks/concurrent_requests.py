@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Compare throughput of concurrent requests: new event loop per request versus shared loop thread.
+
+Upstream are four local stub hosts with fixed latency, so results do not depend on network.
+Every simulated request does fan-out of one GET to each of them, same as C{source.ticker()}.
+
+Usage: python benchmarks/concurrent_requests.py [--requests 400] [--threads 64] [--latency 0.05]
+                                               [--limit-per-host 30]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from aiohttp import web
+
+import flaskr.source as source
+import flaskr.source.elements as elements
+import flaskr.runner as runner
+
+HOST = "127.0.0.1"
+PORTS = (8797, 8798, 8799, 8800)
+
+
+async def _start_stub(latency: float) -> web.AppRunner:
+	"""
+	Start stub upstream hosts answering after given latency
+
+	@param latency: Seconds before each response
+	@return: Runner of stub, to clean it up afterwards
+	"""
+	async def handler(request: web.Request) -> web.Response:
+		await asyncio.sleep(latency)
+		return web.json_response({"symbol": request.match_info["symbol"]})
+
+	app = web.Application()
+	app.router.add_get("/{symbol}", handler)
+	stub = web.AppRunner(app)
+	await stub.setup()
+	for port in PORTS:
+		await web.TCPSite(stub, HOST, port).start()
+	return stub
+
+
+async def _fan_out(symbol: str) -> list:
+	"""
+	Four concurrent GETs through pooled session, like single ticker lookup
+
+	@param symbol: Symbol to ask for
+	@return: Decoded responses
+	"""
+	src = elements.Source(symbol)
+	responses = await asyncio.gather(*[src._get(f"http://{HOST}:{port}/{symbol}") for port in PORTS])
+	return [await response.json() for response in responses]
+
+
+def _new_loop_per_request(symbol: str) -> list:
+	"""
+	Request handling as it was done before: new loop, run, close
+	"""
+	loop = asyncio.new_event_loop()
+	result = loop.run_until_complete(_fan_out(symbol))
+	loop.run_until_complete(source.close())
+	loop.close()
+	return result
+
+
+def _shared_loop(symbol: str) -> list:
+	"""
+	Request handling with shared loop thread
+	"""
+	return runner.run(_fan_out(symbol))
+
+
+def _measure(handler, requests: int, threads: int) -> float:
+	"""
+	Run requests with given handler in pool of threads
+
+	@return: Requests per second
+	"""
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		list(executor.map(handler, [f"T{i % 50}" for i in range(requests)]))
+	return requests / (time.perf_counter() - start)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=400)
+	parser.add_argument("--threads", type=int, default=64)
+	parser.add_argument("--latency", type=float, default=0.05)
+	parser.add_argument("--limit-per-host", type=int, default=elements.Source.pool.limit_per_host)
+	args = parser.parse_args()
+	elements.Source.pool.limit_per_host = args.limit_per_host
+
+	stub_thread = runner.LoopThread(name="stub-upstream")
+	stub = stub_thread.run(_start_stub(args.latency))
+	try:
+		_shared_loop("WARM")
+		before = _measure(_new_loop_per_request, args.requests, args.threads)
+		after = _measure(_shared_loop, args.requests, args.threads)
+	finally:
+		stub_thread.run(stub.cleanup())
+		stub_thread.stop()
+		runner.loop_thread.stop()
+
+	print(f"{args.requests} requests, {args.threads} threads, {args.latency * 1000:.0f} ms upstream latency, "
+	      f"{args.limit_per_host} connections per host")
+	print(f"new loop per request: {before:8.1f} req/s")
+	print(f"shared loop thread:   {after:8.1f} req/s  ({after / before:.2f}x)")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Memory per ticker of assembled results, as kept by result cache or batch screening.
+
+Results are filled as real ones, with histories, trends and profile. Measured are results alone,
+results with their cached dictionary (as in result cache, once served), and the same results packed
+in struct-of-arrays C{ResultTable}. Strings of profile are shared with source payload in the app, so
+they are counted once and reported separately.
+
+Usage: python benchmarks/memory.py [--tickers 10000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from flaskr.source.elements import Property, Result, Trend
+from flaskr.source.sources.YahooQuoteSummary import Profile
+from flaskr.source.table import ResultTable
+
+_SUMMARY = "Company designs, manufactures, and markets products and services worldwide. " * 10
+_OFFICERS = [{"name": f"Officer {i}", "title": "Officer", "age": 50 + i} for i in range(5)]
+
+
+def _result(i: int) -> Result:
+	"""
+	@return: Result of i-th ticker
+	"""
+	result = Result()
+	result.ticker = f"T{i}"
+	result.name = result.shortName = f"Company {i}"
+	result.industry = "Consumer Electronics"
+	result.address = f"United States City - Street {i}"
+	result.profile = Profile()
+	result.profile.fill(["address1", "city", "country", "industryDisp", "sector", "longBusinessSummary",
+	                     "fullTimeEmployees", "companyOfficers"], {
+		"address1": f"Street {i}", "city": "City", "country": "United States", "industryDisp": "Consumer Electronics",
+		"sector": "Technology", "longBusinessSummary": _SUMMARY, "fullTimeEmployees": 1000 + i,
+		"companyOfficers": _OFFICERS})
+	for n, name in enumerate(("roic", "equity", "eps", "sales", "cash")):
+		setattr(result, name, [Property(round(i % 97 * 0.37 + n + year, 2)) for year in range(4)])
+		setattr(result, f"{name}_trend", Trend(round(i % 13 * 0.11, 2), 0.9))
+	for n, name in enumerate(("total_debt", "free_cash_flow", "debt_payoff_time", "debt_equity_ratio",
+	                          "margin_of_safety_price", "current_price", "sticker_price", "average_volume")):
+		getattr(result, name).value = round(i * 1.01 + n, 2)
+	result.payback_time.value = i % 20
+	result.sources = {name: {"status": "ok", "code": None, "reason": None, "elapsed_ms": i % 300}
+	                  for name in ("MSNMoney", "StockRow", "YahooAnalysis", "YahooQuoteSummary")}
+	result.colour()
+	return result
+
+
+def _measure(build) -> int:
+	"""
+	@return: Bytes allocated by objects built, and still alive
+	"""
+	gc.collect()
+	tracemalloc.start()
+	start = tracemalloc.get_traced_memory()[0]
+	kept = build()
+	gc.collect()
+	size = tracemalloc.get_traced_memory()[0] - start
+	tracemalloc.stop()
+	del kept
+	return size
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--tickers", type=int, default=10000)
+	args = parser.parse_args()
+	n = args.tickers
+
+	def results():
+		return [_result(i) for i in range(n)]
+
+	def served():
+		kept = results()
+		for result in kept:
+			result.to_dict()
+		return kept
+
+	def table():
+		packed = ResultTable()
+		for i in range(n):
+			packed.append(_result(i))
+		return packed
+
+	print(f"{n} tickers, bytes per ticker")
+	print(f"Result objects:            {_measure(results) / n:8.0f}")
+	print(f"Result objects, served:    {_measure(served) / n:8.0f}")
+	print(f"ResultTable:               {_measure(table) / n:8.0f}")
+
+
+if __name__ == '__main__':
+	main()
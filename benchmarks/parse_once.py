@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+CPU time of parsing one ticker's quoteSummary and KeyRatios payloads, with and without parse-once handling.
+
+Payloads are synthetic but of realistic size, and are served as stored responses, so no network is used.
+"Decode every access" repeats what sources did before: decoding response again on every access.
+
+Usage: python benchmarks/parse_once.py [--rounds 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+import flaskr.source.elements as elements
+from flaskr.source.store import StoredResponse
+from flaskr.source.sources import MSNMoney, YahooQuoteSummary
+
+
+def _quote_summary_body() -> bytes:
+	"""
+	@return: quoteSummary body with profile, statements and key statistics
+	"""
+	statement = {key: {"raw": 1000 + i, "fmt": f"{1000 + i}", "longFmt": f"1,00{i}"} for i, key in enumerate(
+		["netIncome", "cash", "longTermDebt", "totalStockholderEquity", "totalRevenue", "grossProfit",
+		 "operatingIncome", "totalAssets", "totalLiab", "inventory", "netReceivables", "shortTermInvestments"])}
+	officer = {"name": "Officer", "title": "Title", "totalPay": {"raw": 1, "fmt": "1", "longFmt": "1"},
+	           "exercisedValue": {"raw": 0, "fmt": None, "longFmt": "0"}}
+	result = {
+		"assetProfile": {"country": "United States", "city": "City", "address1": "Street", "fullTimeEmployees": 1000,
+		                 "longBusinessSummary": "Summary " * 400, "companyOfficers": [officer] * 10},
+		"incomeStatementHistory": {"incomeStatementHistory": [statement] * 4},
+		"balanceSheetHistory": {"balanceSheetStatements": [statement] * 4},
+		"financialData": {"currentPrice": {"raw": 100.0}, "totalDebt": {"raw": 10}, "debtToEquity": {"raw": 1.5}},
+		"earnings": {"financialsChart": {"yearly": [{"date": 2000 + i, "revenue": {"raw": i}} for i in range(4)],
+		                                 "quarterly": [{"date": f"{i}Q", "revenue": {"raw": i}} for i in range(4)]}},
+		"defaultKeyStatistics": {key: {"raw": 1.0, "fmt": "1.0"} for key in [f"statistic{i}" for i in range(60)]
+		                         + ["trailingEps"]},
+	}
+	return json.dumps({"quoteSummary": {"result": [result], "error": None}}).encode()
+
+
+def _key_ratios_body() -> bytes:
+	"""
+	@return: KeyRatios body with 40 periods of metrics
+	"""
+	metrics = [{"fiscalPeriodType": "Annual" if i % 5 == 0 else "Q1", "priceToEarningsRatio": 10.0 + i,
+	            **{f"metric{j}": float(j) for j in range(40)}} for i in range(40)]
+	return json.dumps({"companyMetrics": metrics, "displayName": "Company", "industry": "Industry",
+	                   "market": "Market", "shortName": "Company", "symbol": "SYM"}).encode()
+
+
+class _DecodeEveryAccess:
+	"""
+	Mixin decoding response again on every access, as sources did before
+	"""
+	async def payload(self):
+		return json.loads(await self.response.read())
+
+
+class _QuoteSummaryBefore(_DecodeEveryAccess, YahooQuoteSummary):
+	pass
+
+
+class _MSNMoneyBefore(_DecodeEveryAccess, MSNMoney):
+	pass
+
+
+async def _parse(quote_summary_class, msn_money_class, quote_summary_body: bytes, key_ratios_body: bytes) -> None:
+	"""
+	Run fetch of both sources on stored responses
+	"""
+	async def serve(body):
+		return StoredResponse("stored", 200, "OK", body, 0.0)
+
+	quote_summary = quote_summary_class("SYM", ["assetProfile", "incomeStatementHistory", "balanceSheetHistory",
+	                                            "financialData", "earnings", "defaultKeyStatistics"])
+	quote_summary._get = lambda url: serve(quote_summary_body)
+	await quote_summary.fetch()
+
+	msn_money = msn_money_class("SYM")
+	msn_money._MSNMoney__id = "id"
+	msn_money._get = lambda url: serve(key_ratios_body)
+	await msn_money.fetch()
+
+
+def _measure(quote_summary_class, msn_money_class, rounds: int) -> float:
+	"""
+	@return: CPU milliseconds per ticker
+	"""
+	quote_summary_body, key_ratios_body = _quote_summary_body(), _key_ratios_body()
+	loop = asyncio.new_event_loop()
+	start = time.process_time()
+	for _ in range(rounds):
+		loop.run_until_complete(_parse(quote_summary_class, msn_money_class, quote_summary_body, key_ratios_body))
+	elapsed = time.process_time() - start
+	loop.close()
+	return elapsed / rounds * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--rounds", type=int, default=200)
+	args = parser.parse_args()
+
+	before = _measure(_QuoteSummaryBefore, _MSNMoneyBefore, args.rounds)
+	after = _measure(YahooQuoteSummary, MSNMoney, args.rounds)
+	backend = "orjson" if elements.loads is not json.loads else "json"
+	print(f"payloads: quoteSummary {len(_quote_summary_body()) / 1024:.0f} KiB, "
+	      f"KeyRatios {len(_key_ratios_body()) / 1024:.0f} KiB")
+	print(f"decode every access (json): {before:7.3f} ms CPU per ticker")
+	print(f"parse once ({backend}):{' ' * (15 - len(backend))}{after:7.3f} ms CPU per ticker  ({before / after:.2f}x)")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Throughput of preview rendering: previews per second, and per second of CPU (per core).
+
+Distinct previews are rendered one by one on calling thread, and then all at once through render pool,
+the way preview route renders them. Served are also previews already in cache. Previews are of few
+tickers, with colors changing between them, as after changes of price, so names repeat as they do in
+traffic of crawlers. Every size variant is rendered too.
+
+Usage: python benchmarks/previews.py [--previews 200] [--tickers 50] [--workers N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+import flaskr.preview as preview
+from flaskr.preview.cache import PreviewCache
+from flaskr.preview.pool import RenderPool
+
+_COLORS = ("#89e051", "#f7523f", "#701516", "#f1e05a", "grey", None)
+
+
+def _data(i: int, tickers: int) -> dict:
+	"""
+	@return: Data of i-th preview, as search returns it
+	"""
+	history = [{"color": _COLORS[(i + n) % len(_COLORS)], "value": n} for n in range(4)]
+	return {
+		"shortName": f"Company {i % tickers}", "industry": ("Consumer Electronics", "Semiconductors", "Banks")[i % 3],
+		"profile": {"country": "United States", "fullTimeEmployees": 1000 + i % tickers,
+		            "companyOfficers": [{"name": "Tim"}]},
+		"roic": history, "equity": history, "eps": history, "sales": history, "cash": history,
+		**{name: {"color": _COLORS[i % len(_COLORS)], "value": i} for name in
+		   ("debt_payoff_time", "debt_equity_ratio", "current_price", "payback_time", "average_volume")},
+	}
+
+
+def _report(name: str, count: int, wall: float, cpu: float) -> None:
+	print(f"{name:22} {count / wall:8.1f} previews/s  {count / cpu:8.1f} previews/CPU-s")
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--previews", type=int, default=200)
+	parser.add_argument("--tickers", type=int, default=50)
+	parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+	args = parser.parse_args()
+
+	data = [(f"T{i % args.tickers}", _data(i, args.tickers)) for i in range(args.previews)]
+	renders = [(lambda symbol=symbol, values=values: preview.ticker(symbol, values).getvalue())
+	           for symbol, values in data]
+	print(f"{args.previews} previews of {args.tickers} tickers, {args.workers} workers, {os.cpu_count()} CPUs")
+
+	wall, cpu = time.perf_counter(), time.process_time()
+	for render in renders:
+		render()
+	_report("serial", args.previews, time.perf_counter() - wall, time.process_time() - cpu)
+
+	preview.render_pool = RenderPool(args.workers, queue=args.previews)
+	preview.image_cache = PreviewCache(max_entries=args.previews, directory=None)
+	keys = [preview.key(symbol, values) for symbol, values in data]
+
+	async def all_previews():
+		return await asyncio.gather(*(preview.cached(key, render) for key, render in zip(keys, renders)))
+
+	wall, cpu = time.perf_counter(), time.process_time()
+	asyncio.run(all_previews())
+	_report("render pool", args.previews, time.perf_counter() - wall, time.process_time() - cpu)
+
+	wall, cpu = time.perf_counter(), time.process_time()
+	for _ in range(10):
+		asyncio.run(all_previews())
+	_report("cached", args.previews * 10, time.perf_counter() - wall, time.process_time() - cpu)
+
+	for size in preview.SIZES:
+		wall, cpu = time.perf_counter(), time.process_time()
+		for symbol, values in data:
+			preview.ticker(symbol, values, size)
+		_report(f"serial, {size}", args.previews, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Time of Rule #1 calculations over many tickers, scalar functions in a loop against their batch variants.
+
+Every ticker gets margin of safety and sticker price, growth rate of equity, and roic. Inputs are random,
+with some missing and zero values, so special cases are exercised too.
+
+Usage: python benchmarks/rule_one_batch.py [--tickers 10000] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+import flaskr.source.RuleOneCalcs as RuleOne
+
+
+def _inputs(tickers: int) -> dict[str, np.ndarray]:
+	"""
+	@return: Random inputs by name, about 5% of them missing or zero
+	"""
+	rng = np.random.default_rng(0)
+
+	def values(low, high):
+		array = rng.uniform(low, high, tickers).round(2)
+		special = rng.random(tickers)
+		array[special < 0.025] = np.nan
+		array[(special >= 0.025) & (special < 0.05)] = 0
+		return array
+
+	return {
+		"eps": values(-5, 20), "growth": values(-0.2, 0.5), "low_pe": values(5, 40), "high_pe": values(10, 80),
+		"equity_start": values(-100, 1000), "equity_end": values(-100, 1000),
+		"income": values(-100, 500), "cash": values(1, 300), "debt": values(1, 5000), "equity": values(200, 900),
+	}
+
+
+def _scalar(inputs: dict[str, list]) -> None:
+	for i in range(len(inputs["eps"])):
+		RuleOne.margin_of_safety_price(inputs["eps"][i], inputs["growth"][i], inputs["low_pe"][i], inputs["high_pe"][i])
+		RuleOne.compound_annual_growth_rate(inputs["equity_start"][i], inputs["equity_end"][i], 5)
+		RuleOne.calculate_roic(inputs["income"][i], inputs["cash"][i], inputs["debt"][i], inputs["equity"][i])
+
+
+def _batch(inputs: dict[str, np.ndarray]) -> None:
+	RuleOne.margin_of_safety_price_batch(inputs["eps"], inputs["growth"], inputs["low_pe"], inputs["high_pe"])
+	RuleOne.compound_annual_growth_rate_batch(inputs["equity_start"], inputs["equity_end"], 5)
+	RuleOne.calculate_roic_batch(inputs["income"], inputs["cash"], inputs["debt"], inputs["equity"])
+
+
+def _measure(function, inputs, rounds: int) -> float:
+	"""
+	@return: Best wall time of rounds in milliseconds
+	"""
+	best = float("inf")
+	for _ in range(rounds):
+		start = time.perf_counter()
+		function(inputs)
+		best = min(best, time.perf_counter() - start)
+	return best * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--tickers", type=int, default=10000)
+	parser.add_argument("--rounds", type=int, default=5)
+	args = parser.parse_args()
+
+	arrays = _inputs(args.tickers)
+	# Scalar functions get what they get in app: Python floats, None for missing
+	lists = {name: [None if np.isnan(v) else float(v) for v in array] for name, array in arrays.items()}
+
+	scalar = _measure(_scalar, lists, args.rounds)
+	batch = _measure(_batch, arrays, args.rounds)
+	print(f"{args.tickers} tickers")
+	print(f"scalar loop: {scalar:9.2f} ms")
+	print(f"batch:       {batch:9.2f} ms  ({scalar / batch:.1f}x)")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+CPU time of turning assembled result into JSON response.
+
+Old path dumped result to JSON with default of C{__dict__} (fields of slots now), loaded it back to
+dictionary, and Flask's default provider dumped it again. New path takes plain dictionary of result,
+built directly and cached per result, and encodes it with fast JSON provider. Both first (uncached) and later (cached) requests
+of result are measured.
+
+Usage: python benchmarks/serialization.py [--requests 20000] [--rounds 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from flaskr.jsonprovider import FastJSONProvider
+from flaskr.source.elements import Property, Result, Trend
+from flaskr.source.sources.YahooQuoteSummary import Profile
+
+
+def _result() -> Result:
+	"""
+	@return: Result of about the size of real one, with long business summary and officers
+	"""
+	result = Result()
+	result.ticker = "AAPL"
+	result.name = result.shortName = "Apple Inc."
+	result.industry = "Consumer Electronics"
+	result.address = "United States Cupertino - One Apple Park Way"
+	result.profile = Profile()
+	result.profile.fill(["address1", "city", "state", "country", "website", "industryDisp", "sector",
+	                     "longBusinessSummary", "fullTimeEmployees", "companyOfficers"], {
+		"address1": "One Apple Park Way", "city": "Cupertino", "state": "CA", "country": "United States",
+		"website": "https://www.apple.com", "industryDisp": "Consumer Electronics", "sector": "Technology",
+		"longBusinessSummary": "Apple Inc. designs, manufactures, and markets smartphones. " * 20,
+		"fullTimeEmployees": 164000,
+		"companyOfficers": [{"name": f"Officer {i}", "title": "Officer", "age": 50 + i, "totalPay": {"raw": 1e6}}
+		                    for i in range(10)]})
+	for name in ("roic", "equity", "eps", "sales", "cash"):
+		setattr(result, name, [Property(10.0 + i) for i in range(4)])
+		setattr(result, f"{name}_trend", Trend(1.5, 0.93))
+	for name in ("total_debt", "free_cash_flow", "debt_payoff_time", "debt_equity_ratio", "margin_of_safety_price",
+	             "current_price", "sticker_price", "payback_time", "average_volume", "shares_to_hold"):
+		getattr(result, name).value = 123.45
+	result.sources = {name: {"status": "ok", "code": None, "reason": None, "elapsed_ms": 120}
+	                  for name in ("MSNMoney", "StockRow", "YahooAnalysis", "YahooQuoteSummary")}
+	result.colour()
+	return result
+
+
+def _measure(function, requests: int, rounds: int) -> float:
+	"""
+	@return: Best CPU time per request of rounds, in microseconds
+	"""
+	best = float("inf")
+	for _ in range(rounds):
+		start = time.process_time()
+		for _ in range(requests):
+			function()
+		best = min(best, time.process_time() - start)
+	return best / requests * 1e6
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=20000)
+	parser.add_argument("--rounds", type=int, default=5)
+	args = parser.parse_args()
+
+	default_app, fast_app = Flask("default"), Flask("fast")
+	default_app.json = DefaultJSONProvider(default_app)
+	fast_app.json = FastJSONProvider(fast_app)
+	result = _result()
+
+	def fields(o):  # What default of __dict__ gave, before classes got slots
+		return {name: getattr(o, name) for name in o.__slots__ if not name.startswith("_")}
+
+	def old():
+		default_app.json.response(json.loads(json.dumps(result, default=fields))).get_data()
+
+	def uncached():
+		result.changed()
+		fast_app.json.response(result.to_dict()).get_data()
+
+	def cached():
+		fast_app.json.response(result.to_dict()).get_data()
+
+	with default_app.app_context(), fast_app.app_context():
+		timings = {name: _measure(function, args.requests, args.rounds)
+		           for name, function in (("dumps/loads/dumps", old), ("to_dict, first", uncached),
+		                                  ("to_dict, cached", cached))}
+	baseline = timings["dumps/loads/dumps"]
+	print(f"{len(fast_app.json.dumps(result.to_dict()))} bytes of JSON, CPU time per request")
+	for name, timing in timings.items():
+		print(f"{name:18} {timing:8.1f} us  (saves {baseline - timing:6.1f} us, {baseline / timing:.1f}x)")
+
+
+if __name__ == '__main__':
+	main()
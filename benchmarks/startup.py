@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Cold start of app: time to import it, and time to first response, both from start of fresh interpreter.
+
+Every run starts new interpreter with C{-X importtime}, which imports app and serves one request with test
+client. Import profile of runs is summed by top level package, so the heaviest imports are listed. Template
+cache is empty in first run, the following runs use what it kept.
+
+Usage: python benchmarks/startup.py [--runs 5] [--path /] [--top 12]
+"""
+import argparse
+import collections
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+
+_CHILD = """
+import sys, time
+start = float(sys.argv[1])
+began = time.time()
+import main
+imported = time.time()
+response = main.app.test_client().get(sys.argv[2])
+print(began - start, imported - start, time.time() - start, response.status_code)
+"""
+
+
+def _run(path: str, env: dict) -> tuple[list[float], int, dict[str, int]]:
+	"""
+	@return: Seconds to interpreter, to imported app and to first response, status of response, and
+	         microseconds of imports by top level package
+	"""
+	process = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD, str(time.time()), path],
+	                         cwd=root, env=env, capture_output=True, text=True, check=True)
+	*times, status = process.stdout.split()
+	packages: dict[str, int] = collections.Counter()
+	for line in process.stderr.splitlines():
+		fields = line.removeprefix("import time:").split("|")
+		if line.startswith("import time:") and len(fields) == 3 and fields[0].strip().isdigit():
+			packages[fields[2].strip().split(".")[0]] += int(fields[0])
+	return [float(value) for value in times], int(status), packages
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--runs", type=int, default=5)
+	parser.add_argument("--path", default="/")
+	parser.add_argument("--top", type=int, default=12)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as directory:
+		env = dict(os.environ, CACHE_WARMER="0", TEMPLATE_CACHE_DIR=directory)
+		runs = [_run(args.path, env) for _ in range(args.runs)]
+
+	print(f"{args.runs} runs, first request GET {args.path} -> {runs[0][1]}")
+	for i, name in enumerate(("interpreter", "import app", "first response")):
+		median = statistics.median(times[i] for times, _, _ in runs)
+		print(f"{name:16} first {runs[0][0][i] * 1e3:7.1f} ms  median {median * 1e3:7.1f} ms")
+
+	total: dict[str, int] = collections.Counter()
+	for _, _, packages in runs:
+		total.update(packages)
+	print("\nImports by package, mean of runs:")
+	for name, micros in sorted(total.items(), key=lambda item: -item[1])[:args.top]:
+		print(f"{name:24} {micros / args.runs / 1e3:7.1f} ms")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Latency of symbol universe lookups: prefix suggestions, membership checks, and the C{/suggest} endpoint.
+
+Universe is real listing from C{SYMBOL_LISTING_FILE} if it is set, otherwise random symbols of the size of
+US listings.
+
+Usage: python benchmarks/suggest.py [--symbols 12000] [--lookups 100000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from flaskr.source.universe import SymbolUniverse
+
+
+def _measure(function, arguments: list) -> float:
+	"""
+	@return: Mean wall time per call, in microseconds
+	"""
+	start = time.perf_counter()
+	for argument in arguments:
+		function(argument)
+	return (time.perf_counter() - start) / len(arguments) * 1e6
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--symbols", type=int, default=12000)
+	parser.add_argument("--lookups", type=int, default=100000)
+	args = parser.parse_args()
+
+	rng = random.Random(0)
+	universe = SymbolUniverse.from_env()
+	if not universe.loaded:
+		universe.load((("".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5))), "Company")
+		               for _ in range(args.symbols)))
+	symbols = universe.suggest("A", limit=len(universe)) or [("A", "")]
+	prefixes = [rng.choice(symbols)[0][:rng.randint(1, 3)] for _ in range(args.lookups)]
+	checks = [rng.choice(symbols)[0] if rng.random() < 0.5 else "ZZZZZZ" for _ in range(args.lookups)]
+
+	print(f"{len(universe)} symbols")
+	print(f"suggest, 10 symbols: {_measure(universe.suggest, prefixes):6.2f} us")
+	print(f"membership:          {_measure(universe.__contains__, checks):6.2f} us")
+
+	import flaskr.source as source
+	source.universe = universe
+	os.environ.setdefault("CACHE_WARMER", "0")
+	from main import app
+	client = app.test_client()
+	requests = prefixes[:min(len(prefixes), 5000)]
+	endpoint = _measure(lambda prefix: client.get(f"/suggest/{prefix}"), requests)
+	print(f"/suggest endpoint:   {endpoint:6.2f} us, in process with test client")
+
+
+if __name__ == '__main__':
+	main()
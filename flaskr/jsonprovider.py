@@ -0,0 +1,89 @@
+"""
+JSON provider of Flask app, with faster backend.
+
+Responses are encoded with orjson straight to bytes when it is installed, otherwise the provider
+behaves as Flask's default one. Unlike Flask's default, keys are not sorted but keep order of dictionaries,
+which is order of fields of result, of favourites as requested and of warmup phases. C{sort_keys=True}
+still sorts them.
+
+@see FastJSONProvider: for provider itself
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:  # Faster JSON backend is optional
+	import orjson
+except ImportError:
+	orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+	"""
+	Flask JSON provider encoding with orjson, set it with C{app.json = FastJSONProvider(app)}
+
+	Arguments orjson does not know, f.ex C{separators}, are passed to default provider instead
+	"""
+
+	sort_keys = False
+
+	_ARGUMENTS = frozenset({"indent", "sort_keys", "default"})
+
+	def dumps(self, obj: Any, **kwargs: Any) -> str:
+		"""
+		Serialize data as JSON string
+
+		@param obj: Data to serialize
+		@param kwargs: Arguments as for C{json.dumps}
+		@return: JSON string
+		"""
+		if orjson is None or not kwargs.keys() <= self._ARGUMENTS:
+			return super().dumps(obj, **kwargs)
+		return self.__dumps(obj, **kwargs).decode()
+
+	def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+		"""
+		Deserialize data from JSON string or bytes
+
+		@param s: JSON text
+		@param kwargs: Arguments as for C{json.loads}
+		@return: Deserialized data
+		"""
+		if orjson is None or kwargs:
+			return super().loads(s, **kwargs)
+		return orjson.loads(s)
+
+	def response(self, *args: Any, **kwargs: Any):
+		"""
+		Response with data serialized as JSON, encoded right to bytes
+
+		@param args: Data, as for C{flask.jsonify}
+		@param kwargs: Data as keyword arguments
+		@return: Response with C{application/json} mimetype
+		"""
+		if orjson is None:
+			return super().response(*args, **kwargs)
+		obj = self._prepare_response_obj(args, kwargs)
+		indent = self.compact is False or (self.compact is None and self._app.debug)
+		return self._app.response_class(self.__dumps(obj, indent=2 if indent else None) + b"\n",
+		                                mimetype=self.mimetype)
+
+	def __dumps(self, obj: Any, indent: Any = None, sort_keys: bool = None, default: Any = None) -> bytes:
+		"""
+		Serialize data with orjson
+
+		@param obj: Data to serialize
+		@param indent: Pretty print with indentation of 2 spaces, if set
+		@param sort_keys: Sort keys of dictionaries, defaults to C{sort_keys} of provider
+		@param default: Function for objects orjson can not serialize, defaults to the one of Flask
+		@return: JSON bytes
+		"""
+		option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+		if indent:
+			option |= orjson.OPT_INDENT_2
+		if self.sort_keys if sort_keys is None else sort_keys:
+			option |= orjson.OPT_SORT_KEYS
+		return orjson.dumps(obj, default=default or self.default, option=option)
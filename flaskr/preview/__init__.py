@@ -1,10 +1,27 @@
 """
 Create preview images by tickers with PIL(low) library
+
+Every preview has its key, content hash of data it shows, see L{key} and L{error_key}. Encoded previews
+are cached by it, and it is their ETag too. Previews are rendered on bounded pool, see L{cached}.
+
+Rendering starts from copy of pre-rendered base canvas of layout, with static labels already on it.
+Texts are measured once, and rendered once to glyph strips, masks that are only pasted in color later,
+so repeated strings like industries, countries and labels cost almost nothing. Every size variant, see
+L{SIZES}, is derived from one master render.
 """
+import functools
+import hashlib
 import io
-from typing import Optional
+import json
+import math
+import os
+from typing import Callable, Optional
 
-from PIL import Image, ImageFont, ImageDraw
+from PIL import Image, ImageColor, ImageFont, ImageDraw
+
+from flaskr.preview.cache import PreviewCache
+from flaskr.preview.pool import RenderPool, Saturated
+from flaskr.source.flight import SingleFlight
 
 
 def _values(node, kv):
@@ -22,64 +39,231 @@ def _values(node, kv):
 
 width: int = 1200
 height: int = 600
+"""Size of master render"""
+
+
+def _sizes(spec: Optional[str]) -> dict[str, tuple[int, int]]:
+	"""
+	Size variants of previews, defaults with those from specification
+	
+	@param spec: Comma separated variants, f.ex C{og=1200x630,small=300x150}
+	@return: Width and height by name of variant
+	"""
+	sizes = {"twitter": (width, height), "og": (1200, 630), "thumbnail": (400, 200)}
+	for item in (spec or "").split(","):
+		if "=" in item:
+			name, size = item.split("=", 1)
+			size_width, size_height = size.lower().split("x")
+			sizes[name.strip()] = (int(size_width), int(size_height))
+	return sizes
+
+
+SIZES: dict[str, tuple[int, int]] = _sizes(os.environ.get("PREVIEW_SIZES"))
+"""Size variants of previews by name, more are added with C{PREVIEW_SIZES} environment variable"""
+
+TEXT_COLOR = "#2f363d"
+ERROR_COLOR = "#701516"
+NAME_COLOR = "#486edb"
+
+LARGE: int = 80
+CONTENT: int = 30
+"""Sizes of fonts"""
+
+FONTS_DIRECTORY = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "assets", "fonts")
+
 
-large_font_bold = ImageFont.truetype("assets/fonts/Roboto-Bold.ttf", 80)
-large_font = ImageFont.truetype("assets/fonts/Roboto-Regular.ttf", 80)
-large_font_light = ImageFont.truetype("assets/fonts/Roboto-Light.ttf", 80)
+image_cache: PreviewCache = PreviewCache.from_env()
+"""Cache of encoded previews"""
 
-content_font = ImageFont.truetype("assets/fonts/Roboto-Regular.ttf", 30)
-content_font_light = ImageFont.truetype("assets/fonts/Roboto-Light.ttf", 30)
+render_pool: RenderPool = RenderPool.from_env()
+"""Pool rendering previews off the event loop"""
 
+_render_flights = SingleFlight()
 
-def ticker(symbol: str, data: dict) -> io.BytesIO:
+LAYOUT_VERSION: int = 2
+"""Version of layout of previews, part of their keys, so change of layout is not served from cache"""
+
+
+def _ceo(profile: dict) -> Optional[str]:
 	"""
-	Generate preview image about company
+	@param profile: Profile of company
+	@return: Name of first company officer
+	"""
+	return profile.get("companyOfficers", [])[0].get("name", None) if profile.get("companyOfficers", []) else None
+
+
+def key(symbol: str, data: dict, size: Optional[str] = None) -> str:
+	"""
+	Content hash of fields preview of ticker shows
 	
 	@param symbol: Ticker symbol
 	@param data: Fetched data
+	@param size: Name of size variant, None for master size
 	
-	@return: Preview jpeg image
+	@return: Hex digest
+	"""
+	profile: dict = data.get("profile", {}) or {}
+	shown = [LAYOUT_VERSION, symbol, data.get("shortName"), data.get("industry"), profile.get("country"),
+	         profile.get("fullTimeEmployees"), _ceo(profile), list(_values(data, "color")), SIZES.get(size)]
+	return hashlib.sha256(json.dumps(shown).encode()).hexdigest()[:32]
+
+
+def error_key(symbol: str, code: int, message: str, description: Optional[str] = None,
+              size: Optional[str] = None) -> str:
 	"""
-	color = "#2f363d"
+	Content hash of error preview
 	
-	image = Image.new("RGB", (width, height), "white")
-	draw = ImageDraw.Draw(image)
+	@param symbol: Symbol
+	@param code: Error code of response
+	@param message: Error message of response
+	@param description: Standard or custom description
+	@param size: Name of size variant, None for master size
 	
-	ticker_length = draw.textlength(f"{symbol} / ", font=large_font_light)
-	name_length = draw.textlength(data.get("shortName") or "Name not found", font=large_font_bold)
+	@return: Hex digest
+	"""
+	shown = [LAYOUT_VERSION, "error", symbol, code, message, description, SIZES.get(size)]
+	return hashlib.sha256(json.dumps(shown).encode()).hexdigest()[:32]
+
+
+async def cached(preview_key: str, render: Callable[[], bytes], error: bool = False) -> bytes:
+	"""
+	Encoded preview from cache, or rendered on render pool and cached. Concurrent requests of the same
+	preview share one render. Only memory of cache is read here, disk is read and written on render pool, so
+	event loop never waits for files
 	
-	draw.text((125 + ticker_length, 175), f"{symbol} / ", fill=color, anchor="rs", font=large_font_light)
+	@param preview_key: Content hash of preview
+	@param render: Function rendering preview to jpeg bytes
+	@param error: If preview is error preview
 	
-	if ticker_length + name_length + 250 <= width:
-		draw.text((125 + ticker_length, 175), data.get("shortName") or "Name not found", fill="#486edb", anchor="ls",
-		          font=large_font_bold)
-		draw.text((125 + ticker_length, 225), data.get("industry") or "", fill=color, anchor="ls", font=content_font_light)
-	else:
-		draw.text((125, 255), data.get("shortName") or "Name not found", fill="#486edb", anchor="ls", font=large_font_bold)
-		draw.text((125, 300), data["industry"] or "", fill=color, anchor="ls", font=content_font_light)
+	@return: Encoded preview
 	
-	profile: dict = data.get("profile", {}) or {}
+	@raise Saturated: Render pool is full
+	"""
+	body = image_cache.lookup(preview_key, error, disk=False)
+	if body is not None:
+		return body
+	return await _render_flights.run(preview_key, lambda: render_pool.run(image_cache.get, preview_key, render, error))
+
+
+@functools.lru_cache(maxsize=None)
+def _font(weight: str, size: int) -> ImageFont.FreeTypeFont:
+	"""
+	Roboto font, loaded on first use
 	
-	draw.text((125, 410), "Country", fill=color, anchor="ls", font=content_font)
-	draw.text((125, 450), profile.get("country", None) or "No data", fill=color, anchor="ls", font=content_font_light)
+	@param weight: "Regular", "Bold" or "Light"
+	@param size: Size of font
+	@return: Font
+	"""
+	return ImageFont.truetype(os.path.join(FONTS_DIRECTORY, f"Roboto-{weight}.ttf"), size)
+
+
+@functools.lru_cache(maxsize=None)
+def _rgb(color: str) -> tuple[int, int, int]:
+	"""
+	@param color: Color name or hex
+	@return: RGB of color
+	"""
+	return ImageColor.getrgb(color)[:3]
+
+
+@functools.lru_cache(maxsize=4096)
+def _textlength(text: str, font: ImageFont.FreeTypeFont) -> float:
+	"""
+	Cached length of text in pixels
 	
-	draw.text((350, 410), "Employees", fill=color, anchor="ls", font=content_font)
-	draw.text((350, 450), str(profile.get("fullTimeEmployees", None) or "No data") or "No data", fill=color, anchor="ls",
-	          font=content_font_light)
+	@param text: Single line text
+	@param font: Font
+	@return: Length of text
+	"""
+	return font.getlength(text)
+
+
+@functools.lru_cache(maxsize=512)
+def _strip(text: str, font: ImageFont.FreeTypeFont, anchor: str, spacing: int) -> tuple[Image.Image, int, int]:
+	"""
+	Rendered glyph strip of text, a mask with text in full coverage
 	
-	draw.text((575, 410), "CEO", fill=color, anchor="ls", font=content_font)
+	@param text: Text, may have more lines
+	@param font: Font
+	@param anchor: Anchor of text, as for C{ImageDraw.text}
+	@param spacing: Spacing between lines
+	@return: Mask, and its offset from anchor point
+	"""
+	box = ImageDraw.Draw(Image.new("L", (1, 1))).multiline_textbbox((0, 0), text, font=font, anchor=anchor,
+	                                                                 spacing=spacing)
+	left, top, right, bottom = math.floor(box[0]), math.floor(box[1]), math.ceil(box[2]), math.ceil(box[3])
+	mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)), 0)
+	ImageDraw.Draw(mask).multiline_text((-left, -top), text, fill=255, font=font, anchor=anchor, spacing=spacing)
+	return mask, left, top
+
+
+def _text(image: Image.Image, xy: tuple[float, float], text: str, fill: str, font: ImageFont.FreeTypeFont,
+          anchor: str = "ls", spacing: int = 4) -> None:
+	"""
+	Draw text from its cached glyph strip
 	
-	ceo = profile.get("companyOfficers", [])[0].get("name", None) if profile.get("companyOfficers", []) else None
-	draw.text((575, 450), ceo or "No data", fill=color, anchor="ls",
-	          font=content_font_light)
+	@param image: Image to draw to
+	@param xy: Anchor point
+	@param text: Text, may have more lines
+	@param fill: Color of text
+	@param font: Font
+	@param anchor: Anchor of text, as for C{ImageDraw.text}
+	@param spacing: Spacing between lines
+	"""
+	if not text:
+		return
+	mask, left, top = _strip(text, font, anchor, spacing)
+	image.paste(_rgb(fill), (round(xy[0]) + left, round(xy[1]) + top), mask)
+
+
+@functools.lru_cache(maxsize=None)
+def _base(layout: str) -> Image.Image:
+	"""
+	Pre-rendered canvas of layout with its static parts, it is copied for every preview
 	
-	colors = [value if value else "white" for value in _values(data, "color")]
+	@param layout: "ticker" or "error"
+	@return: Base image, must not be modified
+	"""
+	image = Image.new("RGB", (width, height), "white")
+	if layout == "ticker":
+		for x, label in ((125, "Country"), (350, "Employees"), (575, "CEO")):
+			_text(image, (x, 410), label, TEXT_COLOR, _font("Regular", CONTENT))
+	elif layout == "error":
+		image.paste(_rgb(ERROR_COLOR), (0, height - 24, width, height))
+	return image
+
+
+def preload() -> None:
+	"""
+	Load fonts, image plugins and base canvases in advance, so first preview does not wait for them
+	"""
+	Image.preinit()
+	for weight, size in (("Bold", LARGE), ("Light", LARGE), ("Regular", CONTENT), ("Light", CONTENT)):
+		_font(weight, size)
+	for layout in ("ticker", "error"):
+		_base(layout)
+
+
+def _encode(image: Image.Image, size: Optional[str] = None) -> io.BytesIO:
+	"""
+	Encode master render, resized to size variant
 	
-	line_length = width / len(colors)
-	line_pos = 0
-	for color in colors:
-		draw.line(((line_pos, height), (line_pos + line_length, height)), fill=color, width=50)
-		line_pos += line_length
+	@param image: Master render
+	@param size: Name of size variant, None for master size
+	@return: Jpeg image
+	"""
+	target = SIZES[size] if size else image.size
+	scale = min(target[0] / image.width, target[1] / image.height)
+	scaled = (round(image.width * scale), round(image.height * scale))
+	factor = image.width // scaled[0] if scaled[0] else 0
+	if factor > 1 and scaled == (image.width // factor, image.height // factor) and not image.width % factor:
+		image = image.reduce(factor)  # Box average of whole pixels, several times faster than resampling
+	elif scaled != image.size:
+		image = image.resize(scaled, Image.Resampling.BILINEAR, reducing_gap=2.0)
+	if scaled != target:  # Padded with background, not cropped, so nothing is cut off
+		canvas = Image.new("RGB", target, "white")
+		canvas.paste(image, ((target[0] - scaled[0]) // 2, (target[1] - scaled[1]) // 2))
+		image = canvas
 	
 	img_io = io.BytesIO()
 	image.save(img_io, 'jpeg', quality=70)
@@ -88,7 +272,52 @@ def ticker(symbol: str, data: dict) -> io.BytesIO:
 	return img_io
 
 
-def error(symbol: str, code: int, message: str, description: Optional[str] = None) -> io.BytesIO:
+def ticker(symbol: str, data: dict, size: Optional[str] = None) -> io.BytesIO:
+	"""
+	Generate preview image about company
+	
+	@param symbol: Ticker symbol
+	@param data: Fetched data
+	@param size: Name of size variant, None for master size
+	
+	@return: Preview jpeg image
+	"""
+	color = TEXT_COLOR
+	
+	image = _base("ticker").copy()
+	
+	name = data.get("shortName") or "Name not found"
+	ticker_length = _textlength(f"{symbol} / ", _font("Light", LARGE))
+	name_length = _textlength(name, _font("Bold", LARGE))
+	
+	_text(image, (125 + ticker_length, 175), f"{symbol} / ", color, _font("Light", LARGE), anchor="rs")
+	
+	if ticker_length + name_length + 250 <= width:
+		_text(image, (125 + ticker_length, 175), name, NAME_COLOR, _font("Bold", LARGE))
+		_text(image, (125 + ticker_length, 225), data.get("industry") or "", color, _font("Light", CONTENT))
+	else:
+		_text(image, (125, 255), name, NAME_COLOR, _font("Bold", LARGE))
+		_text(image, (125, 300), data["industry"] or "", color, _font("Light", CONTENT))
+	
+	profile: dict = data.get("profile", {}) or {}
+	
+	_text(image, (125, 450), profile.get("country", None) or "No data", color, _font("Light", CONTENT))
+	_text(image, (350, 450), str(profile.get("fullTimeEmployees", None) or "No data"), color, _font("Light", CONTENT))
+	_text(image, (575, 450), _ceo(profile) or "No data", color, _font("Light", CONTENT))
+	
+	colors = [value if value else "white" for value in _values(data, "color")]
+	
+	line_length = width / len(colors) if colors else width
+	line_pos = 0
+	for color in colors:  # Visible half of line 50 pixels wide, drawn on the bottom edge
+		image.paste(_rgb(color), (round(line_pos), height - 24, round(line_pos + line_length), height))
+		line_pos += line_length
+	
+	return _encode(image, size)
+
+
+def error(symbol: str, code: int, message: str, description: Optional[str] = None,
+          size: Optional[str] = None) -> io.BytesIO:
 	"""
 	Prepare preview with error information, f.ex 404, about not found symbol
 
@@ -96,6 +325,7 @@ def error(symbol: str, code: int, message: str, description: Optional[str] = Non
 	@param code: Error code of response
 	@param message: Error message of response
 	@param description: Standard or custom description
+	@param size: Name of size variant, None for master size
 	
 	@return: Error preview image in jpeg
 	"""
@@ -103,32 +333,21 @@ def error(symbol: str, code: int, message: str, description: Optional[str] = Non
 		description = "We had some trouble acquiring data for this symbol. \n"\
 		              "If it was not found, our sources may not have records about it."
 	
-	color = "#701516"
-	image = Image.new("RGB", (width, height), "white")
-	draw = ImageDraw.Draw(image)
+	color = ERROR_COLOR
+	image = _base("error").copy()
 	
-	ticker_length = draw.textlength(f"{symbol} / ", font=large_font_light)
-	message_length = draw.textlength(message, font=large_font_bold)
+	ticker_length = _textlength(f"{symbol} / ", _font("Light", LARGE))
+	message_length = _textlength(message, _font("Bold", LARGE))
 	
-	draw.text((125 + ticker_length, 175), f"{symbol} / ", fill="#2f363d", anchor="rs", font=large_font_light)
+	_text(image, (125 + ticker_length, 175), f"{symbol} / ", TEXT_COLOR, _font("Light", LARGE), anchor="rs")
 	
 	if ticker_length + message_length + 250 <= width:
-		draw.text((125 + ticker_length, 175), f"Error {code}", fill=color, anchor="ls",
-		          font=large_font_bold)
-		draw.text((125 + ticker_length, 225), message, fill=color, anchor="ls",
-		          font=content_font_light)
+		_text(image, (125 + ticker_length, 175), f"Error {code}", color, _font("Bold", LARGE))
+		_text(image, (125 + ticker_length, 225), message, color, _font("Light", CONTENT))
 	else:
-		draw.text((125, 255), f"Error {code}", fill=color, anchor="ls",
-		          font=large_font_bold)
-		draw.text((125, 300), message, fill=color, anchor="ls", font=content_font_light)
+		_text(image, (125, 255), f"Error {code}", color, _font("Bold", LARGE))
+		_text(image, (125, 300), message, color, _font("Light", CONTENT))
 	
-	draw.multiline_text((125, 410), description, fill="#2f363d", anchor="ls",
-	                    font=content_font_light, align="left", spacing=10)
+	_text(image, (125, 410), description, TEXT_COLOR, _font("Light", CONTENT), spacing=10)
 	
-	draw.line(((0, height), (width, height)), fill=color, width=50)
-	
-	img_io = io.BytesIO()
-	image.save(img_io, 'jpeg', quality=70)
-	img_io.seek(0)
-	
-	return img_io
+	return _encode(image, size)
@@ -0,0 +1,257 @@
+"""
+Cache of encoded preview images.
+
+Previews are keyed by content hash of what image shows, see L{flaskr.preview.key}, so the key is
+also strong ETag of image. Successful previews are kept in memory, bounded by number and size, and
+on disk, where they survive restarts. Error previews are kept only in memory, and only shortly, so
+preview of ticker recovers soon after its sources do.
+
+Directory on disk is taken from C{PREVIEW_CACHE_DIR} environment variable, empty value disables disk.
+
+@see PreviewCache: for cache itself
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger("IsThisStockGood")
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "isthisstockgood", "previews")
+
+
+class PreviewCache:
+	"""
+	LRU cache of preview bytes in memory, backed by directory on disk
+
+	@param max_entries: Maximal number of previews in memory
+	@type max_entries: int
+
+	@param max_bytes: Maximal summed size of previews in memory
+	@type max_bytes: int
+
+	@param ttl: Seconds to serve preview for
+	@type ttl: float
+
+	@param error_ttl: Seconds to serve error preview for
+	@type error_ttl: float
+
+	@param directory: Directory for previews on disk, None to keep them in memory only
+	@type directory: Optional[str]
+	"""
+
+	PURGE_EVERY: int = 256
+	"""Number of writes to disk, after which expired previews are removed from it"""
+
+	def __init__(self, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024, ttl: float = 12 * 3600,
+	             error_ttl: float = 5 * 60, directory: Optional[str] = DEFAULT_DIRECTORY):
+		"""
+		Prepare empty cache
+
+		@param max_entries: Maximal number of previews in memory
+		@param max_bytes: Maximal summed size of previews in memory
+		@param ttl: Seconds to serve preview for
+		@param error_ttl: Seconds to serve error preview for
+		@param directory: Directory for previews on disk
+		"""
+		self.max_entries: int = max_entries
+		self.max_bytes: int = max_bytes
+		self.ttl: float = ttl
+		self.error_ttl: float = error_ttl
+		self.directory: Optional[str] = directory
+
+		self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+		self._bytes: int = 0
+		self._lock = threading.Lock()
+		self._writes: int = 0
+
+		self.memory_hits: int = 0
+		self.disk_hits: int = 0
+		self.renders: int = 0
+		self.evictions: int = 0
+
+	@classmethod
+	def from_env(cls) -> PreviewCache:
+		"""
+		Create cache with directory from C{PREVIEW_CACHE_DIR} environment variable
+
+		@return: Cache
+		"""
+		return cls(directory=os.environ.get("PREVIEW_CACHE_DIR", DEFAULT_DIRECTORY) or None)
+
+	def get(self, key: str, render: Callable[[], bytes], error: bool = False) -> bytes:
+		"""
+		Get preview from memory or disk, or render it and keep it
+
+		@param key: Content hash of preview
+		@param render: Function rendering preview, called on miss
+		@param error: If preview is error preview, it is then kept only in memory, for C{error_ttl}
+
+		@return: Encoded preview
+		"""
+		body = self.lookup(key, error)
+		if body is None:
+			body = render()
+			self.put(key, body, error)
+		return body
+
+	def lookup(self, key: str, error: bool = False, disk: bool = True) -> Optional[bytes]:
+		"""
+		Get preview from memory, or from disk, when it is not error preview
+
+		@param key: Content hash of preview
+		@param error: If preview is error preview
+		@param disk: If disk should be read on miss in memory, f.ex not on event loop
+		@return: Encoded preview, None on miss
+		"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and time.monotonic() < entry[1]:
+				self._entries.move_to_end(key)
+				self.memory_hits += 1
+				return entry[0]
+
+		body = None if error or not disk else self.__read(key)
+		if body is not None:
+			self.disk_hits += 1
+			self.__put(key, body, self.ttl)
+		return body
+
+	def put(self, key: str, body: bytes, error: bool = False) -> None:
+		"""
+		Keep newly rendered preview
+
+		@param key: Content hash of preview
+		@param body: Encoded preview
+		@param error: If preview is error preview, it is then kept only in memory, for C{error_ttl}
+		"""
+		self.renders += 1
+		if not error:
+			self.__write(key, body)
+		self.__put(key, body, self.error_ttl if error else self.ttl)
+
+	def clear(self) -> None:
+		"""
+		Remove all previews from memory, those on disk are kept
+		"""
+		with self._lock:
+			self._entries.clear()
+			self._bytes = 0
+
+	def purge(self) -> int:
+		"""
+		Remove expired previews from disk
+
+		@return: Number of removed previews
+		"""
+		if self.directory is None:
+			return 0
+		removed = 0
+		now = time.time()
+		for root, _, files in os.walk(self.directory):
+			for name in files:
+				path = os.path.join(root, name)
+				try:
+					if now - os.path.getmtime(path) > self.ttl:
+						os.remove(path)
+						removed += 1
+				except OSError:
+					pass
+		return removed
+
+	def stats(self) -> dict:
+		"""
+		Counters and usage of cache
+
+		@return: Dictionary with counters
+		"""
+		with self._lock:
+			return {
+				"entries": len(self._entries),
+				"bytes": self._bytes,
+				"max_entries": self.max_entries,
+				"max_bytes": self.max_bytes,
+				"memory_hits": self.memory_hits,
+				"disk_hits": self.disk_hits,
+				"renders": self.renders,
+				"evictions": self.evictions,
+				"directory": self.directory,
+			}
+
+	def __put(self, key: str, body: bytes, ttl: float) -> None:
+		"""
+		Keep preview in memory, least recently used previews are evicted to stay within budget
+
+		@param key: Content hash of preview
+		@param body: Encoded preview
+		@param ttl: Seconds to keep preview for
+		"""
+		if len(body) > self.max_bytes:
+			return
+		with self._lock:
+			previous = self._entries.pop(key, None)
+			if previous is not None:
+				self._bytes -= len(previous[0])
+			self._entries[key] = (body, time.monotonic() + ttl)
+			self._bytes += len(body)
+			while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+				_, (evicted, _) = self._entries.popitem(last=False)
+				self._bytes -= len(evicted)
+				self.evictions += 1
+
+	def __path(self, key: str) -> str:
+		"""
+		@param key: Content hash of preview
+		@return: Path of preview on disk
+		"""
+		return os.path.join(self.directory, key[:2], f"{key}.jpg")
+
+	def __read(self, key: str) -> Optional[bytes]:
+		"""
+		Read preview from disk
+
+		@param key: Content hash of preview
+		@return: Encoded preview, None if it is not on disk or it is too old
+		"""
+		if self.directory is None:
+			return None
+		path = self.__path(key)
+		try:
+			if time.time() - os.path.getmtime(path) > self.ttl:
+				return None
+			with open(path, "rb") as file:
+				return file.read()
+		except OSError:
+			return None
+
+	def __write(self, key: str, body: bytes) -> None:
+		"""
+		Write preview to disk, atomically so concurrent readers never see partial file
+
+		@param key: Content hash of preview
+		@param body: Encoded preview
+		"""
+		if self.directory is None:
+			return
+		path = self.__path(key)
+		try:
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+			with open(temporary, "wb") as file:
+				file.write(body)
+			os.replace(temporary, path)
+		except OSError as e:
+			logger.warning(f"Preview could not be written to {path}: {e}")
+			return
+		self._writes += 1
+		if self._writes % self.PURGE_EVERY == 0:
+			self.purge()
+
+	def __len__(self) -> int:
+		return len(self._entries)
@@ -0,0 +1,108 @@
+"""
+Bounded pool rendering previews off the event loop.
+
+Drawing with Pillow and encoding JPEG take tens of milliseconds of CPU, so they run on worker threads
+(Pillow releases GIL in its heavy parts), never on the shared event loop. Pool accepts only limited
+number of renders at once, the rest is rejected right away, so overload is answered with 503 instead
+of growing queue and latency.
+
+@see RenderPool: for pool itself
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Callable, Optional
+
+
+class Saturated(Exception):
+	"""
+	Raised when pool has no room for another render
+	"""
+
+
+class RenderPool:
+	"""
+	Thread pool with bounded number of accepted renders
+
+	@param workers: Number of worker threads, defaults to number of CPUs
+	@type workers: int
+
+	@param queue: Number of renders that can wait for worker, besides those running
+	@type queue: int
+	"""
+
+	def __init__(self, workers: Optional[int] = None, queue: Optional[int] = None):
+		"""
+		Prepare pool, threads are started on demand
+
+		@param workers: Number of worker threads
+		@param queue: Number of renders that can wait for worker
+		"""
+		self.workers: int = workers or os.cpu_count() or 1
+		self.queue: int = self.workers * 2 if queue is None else queue
+		self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="preview")
+		self._lock = threading.Lock()
+		self._pending: int = 0
+
+		self.completed: int = 0
+		self.rejected: int = 0
+
+	@classmethod
+	def from_env(cls) -> RenderPool:
+		"""
+		Create pool sized by C{PREVIEW_WORKERS} and C{PREVIEW_QUEUE} environment variables
+
+		@return: Pool
+		"""
+		workers, queue = os.environ.get("PREVIEW_WORKERS"), os.environ.get("PREVIEW_QUEUE")
+		return cls(int(workers) if workers else None, int(queue) if queue else None)
+
+	async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+		"""
+		Run function on worker thread
+
+		@param function: Function to run
+		@param args: Its arguments
+		@return: What function returned
+
+		@raise Saturated: All workers are busy and queue is full
+		"""
+		with self._lock:
+			if self._pending >= self.workers + self.queue:
+				self.rejected += 1
+				raise Saturated(f"{self._pending} previews are rendered or waiting already")
+			self._pending += 1
+		future = self._executor.submit(function, *args)
+		future.add_done_callback(self.__done)  # Slot is freed when render really ends, even if caller is cancelled
+		return await asyncio.wrap_future(future)
+
+	def stats(self) -> dict:
+		"""
+		Usage of pool
+
+		@return: Dictionary with counters
+		"""
+		return {
+			"workers": self.workers,
+			"queue": self.queue,
+			"pending": self._pending,
+			"completed": self.completed,
+			"rejected": self.rejected,
+		}
+
+	def __done(self, future: concurrent.futures.Future) -> None:
+		"""
+		Free slot of finished render
+
+		@param future: Future of render
+		"""
+		with self._lock:
+			self._pending -= 1
+			self.completed += 1
+
+	def __len__(self) -> int:
+		return self._pending
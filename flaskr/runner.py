@@ -0,0 +1,198 @@
+"""
+Long-lived event loop on dedicated thread, that request handlers submit coroutines to.
+
+Flask views are synchronous, so instead of creating and closing new loop for every request,
+every view hands its coroutine over to the one loop. Upstream calls of all requests run
+concurrently there, and pooled connections are reused between requests.
+
+@see run: for running coroutine from view
+@see iterate: for streaming items of asynchronous iterator from view
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterator, Optional
+
+import flaskr.source as source
+
+logger = logging.getLogger("IsThisStockGood")
+
+
+class LoopThread:
+	"""
+	Event loop running forever on daemon thread
+
+	@param name: Name of thread
+	@type name: str
+
+	@param on_stop: Coroutine function awaited in loop just before it is stopped, f.ex closing pooled sessions
+	@type on_stop: Optional[Callable[[], Awaitable]]
+	"""
+
+	def __init__(self, name: str = "IsThisStockGood-loop", on_stop: Optional[Callable[[], Awaitable]] = None):
+		"""
+		Prepare thread. Loop is started lazily, on first submitted coroutine
+
+		@param name: Name of thread
+		@param on_stop: Coroutine function awaited before loop is stopped
+		"""
+		self.name: str = name
+		self.on_stop: Optional[Callable[[], Awaitable]] = on_stop
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._thread: Optional[threading.Thread] = None
+		self._lock = threading.Lock()
+
+	@property
+	def loop(self) -> asyncio.AbstractEventLoop:
+		"""
+		Running loop, it is started if it is not running yet
+
+		@return: Loop of thread
+		"""
+		with self._lock:
+			if self._loop is None or self._loop.is_closed():
+				self._loop = asyncio.new_event_loop()
+				self._thread = threading.Thread(target=self.__run_forever, args=(self._loop,),
+				                                name=self.name, daemon=True)
+				self._thread.start()
+			return self._loop
+
+	@staticmethod
+	def __run_forever(loop: asyncio.AbstractEventLoop) -> None:
+		"""
+		Body of thread
+
+		@param loop: Loop to run
+		"""
+		asyncio.set_event_loop(loop)
+		loop.run_forever()
+
+	def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+		"""
+		Schedule coroutine in loop without waiting for it
+
+		@param coro: Coroutine to run
+		@return: Thread-safe future with coroutine result
+		"""
+		return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+	def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+		"""
+		Run coroutine in loop and wait for its result in calling thread
+
+		@param coro: Coroutine to run
+		@param timeout: Seconds to wait for result, None to wait as long as needed
+		@return: Result of coroutine
+
+		@raise concurrent.futures.TimeoutError: Result was not ready in time, coroutine is cancelled
+		"""
+		future = self.submit(coro)
+		try:
+			return future.result(timeout)
+		except concurrent.futures.TimeoutError:
+			future.cancel()
+			raise
+
+	def iterate(self, iterator: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+		"""
+		Consume asynchronous iterator in loop, yielding its items in calling thread as soon as they are ready.
+		If generator is closed early, f.ex client disconnected, iteration in loop is cancelled
+
+		@param iterator: Asynchronous iterator to consume
+		@param timeout: Seconds to wait for all items, None to wait as long as needed
+		@return: Iterator of items
+
+		@raise concurrent.futures.TimeoutError: Items were not ready in time, iteration is cancelled
+		"""
+		items: queue.Queue = queue.Queue()
+		end = object()
+
+		async def pump():
+			try:
+				async for item in iterator:
+					items.put((item, None))
+			except Exception as e:
+				items.put((end, e))
+			else:
+				items.put((end, None))
+
+		future = self.submit(pump())
+		until = time.monotonic() + timeout if timeout is not None else None
+		try:
+			while True:
+				try:
+					item, error = items.get(timeout=max(until - time.monotonic(), 0) if until is not None else None)
+				except queue.Empty:
+					raise concurrent.futures.TimeoutError() from None
+				if item is end:
+					if error is not None:
+						raise error
+					return
+				yield item
+		finally:
+			future.cancel()
+
+	def stop(self, timeout: float = 5.0) -> None:
+		"""
+		Stop loop and wait for its thread to finish
+
+		@param timeout: Seconds to wait for C{on_stop} and for thread
+		"""
+		with self._lock:
+			loop, thread = self._loop, self._thread
+			self._loop, self._thread = None, None
+		if loop is None or loop.is_closed():
+			return
+		if self.on_stop is not None:
+			try:
+				asyncio.run_coroutine_threadsafe(self.on_stop(), loop).result(timeout)
+			except Exception as e:
+				logger.warning(f"Loop stop hook failed: {e}")
+		loop.call_soon_threadsafe(loop.stop)
+		thread.join(timeout)
+		if not thread.is_alive():
+			loop.close()
+
+
+loop_thread = LoopThread(on_stop=source.close)
+
+atexit.register(loop_thread.stop)
+
+
+def run(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+	"""
+	Run coroutine in shared loop and wait for its result
+
+	@param coro: Coroutine to run
+	@param timeout: Seconds to wait for result
+	@return: Result of coroutine
+	"""
+	return loop_thread.run(coro, timeout)
+
+
+def iterate(iterator: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+	"""
+	Consume asynchronous iterator in shared loop, yielding its items as they are ready
+
+	@param iterator: Asynchronous iterator to consume
+	@param timeout: Seconds to wait for all items
+	@return: Iterator of items
+	"""
+	return loop_thread.iterate(iterator, timeout)
+
+
+def submit(coro: Coroutine) -> concurrent.futures.Future:
+	"""
+	Schedule coroutine in shared loop
+
+	@param coro: Coroutine to run
+	@return: Thread-safe future with coroutine result
+	"""
+	return loop_thread.submit(coro)
@@ -0,0 +1,403 @@
+"""
+Bulk screener, evaluating whole universe of tickers from symbol file.
+
+Tickers are looked up with C{flaskr.source.ticker}, with bounded number of lookups in flight per process,
+and bounded connections per upstream host. With more processes, tickers are sharded into chunks spread over
+process pool, so parsing of payloads uses all cores. Every finished ticker is appended to checkpoint file,
+and run that is started again resumes from it. Results are written as CSV or Parquet, one column per value,
+with status and error column for every source.
+
+Offline, screener runs against payload store only (C{--offline}), or against local stub (C{--upstream}).
+
+Usage: python -m flaskr.screener symbols.txt results.csv [--processes 4] [--concurrency 16]
+
+@see screen: for screening from code
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from flaskr.source.planner import SOURCES
+
+logger = logging.getLogger("IsThisStockGood")
+
+VALUES = ("current_price", "sticker_price", "margin_of_safety_price", "total_debt", "free_cash_flow",
+          "debt_payoff_time", "debt_equity_ratio", "payback_time", "average_volume", "shares_to_hold")
+"""Single value properties of result"""
+
+HISTORIES = ("roic", "eps", "sales", "equity", "cash")
+"""Properties of result with list of values"""
+
+HISTORY_LENGTH = 4
+
+COLUMNS: tuple[str, ...] = (
+	("ticker", "code", "error", "name", "shortName", "industry")
+	+ VALUES
+	+ tuple(f"{history}_{i + 1}" for history in HISTORIES for i in range(HISTORY_LENGTH))
+	+ tuple(f"{history}_trend_{column}" for history in HISTORIES for column in ("slope", "r_squared"))
+	+ tuple(f"{src}_{column}" for src in SOURCES for column in ("status", "error"))
+	+ ("elapsed_ms",)
+)
+"""Columns of output, in order"""
+
+Lookup = Callable[[str], Awaitable[tuple[dict, int]]]
+
+
+def read_symbols(path: str) -> list[str]:
+	"""
+	Read symbols from file, one per line, or in first column of CSV. Lines starting with # are skipped
+
+	@param path: Path to symbol file
+	@return: Unique upper case symbols, in order of file
+	"""
+	symbols: dict[str, None] = {}
+	with open(path, newline="") as file:
+		for row in csv.reader(file):
+			if row and row[0].strip() and not row[0].startswith("#"):
+				symbols[row[0].strip().upper()] = None
+	return list(symbols)
+
+
+def row(symbol: str, data: dict, code: int, elapsed: float) -> dict[str, Any]:
+	"""
+	Flatten result of ticker into row of output
+
+	@param symbol: Ticker symbol
+	@param data: Result dictionary
+	@param code: Http code of result
+	@param elapsed: Seconds lookup took
+
+	@return: Dictionary with value for every column
+	"""
+	flat: dict[str, Any] = {column: None for column in COLUMNS}
+	flat.update(ticker=symbol, code=code, error=data.get("error"), elapsed_ms=round(elapsed * 1000))
+	for key in ("name", "shortName", "industry"):
+		flat[key] = data.get(key)
+	for key in VALUES:
+		flat[key] = (data.get(key) or {}).get("value")
+	for key in HISTORIES:
+		for i, prop in enumerate((data.get(key) or [])[:HISTORY_LENGTH]):
+			flat[f"{key}_{i + 1}"] = (prop or {}).get("value")
+		trend = data.get(f"{key}_trend") or {}
+		flat[f"{key}_trend_slope"] = trend.get("slope")
+		flat[f"{key}_trend_r_squared"] = trend.get("r_squared")
+	for src, state in (data.get("sources") or {}).items():
+		if src in SOURCES:
+			flat[f"{src}_status"] = state.get("status")
+			flat[f"{src}_error"] = f"{state['code']} {state['reason']}" if state.get("code") else None
+	return flat
+
+
+async def _lookup(symbol: str) -> tuple[dict, int]:
+	"""
+	Default lookup, waiting for all sources. It is not counted as request, so screening does not skew cache warmer
+
+	@param symbol: Ticker symbol
+	@return: Result dictionary and http code
+	"""
+	import flaskr.source as source
+	return await source.ticker(symbol, deadline=max(source.SOURCE_TIMEOUTS.values()) + 1, count=False)
+
+
+async def screen_iter(symbols: Iterable[str], concurrency: int = 16, lookup: Optional[Lookup] = None) \
+		-> AsyncIterator[dict[str, Any]]:
+	"""
+	Look tickers up concurrently, yielding row of each as soon as it is done
+
+	@param symbols: Ticker symbols
+	@param concurrency: Maximal number of lookups in flight
+	@param lookup: Coroutine function returning result dictionary and http code, defaults to C{source.ticker}
+
+	@return: Asynchronous iterator of rows
+	"""
+	import flaskr.source as source
+	lookup = lookup or _lookup
+	semaphore = asyncio.Semaphore(concurrency)
+
+	async def bounded(symbol: str) -> dict[str, Any]:
+		async with semaphore:
+			start = time.monotonic()
+			if not source.check(symbol):
+				return row(symbol, {"error": "Invalid ticker"}, 400, 0.0)
+			try:
+				data, code = await lookup(symbol)
+			except Exception as e:
+				logger.error(f"Screening of {symbol} failed: {e!r}")
+				data, code = {"error": "Lookup failed"}, 500
+			return row(symbol, data, code, time.monotonic() - start)
+
+	tasks = [asyncio.ensure_future(bounded(symbol)) for symbol in symbols]
+	try:
+		for task in asyncio.as_completed(tasks):
+			yield await task
+	finally:
+		for task in tasks:
+			task.cancel()
+
+
+class Checkpoint:
+	"""
+	Rows of finished tickers, appended to JSON lines file as they finish
+
+	@param path: Path to checkpoint file
+	@type path: str
+
+	@param rows: Finished rows by symbol
+	@type rows: dict[str, dict]
+	"""
+
+	def __init__(self, path: str):
+		"""
+		Load rows of previous run, if there are any. Unfinished last line is ignored
+
+		@param path: Path to checkpoint file
+		"""
+		self.path: str = path
+		self.rows: dict[str, dict] = {}
+		if os.path.exists(path):
+			with open(path) as file:
+				for line in file:
+					try:
+						finished = json.loads(line)
+					except ValueError:
+						continue
+					self.rows[finished["ticker"]] = finished
+		self._file = open(path, "a")
+
+	def add(self, finished: dict[str, Any]) -> None:
+		"""
+		Append row of finished ticker
+
+		@param finished: Row
+		"""
+		self.rows[finished["ticker"]] = finished
+		self._file.write(json.dumps(finished) + "\n")
+		self._file.flush()
+
+	def close(self) -> None:
+		self._file.close()
+
+
+def write(path: str, rows: list[dict[str, Any]]) -> None:
+	"""
+	Write rows as CSV, or as Parquet if path ends with .parquet
+
+	@param path: Path to output
+	@param rows: Rows to write
+
+	@raise RuntimeError: Parquet is requested, but pyarrow is not installed
+	"""
+	if path.endswith(".parquet"):
+		try:
+			import pyarrow
+			import pyarrow.parquet
+		except ImportError:
+			raise RuntimeError("Parquet output needs pyarrow, install it or write .csv instead") from None
+		pyarrow.parquet.write_table(pyarrow.table({column: [r[column] for r in rows] for column in COLUMNS}), path)
+		return
+	with open(path, "w", newline="") as file:
+		writer = csv.DictWriter(file, fieldnames=COLUMNS)
+		writer.writeheader()
+		writer.writerows(rows)
+
+
+class Progress:
+	"""
+	Throughput of screening, reported periodically
+
+	@param total: Number of tickers to screen in this run
+	@type total: int
+
+	@param every: Seconds between reports
+	@type every: float
+	"""
+
+	def __init__(self, total: int, every: float = 10.0, out=sys.stderr):
+		self.total: int = total
+		self.every: float = every
+		self.done: int = 0
+		self.errors: int = 0
+		self._out = out
+		self._start: float = time.monotonic()
+		self._reported: float = self._start
+
+	def add(self, finished: dict[str, Any]) -> None:
+		"""
+		Count finished ticker, and report if it is time to
+
+		@param finished: Row of finished ticker
+		"""
+		self.done += 1
+		if finished.get("error"):
+			self.errors += 1
+		if time.monotonic() - self._reported >= self.every:
+			self.report()
+
+	@property
+	def per_minute(self) -> float:
+		"""
+		@return: Finished tickers per minute
+		"""
+		elapsed = time.monotonic() - self._start
+		return self.done / elapsed * 60 if elapsed > 0 else 0.0
+
+	def report(self) -> None:
+		"""
+		Print progress
+		"""
+		self._reported = time.monotonic()
+		print(f"{self.done}/{self.total} tickers, {self.errors} with errors, "
+		      f"{self.per_minute:.1f} tickers/min", file=self._out)
+
+
+def _init_worker(per_host: Optional[int]) -> None:
+	"""
+	Prepare worker process, with its own loop kept between chunks. Pooled sessions are closed when process exits
+
+	@param per_host: Limit of connections per upstream host
+	"""
+	global _worker_loop
+	import flaskr.source.elements as elements
+	if per_host:
+		elements.Source.pool.limit_per_host = per_host
+	_worker_loop = asyncio.new_event_loop()
+	multiprocessing.util.Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker() -> None:
+	"""
+	Close pooled sessions and loop of worker process
+	"""
+	import flaskr.source as source
+	if _worker_loop is None or _worker_loop.is_closed():
+		return
+	try:
+		_worker_loop.run_until_complete(source.close())
+	finally:
+		_worker_loop.close()
+
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _screen_chunk(args: tuple[list[str], int]) -> list[dict[str, Any]]:
+	"""
+	Screen chunk of symbols in worker process
+
+	@param args: Symbols, and concurrency
+	@return: Rows of chunk
+	"""
+	symbols, concurrency = args
+
+	async def collect() -> list[dict[str, Any]]:
+		return [finished async for finished in screen_iter(symbols, concurrency)]
+
+	return _worker_loop.run_until_complete(collect())
+
+
+def screen(symbols: list[str], output: str, processes: int = 1, concurrency: int = 16, per_host: Optional[int] = None,
+           chunk: int = 50, resume: bool = True, lookup: Optional[Lookup] = None, progress_every: float = 10.0, out=sys.stderr) \
+		-> Progress:
+	"""
+	Screen symbols, and write results
+
+	@param symbols: Ticker symbols
+	@param output: Path to CSV or Parquet output, checkpoint is kept next to it
+	@param processes: Number of worker processes, 1 to screen in this process
+	@param concurrency: Maximal number of lookups in flight per process
+	@param per_host: Limit of connections per upstream host per process, None for default of session pool
+	@param chunk: Number of symbols handed to worker process at once
+	@param resume: Continue from checkpoint of previous run, otherwise start over
+	@param lookup: Coroutine function returning result dictionary and http code, only for single process
+	@param progress_every: Seconds between progress reports
+	@param out: File progress is reported to
+
+	@return: Progress with throughput of run
+	"""
+	path = output + ".checkpoint.jsonl"
+	if not resume and os.path.exists(path):
+		os.remove(path)
+	checkpoint = Checkpoint(path)
+	pending = [symbol for symbol in symbols if symbol not in checkpoint.rows]
+	if len(pending) < len(symbols):
+		logger.info(f"Resuming, {len(symbols) - len(pending)} tickers already screened")
+	progress = Progress(len(pending), progress_every, out)
+
+	def finish(finished: dict[str, Any]) -> None:
+		checkpoint.add(finished)
+		progress.add(finished)
+
+	try:
+		if processes <= 1:
+			_init_worker(per_host)
+
+			async def run() -> None:
+				async for finished in screen_iter(pending, concurrency, lookup):
+					finish(finished)
+
+			try:
+				_worker_loop.run_until_complete(run())
+			finally:
+				_close_worker()
+		else:
+			chunks = [(pending[i:i + chunk], concurrency) for i in range(0, len(pending), chunk)]
+			with multiprocessing.get_context("spawn").Pool(processes, _init_worker, (per_host,)) as pool:
+				for rows in pool.imap_unordered(_screen_chunk, chunks):
+					for finished in rows:
+						finish(finished)
+				# Workers exit on their own, so their finalizers close pooled sessions
+				pool.close()
+				pool.join()
+	finally:
+		checkpoint.close()
+
+	write(output, [checkpoint.rows[symbol] for symbol in symbols if symbol in checkpoint.rows])
+	progress.report()
+	return progress
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("symbols", help="File with symbols, one per line or in first column of CSV")
+	parser.add_argument("output", help="Output file, .csv or .parquet")
+	parser.add_argument("--processes", type=int, default=1, help="Worker processes, parsing runs on all of them")
+	parser.add_argument("--concurrency", type=int, default=16, help="Lookups in flight per process")
+	parser.add_argument("--per-host", type=int, default=None, help="Connections per upstream host per process")
+	parser.add_argument("--chunk", type=int, default=50, help="Symbols handed to worker process at once")
+	parser.add_argument("--restart", action="store_true", help="Ignore checkpoint of previous run")
+	parser.add_argument("--store", default=None, help="Payload store database, see PAYLOAD_STORE_PATH")
+	parser.add_argument("--offline", action="store_true", help="Serve only from payload store, without network")
+	parser.add_argument("--upstream", default=None, help="Base url of local stub to call instead of upstream")
+	args = parser.parse_args(argv)
+
+	# Sources read configuration when they are imported, also in spawned workers
+	if args.store:
+		os.environ["PAYLOAD_STORE_PATH"] = args.store
+	if args.offline:
+		os.environ["PAYLOAD_STORE_OFFLINE"] = "1"
+	if args.upstream:
+		os.environ["UPSTREAM_BASE_URL"] = args.upstream
+
+	logging.basicConfig(format='%(name)s - %(levelname)s : %(message)s')
+	logger.setLevel(logging.ERROR)
+	symbols = read_symbols(args.symbols)
+	start = time.monotonic()
+	progress = screen(symbols, args.output, processes=args.processes, concurrency=args.concurrency,
+	                  per_host=args.per_host, chunk=args.chunk, resume=not args.restart)
+	print(f"Screened {progress.done} tickers in {time.monotonic() - start:.1f}s, "
+	      f"{progress.per_minute:.1f} tickers/min, results in {args.output}")
+
+
+if __name__ == '__main__':
+	main()
@@ -1,11 +1,18 @@
 """
 A collection of functions to compute investing calculations from Rule #1.
+
+Functions ending with C{_batch} are array-in / array-out variants of scalar functions, for many tickers
+at once. Missing values are NaN, and special cases of scalar functions are handled with masks, so where
+scalar function returns None, batch variant has NaN.
 """
 
 from __future__ import division
 import math
 from typing import Optional
 
+import numpy as np
+from numpy.typing import ArrayLike
+
 
 def compound_annual_growth_rate(start_balance: int, end_balance: int, years: int) -> Optional[float]:
 	"""
@@ -42,21 +49,19 @@ def compound_annual_growth_rate(start_balance: int, end_balance: int, years: int
 	return result
 
 
-def slope_of_best_fit_line_for_data(data: list):
+def slope_of_best_fit_line_for_data(data: list) -> Optional[float]:
 	"""
 	Returns the slope of the line of best fit for a set of data points.
 
-	@param data: A list of data points to plot a best-fit line on.
+	@param data: A list of data points to plot a best-fit line on. Missing points (None) are skipped.
 
 	
-	@return: Returns the slope of the best fit line.
+	@return: Returns the slope of the best fit line, rounded to 2 places. None for less than 2 points.
 	"""
 	if not data or len(data) < 2:
 		return None
-
-
-#  m,b = np.polyfit(range(0, len(data)), data, 1)
-#  return m
+	slope, _ = least_squares_batch(data)
+	return None if np.isnan(slope) else round(float(slope), 2)
 
 
 def max_position_size(share_price, trade_volume) -> (Optional[int], Optional[int]):
@@ -79,7 +84,7 @@ def max_position_size(share_price, trade_volume) -> (Optional[int], Optional[int
 	return max_position, max_shares
 
 
-def payback_time(market_cap: int, net_income: int, estimated_growth_rate: int) -> int:
+def payback_time(market_cap: int, net_income: int, estimated_growth_rate: int, max_years: int = 100) -> int:
 	"""
 	Determine the amount of years to get your money back if you were to buy the
 	entire company at the current market cap given the TTM net income and
@@ -88,31 +93,53 @@ def payback_time(market_cap: int, net_income: int, estimated_growth_rate: int) -
 	For more details, read PaybackTime by Phil Town for information on this
 	calculation. Basically it's the summation of each year future value (FV
 	function on Excel).
+	
+	Summation is a geometric series, so instead of adding year by year, years are solved for:
+	N * (1+g) * ((1+g)^n - 1) / g >= M  gives  n = ceil(log(1 + M*g / (N*(1+g))) / log(1+g))
 
 	@param market_cap: The current market capitalization for the company.
 	@param net_income: The trailing twelve month (TTM) net income for the company.
 	@param estimated_growth_rate: A conservative estimated growth rate. (Typically the
 		minimum of a professional growth estimate and the historical growth rate
 		of equity/book-value-per-share.)
+	@param max_years: Payback taking longer than that is considered never, as guard against
+		tiny incomes or growth rates.
 
 	
 	@return: Returns the number of years (rounded up) for how many years are needed to
 		receive a 100% return on your investment based on the company's income. If
-		any of the inputs are invalid, returns -1.
+		any of the inputs are invalid, or payback takes more than max_years, returns -1.
 		
 	"""
-	yearly_income = net_income
-	total_payback = 0
-	years = 0
-	while total_payback < market_cap:
-		if yearly_income <= 0 or estimated_growth_rate <= 0:
-			years = -1
-			break
-	yearly_income += (yearly_income * estimated_growth_rate)
-	total_payback += yearly_income
-	years += 1
+	if market_cap is None or net_income is None or estimated_growth_rate is None:
+		return -1
+	if market_cap <= 0:
+		return 0
+	if net_income <= 0 or estimated_growth_rate <= 0:
+		return -1
+	growth = 1.0 + estimated_growth_rate
+	years = math.ceil(math.log1p(market_cap * estimated_growth_rate / (net_income * growth)) / math.log(growth))
+	# Logarithms may land just off whole year, when payback is reached exactly at its end, so both
+	# neighbouring years are checked with the summation itself
+	if years > 1 and _payback(net_income, estimated_growth_rate, years - 1) >= market_cap:
+		years -= 1
+	elif _payback(net_income, estimated_growth_rate, years) < market_cap:
+		years += 1
+	return years if years <= max_years else -1
+
+
+def _payback(net_income: float, estimated_growth_rate: float, years: int) -> float:
+	"""
+	Sum of incomes of following years, growing at rate
 	
-	return years
+	@param net_income: Current yearly income
+	@param estimated_growth_rate: Growth rate of income
+	@param years: Number of years
+	
+	@return: Summed income
+	"""
+	growth = 1.0 + estimated_growth_rate
+	return net_income * growth * (math.pow(growth, years) - 1.0) / estimated_growth_rate
 
 
 def margin_of_safety_price(current_eps: float, estimated_growth_rate: float,
@@ -269,3 +296,238 @@ def calculate_roic(net_income: int, cash: int, long_term_debt: int, stockholder_
 		return None
 	
 	return (net_income / (stockholder_equity + long_term_debt - cash)) * 100
+
+
+def _array(values: ArrayLike) -> np.ndarray:
+	"""
+	Convert values to float array, None becomes NaN
+	
+	@param values: Scalar, list or array
+	@return: Float array
+	"""
+	return np.asarray(values, dtype=float)
+
+
+def _missing(*arrays: np.ndarray) -> np.ndarray:
+	"""
+	Mask of positions where any of arrays is missing or zero, as where scalar functions check C{not value}
+	
+	@param arrays: Float arrays
+	@return: Boolean mask
+	"""
+	mask = np.zeros(np.broadcast(*arrays).shape, dtype=bool)
+	for array in arrays:
+		mask |= np.isnan(array) | (array == 0)
+	return mask
+
+
+def compound_annual_growth_rate_batch(start_balance: ArrayLike, end_balance: ArrayLike,
+                                      years: ArrayLike) -> np.ndarray:
+	"""
+	Batch variant of C{compound_annual_growth_rate}
+	
+	@param start_balance: Start balances
+	@param end_balance: Amounts at end of timeframe
+	@param years: Numbers of years in timespan
+	
+	@return: Compound annual growth rates in percent, rounded to 2 places. NaN where it can not be calculated
+	"""
+	start, end, years = _array(start_balance), _array(end_balance), _array(years)
+	invalid = np.isnan(end) | _missing(start, years)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		difference = end / start
+		# One, and only one, of the numbers is negative: approximation, as in scalar variant
+		difference = np.where(difference > 0, difference,
+		                      np.where(start < end, (end - 2.0 * start) / -start, (start - end) / start))
+		result = np.round((np.power(difference, 1.0 / years) - 1.0) * 100, 2)
+	result = np.where(end < 0, -result, result)
+	return np.where(invalid, np.nan, result)
+
+
+def calculate_future_eps_batch(current_eps: ArrayLike, estimated_growth_rate: ArrayLike,
+                               time_horizon: int = 10) -> np.ndarray:
+	"""
+	Batch variant of C{calculate_future_eps}
+	
+	@param current_eps: Current Earnings Per Share values
+	@param estimated_growth_rate: Conservative estimated growth rates, as decimals
+	@param time_horizon: The desired time horizon to calculate for. Defaults to 10.
+	
+	@return: Estimated future earnings-per-share values, NaN where eps or growth rate is missing or zero
+	"""
+	eps, growth = _array(current_eps), _array(estimated_growth_rate)
+	result = eps * np.power(1.0 + growth, time_horizon)
+	return np.where(_missing(eps, growth), np.nan, result)
+
+
+def calculate_future_pe_batch(estimated_growth_rate: ArrayLike, historical_low_pe: ArrayLike,
+                              historical_high_pe: ArrayLike) -> np.ndarray:
+	"""
+	Batch variant of C{calculate_future_pe}
+	
+	@param estimated_growth_rate: Conservative estimated growth rates, as decimals
+	@param historical_low_pe: 5-year lows of price-to-earnings ratio
+	@param historical_high_pe: 5-year highs of price-to-earnings ratio
+	
+	@return: Estimated future price-to-earnings ratios, NaN where any input is missing or zero
+	"""
+	growth, low, high = _array(estimated_growth_rate), _array(historical_low_pe), _array(historical_high_pe)
+	result = np.minimum((low + high) / 2.0, 2.0 * (growth * 100.0))
+	return np.where(_missing(growth, low, high), np.nan, result)
+
+
+def calculate_estimated_future_price_batch(future_eps: ArrayLike, future_pe: ArrayLike) -> np.ndarray:
+	"""
+	Batch variant of C{calculate_estimated_future_price}
+	
+	@param future_eps: Future earnings-per-share values
+	@param future_pe: Future price-to-earnings values
+	
+	@return: Estimated future prices, NaN where any input is missing or zero
+	"""
+	eps, pe = _array(future_eps), _array(future_pe)
+	return np.where(_missing(eps, pe), np.nan, eps * pe)
+
+
+def calculate_sticker_price_batch(future_price: ArrayLike, time_horizon: int = 10,
+                                  rate_of_return: float = 0.15) -> np.ndarray:
+	"""
+	Batch variant of C{calculate_sticker_price}
+	
+	@param future_price: Estimated future prices
+	@param time_horizon: The desired time horizon to calculate for. Defaults to 10.
+	@param rate_of_return: The desired minimum rate of return.
+	
+	@return: Sticker prices, NaN where future price is missing or zero
+	"""
+	price = _array(future_price)
+	return np.where(_missing(price), np.nan, price / math.pow(1.0 + rate_of_return, time_horizon))
+
+
+def calculate_margin_of_safety_batch(sticker_price: ArrayLike, margin_of_safety: float = 0.5) -> np.ndarray:
+	"""
+	Batch variant of C{calculate_margin_of_safety}
+	
+	@param sticker_price: Sticker prices
+	@param margin_of_safety: The desired margin of safety as a percentage. Defaults to 0.5 (i.e. 50%).
+	
+	@return: Margin of safety prices, NaN where sticker price is missing or zero
+	"""
+	price = _array(sticker_price)
+	return np.where(_missing(price), np.nan, price * (1 - margin_of_safety))
+
+
+def margin_of_safety_price_batch(current_eps: ArrayLike, estimated_growth_rate: ArrayLike,
+                                 historical_low_pe: ArrayLike, historical_high_pe: ArrayLike) \
+		-> (np.ndarray, np.ndarray):
+	"""
+	Batch variant of C{margin_of_safety_price}
+	
+	@param current_eps: Current Earnings Per Share values
+	@param estimated_growth_rate: Conservative estimated growth rates, as decimals
+	@param historical_low_pe: 5-year lows of price-to-earnings ratio
+	@param historical_high_pe: 5-year highs of price-to-earnings ratio
+	
+	@return: Margin of safety prices, and sticker prices. NaN where scalar variant returns None
+	"""
+	future_eps = calculate_future_eps_batch(current_eps, estimated_growth_rate)
+	future_pe = calculate_future_pe_batch(estimated_growth_rate, historical_low_pe, historical_high_pe)
+	future_price = calculate_estimated_future_price_batch(future_eps, future_pe)
+	sticker_price = calculate_sticker_price_batch(future_price)
+	return calculate_margin_of_safety_batch(sticker_price), sticker_price
+
+
+def calculate_roic_batch(net_income: ArrayLike, cash: ArrayLike, long_term_debt: ArrayLike,
+                         stockholder_equity: ArrayLike) -> np.ndarray:
+	"""
+	Batch variant of C{calculate_roic}
+	
+	@param net_income: Net incomes
+	@param cash: Current cash
+	@param long_term_debt: Long term debts
+	@param stockholder_equity: Equities of stockholders
+	
+	@return: Roic values, NaN where any input is missing or zero, or where invested capital is zero
+	"""
+	income, cash, debt, equity = _array(net_income), _array(cash), _array(long_term_debt), _array(stockholder_equity)
+	invested = equity + debt - cash
+	with np.errstate(divide="ignore", invalid="ignore"):
+		result = (income / invested) * 100
+	return np.where(_missing(income, cash, debt, equity, invested), np.nan, result)
+
+
+def payback_time_batch(market_cap: ArrayLike, net_income: ArrayLike, estimated_growth_rate: ArrayLike,
+                       max_years: int = 100) -> np.ndarray:
+	"""
+	Batch variant of C{payback_time}
+	
+	@param market_cap: Current market capitalizations
+	@param net_income: Trailing twelve month net incomes
+	@param estimated_growth_rate: Conservative estimated growth rates, as decimals
+	@param max_years: Payback taking longer than that is considered never
+	
+	@return: Numbers of years, -1 where inputs are invalid or payback takes more than max_years
+	"""
+	cap, income, growth = _array(market_cap), _array(net_income), _array(estimated_growth_rate)
+	invalid = np.isnan(cap) | np.isnan(income) | np.isnan(growth) | \
+		((cap > 0) & ((income <= 0) | (growth <= 0)))
+	with np.errstate(divide="ignore", invalid="ignore"):
+		rate = 1.0 + growth
+		years = np.ceil(np.log1p(cap * growth / (income * rate)) / np.log(rate))
+		previous = np.maximum(years - 1, 0)
+		reached = income * rate * (np.power(rate, previous) - 1.0) / growth >= cap
+		short = income * rate * (np.power(rate, years) - 1.0) / growth < cap
+	years = np.where((years > 1) & reached, years - 1, np.where(short, years + 1, years))
+	years = np.where(cap <= 0, 0, years)
+	years = np.where(invalid | ~(years <= max_years), -1, years)
+	return years.astype(int)
+
+
+def least_squares_batch(series: ArrayLike) -> (np.ndarray, np.ndarray):
+	"""
+	Slopes and coefficients of determination (R²) of least squares lines, fitted along last axis at once,
+	f.ex for matrix of histories of many tickers. Points are years 0, 1, 2..., missing ones are NaN and skipped
+	
+	@param series: Values, last axis is time
+	
+	@return: Slopes per year, and R² of fits. NaN where series has less than 2 points.
+		Flat series has R² of 1, as line fits it perfectly
+	"""
+	y = _array(series)
+	known = ~np.isnan(y)
+	x = np.broadcast_to(np.arange(y.shape[-1], dtype=float), y.shape)
+	points = known.sum(axis=-1)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		# Centered sums keep precision for large values, f.ex revenue
+		dx = np.where(known, x - (np.where(known, x, 0.0).sum(axis=-1) / points)[..., np.newaxis], 0.0)
+		dy = np.where(known, y - (np.where(known, y, 0.0).sum(axis=-1) / points)[..., np.newaxis], 0.0)
+		sxx = (dx * dx).sum(axis=-1)
+		sxy = (dx * dy).sum(axis=-1)
+		syy = (dy * dy).sum(axis=-1)
+		slope = sxy / sxx
+		r_squared = sxy * sxy / (sxx * syy)
+	scale = (np.where(known, y, 0.0) ** 2).sum(axis=-1)
+	r_squared = np.where(syy <= 1e-24 * scale, 1.0, r_squared)
+	invalid = points < 2
+	return np.where(invalid, np.nan, slope), np.where(invalid, np.nan, r_squared)
+
+
+def trends(histories: list[Optional[list]]) -> list[tuple[Optional[float], Optional[float]]]:
+	"""
+	Slopes and R² of several histories of one ticker, in single least squares pass. Histories are aligned
+	by their most recent value, so shorter ones are missing their oldest years
+	
+	@param histories: Yearly values, oldest first, None for missing history
+	
+	@return: Slope and R² for every history, rounded to 2 and 4 places. None and None for missing ones
+	"""
+	width = max((len(history) for history in histories if history), default=0)
+	if width < 2:
+		return [(None, None) for _ in histories]
+	matrix = np.full((len(histories), width), np.nan)
+	for i, history in enumerate(histories):
+		if history:
+			matrix[i, width - len(history):] = _array(history)
+	slopes, r_squared = least_squares_batch(matrix)
+	return [(None, None) if np.isnan(slope) else (round(float(slope), 2), round(float(r2), 4))
+	        for slope, r2 in zip(slopes, r_squared)]
@@ -1,53 +1,347 @@
 """
 Get data from every source with one call
 
+Modules of sources, and calculations with numpy, are imported on first lookup, not with this package, so
+app starts and serves pages without them.
+
 @see ticker: This function returns data
 """
+from __future__ import annotations
+
 import logging
-import json
 import asyncio
 import re
-from typing import Optional
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Optional
 
-from flaskr.source.sources import *
+from flaskr.source.cache import ResultCache
+from flaskr.source.flight import SingleFlight
+from flaskr.source.universe import SymbolUniverse
+from flaskr.source.warmer import CacheWarmer, Popularity
 import flaskr.source.elements as elements
-import flaskr.source.RuleOneCalcs as RuleOne
+import flaskr.source.planner as planner
+
+if TYPE_CHECKING:
+	from flaskr.source.sources import *
 
 logger = logging.getLogger("IsThisStockGood")
 
 
-async def ticker(symbol: str) -> (dict, int):
+result_cache = ResultCache()
+ticker_flights = SingleFlight()
+universe = SymbolUniverse.from_env()
+
+_SYMBOL_PATTERN = re.compile(r"[A-Za-z,.\-]{1,6}")
+"""Syntax of symbol, compiled once"""
+
+DEADLINE: float = 6.0
+"""Seconds after which result is returned with sources that finished by then, others finish in background"""
+
+SOURCE_TIMEOUTS: dict[str, float] = {
+	"MSNMoney": 15.0,
+	"StockRow": 15.0,
+	"YahooAnalysis": 15.0,
+	"YahooQuoteSummary": 15.0,
+}
+"""Seconds after which single source is abandoned, and its error is set"""
+
+WARMER_TOP_N: int = 50
+"""Number of most popular symbols kept warm in cache"""
+
+WARMER_LEAD_TIME: float = 30 * 60
+"""Seconds before expiry of result, when it is refreshed by warmer"""
+
+WARMER_PRICE_LEAD_TIME: float = 2 * 60
+"""Seconds before price of result goes stale, when it is refreshed by warmer"""
+
+WARMER_BUSY_LOOKUPS: int = 4
+"""Number of lookups in flight, at which warmer pauses to not compete with interactive traffic"""
+
+FAVOURITES_CONCURRENCY: int = 8
+"""Maximal number of favourite tickers looked up at once, every lookup calls several sources"""
+
+UPSTREAM_URLS: tuple[str, ...] = (
+	"https://services.bingapis.com/",
+	"https://stockrow.com/",
+	"https://finance.yahoo.com/",
+	"https://query1.finance.yahoo.com/",
+)
+"""Urls on hosts of sources, connections to them are opened in advance by L{preconnect}"""
+
+_background: set[asyncio.Task] = set()
+
+
+async def ticker(symbol: str, deadline: Optional[float] = None, fields: Optional[list[str]] = None,
+                 count: bool = True) -> (dict, int):
 	"""
 	Fetch data for company with provided ticker / symbol
 	
-	After data is fetched for all sources, is checked for errors and parsed to class & returned
+	Result is served from cache when possible. If only its price is stale, just the price is fetched again.
+	Otherwise data is fetched for needed sources, is checked for errors and parsed to class & returned.
+	Concurrent calls for the same symbol and fields share one lookup
+	
+	Sources that did not finish before deadline are left null, and their state is in C{sources} block of result.
+	They finish in background, and complete result is cached then
 	
 	@param symbol: Ticker / Symbol of company
+	@param deadline: Seconds to wait for sources, defaults to C{DEADLINE}
+	@param fields: Fields of result to return, only sources and modules they depend on are fetched. None for all
+	@param count: Count lookup as request for popularity of symbol, False for bulk lookups like screening
 	
 	@return: dictionary with data, and code for http response
+	
+	@raise ValueError: Some of fields is unknown
+	"""
+	plan = planner.plan(fields) if fields else planner.FULL
+	if count:
+		popularity.hit(symbol)
+	result, code = await ticker_flights.run(plan.key(symbol), lambda: _lookup(symbol, deadline or DEADLINE, plan))
+	return plan.project(result.to_dict()), code
+
+
+async def warm(symbol: str) -> Optional[str]:
+	"""
+	Refresh cached result of symbol, if it expires soon. Used by cache warmer, it is not counted as request
+	
+	@param symbol: Ticker / Symbol of company
+	
+	@return: "full" if whole result was fetched again, "price" if only price was, None if nothing had to be
+	"""
+	entry = result_cache.peek(symbol)
+	now = time.monotonic()
+	if entry is not None and entry.code == 404:
+		return None
+	if entry is None or entry.fundamentals_expire - now < WARMER_LEAD_TIME:
+		# Own key, so requests meanwhile are served by entry still in cache, not by this slower refresh
+		deadline = max(SOURCE_TIMEOUTS.values())
+		await ticker_flights.run(("warm", symbol), lambda: _lookup(symbol, deadline, refresh=True))
+		return "full"
+	if entry.price_expire - now < WARMER_PRICE_LEAD_TIME and not entry.result.error:
+		await _refresh_price(symbol, entry.result)
+		return "price"
+	return None
+
+
+popularity = Popularity()
+warmer = CacheWarmer(popularity, warm, busy=lambda: len(ticker_flights) >= WARMER_BUSY_LOOKUPS, top_n=WARMER_TOP_N)
+
+
+async def _lookup(symbol: str, deadline: float, plan: planner.Plan = planner.FULL, refresh: bool = False) \
+		-> (elements.Result, int):
+	"""
+	Get result from cache, or fetch and assemble it. Complete result in cache serves any plan
+	
+	@param symbol: Ticker / Symbol of company
+	@param deadline: Seconds to wait for sources
+	@param plan: Plan of fields, and sources they need
+	@param refresh: Fetch result even if it is in cache
+	
+	@return: Result, and code for http response
+	"""
+	entry, key = None, symbol
+	if not refresh:
+		# Complete result is only peeked at for projected plan, so that lookup is counted once, as hit or miss
+		if plan.full or result_cache.peek(symbol) is not None:
+			entry = result_cache.get(symbol)
+		if entry is None and not plan.full:
+			key = plan.key(symbol)
+			entry = result_cache.get(key)
+	if entry is not None:
+		if not entry.price_fresh and not entry.result.error and "current_price" in plan.fields:
+			await _refresh_price(key, entry.result)
+		return entry.result, entry.code
+	
+	sources, late = await _fetch(symbol, deadline, plan)
+	result, code = _assemble(symbol, *sources)
+	_cache(key, sources, result, code, partial=bool(late))
+	if late:
+		task = asyncio.ensure_future(_complete(key, sources, late))
+		_background.add(task)
+		task.add_done_callback(_background.discard)
+	return result, code
+
+
+def _sources(symbol: str, plan: planner.Plan = planner.FULL) -> list[elements.Source]:
+	"""
+	Create all sources for symbol, those not needed by plan are marked as skipped
+	
+	@param symbol: Ticker / Symbol of company
+	@param plan: Plan of fields, and sources they need
+	
+	@return: MSNMoney, StockRow, YahooAnalysis and YahooQuoteSummary sources
+	"""
+	from flaskr.source.sources import MSNMoney, StockRow, YahooAnalysis, YahooQuoteSummary
+	sources = [MSNMoney(symbol), StockRow(symbol), YahooAnalysis(symbol),
+	           YahooQuoteSummary(symbol, list(plan.sources.get("YahooQuoteSummary", ())))]
+	for src in sources:
+		if not plan.needs(type(src).__name__):
+			src.status = "skipped"
+	return sources
+
+
+async def _fetch(symbol: str, deadline: float, plan: planner.Plan = planner.FULL) \
+		-> (list[elements.Source], dict[int, asyncio.Task]):
+	"""
+	Fetch sources needed by plan for symbol concurrently, and wait for them until deadline
+	
+	@param symbol: Ticker / Symbol of company
+	@param deadline: Seconds to wait for sources
+	@param plan: Plan of fields, and sources they need
+	
+	@return: Sources, the late ones replaced with empty sources with error, and tasks of late sources by index
+	"""
+	sources = _sources(symbol, plan)
+	tasks = {i: asyncio.ensure_future(_bounded(src)) for i, src in enumerate(sources) if src.status != "skipped"}
+	if not tasks:
+		return sources, {}
+	try:
+		await asyncio.wait(tasks.values(), timeout=deadline)
+	except asyncio.CancelledError:
+		await _cancel(tasks.values())
+		raise
+	
+	late: dict[int, asyncio.Task] = {}
+	placeholders = _sources(symbol, plan)
+	for i, task in tasks.items():
+		if task.done():
+			sources[i] = task.result()
+		else:
+			late[i] = task
+			sources[i] = placeholders[i]
+			sources[i].error = (504, "Source did not respond before deadline")
+			sources[i].status = "late"
+	return sources, late
+
+
+async def _bounded(src: elements.Source) -> elements.Source:
+	"""
+	Fetch source within its timeout, timeout and failures are set as error of source
+	
+	@param src: Source to fetch
+	
+	@return: Fetched source
+	"""
+	name = type(src).__name__
+	start = time.monotonic()
+	try:
+		if name == "MSNMoney":
+			await asyncio.wait_for(_fetch_msn_money(src), SOURCE_TIMEOUTS.get(name))
+		else:
+			await asyncio.wait_for(src.fetch(), SOURCE_TIMEOUTS.get(name))
+		src.status = "error" if src.error else "ok"
+	except asyncio.TimeoutError:
+		logger.warning(f"{name} timed out for {src.symbol}")
+		src.error = (504, "Source timed out")
+		src.status = "timeout"
+	except Exception as e:
+		logger.error(f"{name} failed for {src.symbol}: {e!r}")
+		src.error = (502, "Source request failed")
+		src.status = "error"
+	src.elapsed = time.monotonic() - start
+	return src
+
+
+async def _fetch_msn_money(msn_money: MSNMoney) -> MSNMoney:
+	"""
+	Id of asset has to be acquired before data of MSNMoney is fetched
+	
+	@param msn_money: MSNMoney source
+	
+	@return: Fetched source
+	"""
+	await msn_money.set_id()
+	return await msn_money.fetch()
+
+
+async def _complete(key: str, sources: list[elements.Source], late: dict[int, asyncio.Task]) -> None:
+	"""
+	Wait for late sources in background, and cache complete result
+	
+	@param key: Key of result in cache, symbol with fields for partial plans
+	@param sources: Sources of partial result
+	@param late: Tasks of late sources by index
+	"""
+	try:
+		await asyncio.wait(late.values())
+	except asyncio.CancelledError:
+		await _cancel(late.values())
+		raise
+	sources = list(sources)
+	for i, task in late.items():
+		if task.cancelled() or task.exception() is not None:
+			logger.warning(f"Late source of {key} failed: {None if task.cancelled() else task.exception()!r}")
+			return
+		sources[i] = task.result()
+	result, code = _assemble(sources[0].symbol, *sources)
+	_cache(key, sources, result, code, partial=False)
+	logger.debug(f"Late sources of {key} finished, result is complete")
+
+
+async def _cancel(tasks: Iterable[asyncio.Task]) -> None:
+	"""
+	Cancel tasks, and wait for them to finish, so their exceptions are retrieved
+	
+	@param tasks: Tasks to cancel
+	"""
+	tasks = list(tasks)
+	for task in tasks:
+		task.cancel()
+	await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _cache(key: str, sources: list[elements.Source], result: elements.Result, code: int, partial: bool) -> None:
 	"""
-	msn_money = await MSNMoney.setup(symbol)
-	"""
-	msn_money = await msn_money.fetch()
-	stock_row = await StockRow(symbol).fetch()
-	yahoo_analysis = await YahooAnalysis(symbol).fetch()
-	yahoo_quote_summary = await YahooQuoteSummary(symbol,
-	                                              ["assetProfile", "incomeStatementHistory",
-	                                               "balanceSheetHistory", "financialData",
-	                                               "balanceSheetHistory", "earnings",
-	                                               "defaultKeyStatistics"]
-	                                              ).fetch()
-	"""
-	msn_money, stock_row, yahoo_analysis, yahoo_quote_summary = await asyncio.gather(
-		msn_money.fetch(), StockRow(symbol).fetch(), YahooAnalysis(symbol).fetch(),
-		YahooQuoteSummary(symbol,
-		                  ["assetProfile", "incomeStatementHistory",
-		                   "balanceSheetHistory", "financialData",
-		                   "balanceSheetHistory", "earnings",
-		                   "defaultKeyStatistics"]
-		                  ).fetch()
-	)
+	Put result in cache. Partial and error results are kept only shortly, results of failed sources are not kept
 	
+	@param key: Key of result in cache, symbol with fields for partial plans
+	@param sources: Sources of result
+	@param result: Assembled result
+	@param code: Http code of result
+	@param partial: If some sources did not finish yet
+	"""
+	fetched = [src for src in sources if src.status != "skipped"]
+	if fetched and all(src.error for src in fetched):
+		if code == 404:
+			result_cache.put(key, result, code, error=True)
+	else:
+		result_cache.put(key, result, code, error=partial)
+
+
+async def _refresh_price(key: str, result: elements.Result) -> None:
+	"""
+	Fetch only current price of cached result and apply colors again
+	
+	@param key: Key of result in cache, symbol with fields for partial plans
+	@param result: Cached result
+	"""
+	from flaskr.source.sources import YahooQuoteSummary
+	symbol = result.ticker
+	quote_summary = YahooQuoteSummary(symbol, ["financialData"])
+	quote_summary.max_age = 0  # Stored payload may be older than cached price
+	quote_summary = await _bounded(quote_summary)
+	if quote_summary.error or quote_summary.data.currentPrice is None:
+		logger.warning(f"Price refresh of {symbol} failed: {quote_summary.error}")
+		return
+	result.current_price.value = quote_summary.data.currentPrice
+	result.colour()
+	result.changed()
+	result_cache.price_refreshed(key)
+
+
+def _assemble(symbol: str, msn_money: MSNMoney, stock_row: StockRow, yahoo_analysis: YahooAnalysis,
+              yahoo_quote_summary: YahooQuoteSummary) -> (elements.Result, int):
+	"""
+	Check sources for errors and parse their data to result
+	
+	@param symbol: Ticker / Symbol of company
+	@param msn_money: Fetched MSNMoney source
+	@param stock_row: Fetched StockRow source
+	@param yahoo_analysis: Fetched YahooAnalysis source
+	@param yahoo_quote_summary: Fetched YahooQuoteSummary source
+	
+	@return: Result, and code for http response
+	"""
+	import flaskr.source.RuleOneCalcs as RuleOne
 	result = elements.Result()
 	result.ticker = symbol
 	
@@ -63,13 +357,20 @@ async def ticker(symbol: str) -> (dict, int):
 	if yahoo_quote_summary.error:
 		logger.warning(f"Yahoo Quote Summary Error: {yahoo_quote_summary.error}")
 	
-	if msn_money.error and stock_row.error and yahoo_analysis.error and yahoo_quote_summary.error:
-		if msn_money.error[0] == stock_row.error[0] == yahoo_quote_summary.error[0] == yahoo_analysis.error[0] == 404:
+	result.sources = {type(src).__name__: src.state() for src in
+	                  (msn_money, stock_row, yahoo_analysis, yahoo_quote_summary)}
+	
+	fetched = [src for src in (msn_money, stock_row, yahoo_analysis, yahoo_quote_summary) if src.status != "skipped"]
+	if fetched and all(src.error for src in fetched):
+		if all(src.error[0] == 404 for src in fetched):
 			code = 404
 			error = "Ticker not found"
+		elif all(src.error[0] == 504 for src in fetched):
+			code = 504
+			error = "Sources did not respond in time"
 			
 		result.error = error
-		return json.loads(result.to_json()), code
+		return result, code
 	
 	margin_of_safety_price, sticker_price = _calculate_margin_of_safety_price(
 		stock_row.data.equity_growth_rates,
@@ -104,47 +405,135 @@ async def ticker(symbol: str) -> (dict, int):
 	if stock_row.data.free_cash_flow_growth_rates is not None:
 		result.cash = [elements.Property(elem) for elem in stock_row.data.free_cash_flow_growth_rates]
 	
+	trends = RuleOne.trends([stock_row.data.roic, stock_row.data.equity, stock_row.data.eps, stock_row.data.revenue,
+	                         stock_row.data.free_cash_flow])
+	result.roic_trend, result.equity_trend, result.eps_trend, result.sales_trend, result.cash_trend = (
+		elements.Trend(slope, r_squared) for slope, r_squared in trends)
+	
 	result.free_cash_flow.value = stock_row.data.recent_free_cash_flow
 	result.debt_payoff_time.value = stock_row.data.debt_payoff_time
 	result.debt_equity_ratio.value = stock_row.data.debt_equity_ratio
 	
 	result.sticker_price.value = sticker_price
 	result.margin_of_safety_price.value = margin_of_safety_price
+	result.payback_time.value = _calculate_payback_time(
+		stock_row.data.equity_growth_rates,
+		yahoo_analysis.data.five_year_growth_rate,
+		yahoo_quote_summary.data.marketCap,
+		yahoo_quote_summary.data.netIncome)
 	
 	result.error = error
 	
 	result.colour()
 	
-	return json.loads(result.to_json()), code
+	return result, code
 
 
 async def favourites(symbols: list) -> dict[str, dict]:
+	"""
+	Fetch data for all favourite tickers
+	
+	@param symbols: Ticker symbols
+	
+	@return: Dictionary of symbols and their data, in order of symbols
+	"""
 	result: dict[str, dict] = {}
+	async for symbol, data, code in favourites_stream(symbols):
+		result[symbol] = data
+	return {s: result[s] for s in symbols}
+
+
+async def favourites_stream(symbols: list, concurrency: Optional[int] = None) -> AsyncIterator[tuple[str, dict, int]]:
+	"""
+	Fetch data for favourite tickers, yielding each one as soon as its lookup finishes
+	
+	At most C{concurrency} lookups run at once, so long lists do not open too many connections.
+	Lookups still running when iteration is abandoned are cancelled
+	
+	@param symbols: Ticker symbols, duplicates are looked up once
+	@param concurrency: Maximal number of lookups at once, defaults to C{FAVOURITES_CONCURRENCY}
+	
+	@return: Asynchronous iterator of symbol, as provided, its data, and code for http response
+	"""
+	semaphore = asyncio.Semaphore(concurrency or FAVOURITES_CONCURRENCY)
+	
+	async def bounded(symbol: str) -> tuple[str, dict, int]:
+		async with semaphore:
+			data, code = await ticker(symbol.upper())
+		return symbol, data, code
+	
+	symbols = list(dict.fromkeys(symbols))
+	tasks = [asyncio.ensure_future(bounded(symbol)) for symbol in symbols if check(symbol)]
+	try:
+		for symbol in symbols:
+			if not check(symbol):
+				yield symbol, {"error": "Invalid ticker"}, 400
+		for task in asyncio.as_completed(tasks):
+			yield await task
+	finally:
+		for task in tasks:
+			task.cancel()
+
+
+def preload() -> None:
+	"""
+	Import modules of sources, with libraries they need, in advance, so first lookup does not wait for them
+	"""
+	import flaskr.source.sources
+	import flaskr.source.RuleOneCalcs
+	import lxml.html
+
+
+async def prefetch(symbols: list, concurrency: Optional[int] = None) -> dict[str, Optional[int]]:
+	"""
+	Fetch results of symbols into cache, f.ex of hot tickers when instance starts. They are not counted as requests
+	
+	@param symbols: Ticker symbols, invalid ones are skipped
+	@param concurrency: Maximal number of lookups at once, defaults to C{FAVOURITES_CONCURRENCY}
+	
+	@return: Code for http response of cached result of every symbol, None if it could not be fetched
+	"""
+	semaphore = asyncio.Semaphore(concurrency or FAVOURITES_CONCURRENCY)
+	
+	async def bounded(symbol: str) -> Optional[int]:
+		async with semaphore:
+			try:
+				await warm(symbol)
+			except Exception as e:
+				logger.warning(f"Prefetch of {symbol} failed: {e!r}")
+		entry = result_cache.peek(symbol)
+		return entry.code if entry is not None else None
+	
+	symbols = [symbol.upper() for symbol in dict.fromkeys(symbols) if check(symbol)]
+	return dict(zip(symbols, await asyncio.gather(*(bounded(symbol) for symbol in symbols))))
+
+
+async def preconnect(urls: Optional[list[str]] = None) -> dict[str, str]:
+	"""
+	Open pooled connections to hosts of sources in advance, in currently running loop
+	
+	@param urls: Urls on hosts, defaults to C{UPSTREAM_URLS}
 	
-	for symbol in symbols:
-		if not check(symbol):
-			result.update({symbol: {"error": "Invalid ticker"}})
-			continue
-		# data, code = await ticker(symbol)
-	results = await asyncio.gather(*[ticker(s.upper()) for s in symbols if s not in result.keys()])
-	for r in results:
-		result.update({r[0]["ticker"]: r[0]})
-	result = {s: result[s] for s in symbols}
-	return result
+	@return: Status of response, or error, for every url
+	"""
+	return await elements.Source.pool.preconnect(UPSTREAM_URLS if urls is None else urls)
+
+
+async def close() -> None:
+	"""
+	Close pooled session of currently running loop, along with its kept-alive connections
+	"""
+	await elements.Source.pool.close()
 
 
 def check(symbol: str) -> bool:
 	"""
-	Check if symbol is correct
+	Check if symbol is correct, and listed in symbol universe when it is loaded. No network is used
 	
 	@param symbol: Symbol
 	@return: If symbol is correct
 	"""
-	pattern = re.compile(r"[A-Za-z,.\-]+")
-	
-	if len(symbol) > 6 or not pattern.match(symbol):
-		return False
-	return True
+	return _SYMBOL_PATTERN.fullmatch(symbol) is not None and symbol in universe
 
 
 def _calculate_margin_of_safety_price(equity_growth_rates: list, pe_low: int, pe_high: int, ttm_eps: int,
@@ -163,21 +552,53 @@ def _calculate_margin_of_safety_price(equity_growth_rates: list, pe_low: int, pe
 	if not equity_growth_rates or not pe_low or not pe_high or not five_year_growth_rate:
 		return None, None
 	
-	if not five_year_growth_rate or not equity_growth_rates:
-		return None, None
-	growth_rate = min(float(five_year_growth_rate),
-	                  float(equity_growth_rates[-1]))
-	# Divide the growth rate by 100 to convert from percent to decimal.
-	growth_rate = growth_rate / 100.0
+	growth_rate = _conservative_growth_rate(equity_growth_rates, five_year_growth_rate)
 	
 	if not ttm_eps or not pe_low or not pe_high:
 		return None, None
+	import flaskr.source.RuleOneCalcs as RuleOne
 	margin_of_safety_price, sticker_price = \
 		RuleOne.margin_of_safety_price(float(ttm_eps), growth_rate,
 		                               float(pe_low), float(pe_high))
 	return margin_of_safety_price, sticker_price
 
 
+def _conservative_growth_rate(equity_growth_rates: list, five_year_growth_rate: int) -> Optional[float]:
+	"""
+	Smaller of analysts' growth estimate, and recent growth rate of equity
+	
+	@param equity_growth_rates: Equity growth rates
+	@param five_year_growth_rate: Five year growth rate
+	
+	@return: Growth rate as decimal, None if either is missing
+	"""
+	if not five_year_growth_rate or not equity_growth_rates:
+		return None
+	growth_rate = min(float(five_year_growth_rate),
+	                  float(equity_growth_rates[-1]))
+	# Divide the growth rate by 100 to convert from percent to decimal.
+	return growth_rate / 100.0
+
+
+def _calculate_payback_time(equity_growth_rates: list, five_year_growth_rate: int, market_cap: int,
+                            net_income: int) -> Optional[int]:
+	"""
+	
+	@param equity_growth_rates: Equity growth rates
+	@param five_year_growth_rate: Five year growth rate
+	@param market_cap: Market capitalization
+	@param net_income: Net income of most recent year
+	
+	@return: Years of payback, None if it can not be calculated
+	"""
+	growth_rate = _conservative_growth_rate(equity_growth_rates, five_year_growth_rate)
+	if growth_rate is None or not market_cap or not net_income:
+		return None
+	import flaskr.source.RuleOneCalcs as RuleOne
+	years = RuleOne.payback_time(market_cap, net_income, growth_rate)
+	return years if years >= 0 else None
+
+
 def _get_roic_averages(one_year_avg: int, three_year_avg: int, roic_avg: list) -> Optional[list]:
 	"""
 	Calculate ROIC averages for 1,3,5 and Max years
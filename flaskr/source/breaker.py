@@ -0,0 +1,163 @@
+"""
+Circuit breaker for upstream sources.
+
+When source keeps failing, or responds too slowly, its circuit opens and calls fail fast, without
+waiting for connection or timeout. After a while, single probe call is let through, and circuit
+closes again if it succeeds.
+
+@see CircuitBreaker: for breaker itself
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+class CircuitBreaker:
+	"""
+	Breaker with closed, open and half-open states
+
+	@param name: Name of guarded source
+	@type name: str
+
+	@param failure_threshold: Number of failures within window that opens circuit
+	@type failure_threshold: int
+
+	@param window: Seconds in which failures are counted
+	@type window: float
+
+	@param slow_call: Seconds after which call counts as failure, even if it succeeded
+	@type slow_call: float
+
+	@param reset_timeout: Seconds circuit stays open, before probe call is let through
+	@type reset_timeout: float
+	"""
+
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half_open"
+
+	def __init__(self, name: str, failure_threshold: int = 5, window: float = 60.0, slow_call: float = 8.0,
+	             reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+		"""
+		Prepare closed breaker
+
+		@param name: Name of guarded source
+		@param failure_threshold: Failures within window that open circuit
+		@param window: Seconds in which failures are counted
+		@param slow_call: Seconds after which call counts as failure
+		@param reset_timeout: Seconds before probe call
+		@param clock: Function returning current time in seconds
+		"""
+		self.name: str = name
+		self.failure_threshold: int = failure_threshold
+		self.window: float = window
+		self.slow_call: float = slow_call
+		self.reset_timeout: float = reset_timeout
+		self._clock: Callable[[], float] = clock
+		self._lock = threading.Lock()
+
+		self.state: str = self.CLOSED
+		self._failures: deque[float] = deque()
+		self._opened_at: Optional[float] = None
+		self._probing: bool = False
+
+		self.calls: int = 0
+		self.failed_calls: int = 0
+		self.rejected_calls: int = 0
+		self.times_opened: int = 0
+		self.latency: Optional[float] = None
+
+	def allow(self) -> bool:
+		"""
+		Check if call may go through. In half-open state, only one probe call is allowed at a time
+
+		@return: If call may go through
+		"""
+		with self._lock:
+			if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+				self.state = self.HALF_OPEN
+				self._probing = False
+			if self.state == self.CLOSED:
+				return True
+			if self.state == self.HALF_OPEN and not self._probing:
+				self._probing = True
+				return True
+			self.rejected_calls += 1
+			return False
+
+	def record(self, ok: Optional[bool], elapsed: float = 0.0) -> None:
+		"""
+		Record outcome of call that was allowed
+
+		@param ok: If call succeeded. None if call was abandoned before it could tell, f.ex cancelled
+		@param elapsed: Seconds call took, slow calls count as failures
+		"""
+		with self._lock:
+			now = self._clock()
+			if ok is None:
+				self._probing = False
+				return
+			self.calls += 1
+			self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+			failed = not ok or elapsed >= self.slow_call
+
+			if self.state == self.HALF_OPEN:
+				self._probing = False
+				if failed:
+					self.failed_calls += 1
+					self.__open(now)
+				else:
+					self.state = self.CLOSED
+					self._failures.clear()
+				return
+
+			if not failed:
+				return
+			self.failed_calls += 1
+			self._failures.append(now)
+			while self._failures and now - self._failures[0] > self.window:
+				self._failures.popleft()
+			if self.state == self.CLOSED and len(self._failures) >= self.failure_threshold:
+				self.__open(now)
+
+	def __open(self, now: float) -> None:
+		"""
+		Open circuit, lock has to be held
+
+		@param now: Current time
+		"""
+		self.state = self.OPEN
+		self._opened_at = now
+		self.times_opened += 1
+
+	def reset(self) -> None:
+		"""
+		Close circuit and forget failures
+		"""
+		with self._lock:
+			self.state = self.CLOSED
+			self._failures.clear()
+			self._opened_at = None
+			self._probing = False
+
+	def stats(self) -> dict:
+		"""
+		State and counters of breaker
+
+		@return: Dictionary with state and counters
+		"""
+		with self._lock:
+			return {
+				"state": self.state,
+				"recent_failures": len(self._failures),
+				"open_for": round(self._clock() - self._opened_at, 1) if self.state != self.CLOSED else None,
+				"calls": self.calls,
+				"failed_calls": self.failed_calls,
+				"rejected_calls": self.rejected_calls,
+				"times_opened": self.times_opened,
+				"latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+			}
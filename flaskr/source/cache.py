@@ -0,0 +1,213 @@
+"""
+Bounded in-memory cache of assembled ticker results.
+
+Fundamentals change at most quarterly, while price changes all the time, so both have their own
+time to live. When only price is stale, entry is still served, after price alone is refreshed.
+
+@see ResultCache: for cache itself
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import flaskr.source.elements as elements
+
+
+class Entry:
+	"""
+	Single cached result
+
+	@param result: Assembled result
+	@type result: elements.Result
+
+	@param code: Http code of result
+	@type code: int
+
+	@param size: Size of result in bytes, as serialized JSON
+	@type size: int
+
+	@param fundamentals_expire: Time after which entry is not served anymore
+	@type fundamentals_expire: float
+
+	@param price_expire: Time after which price of entry has to be refreshed
+	@type price_expire: float
+	"""
+	__slots__ = ("result", "code", "size", "fundamentals_expire", "price_expire")
+
+	def __init__(self, result: elements.Result, code: int, size: int, fundamentals_expire: float,
+	             price_expire: float):
+		self.result: elements.Result = result
+		self.code: int = code
+		self.size: int = size
+		self.fundamentals_expire: float = fundamentals_expire
+		self.price_expire: float = price_expire
+
+	@property
+	def price_fresh(self) -> bool:
+		"""
+		@return: If price does not have to be refreshed yet
+		"""
+		return time.monotonic() < self.price_expire
+
+
+class ResultCache:
+	"""
+	LRU cache of results keyed by symbol, bounded by both number of entries and their size
+
+	@param max_entries: Maximal number of entries
+	@type max_entries: int
+
+	@param max_bytes: Maximal summed size of entries in bytes
+	@type max_bytes: int
+
+	@param fundamentals_ttl: Seconds to serve entry for
+	@type fundamentals_ttl: float
+
+	@param price_ttl: Seconds after which price of entry is refreshed
+	@type price_ttl: float
+
+	@param error_ttl: Seconds to serve error results, f.ex not found ticker, for
+	@type error_ttl: float
+	"""
+
+	def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024, fundamentals_ttl: float = 12 * 3600,
+	             price_ttl: float = 15 * 60, error_ttl: float = 5 * 60):
+		"""
+		Prepare empty cache
+
+		@param max_entries: Maximal number of entries
+		@param max_bytes: Maximal summed size of entries in bytes
+		@param fundamentals_ttl: Seconds to serve entry for
+		@param price_ttl: Seconds after which price is refreshed
+		@param error_ttl: Seconds to serve error results for
+		"""
+		self.max_entries: int = max_entries
+		self.max_bytes: int = max_bytes
+		self.fundamentals_ttl: float = fundamentals_ttl
+		self.price_ttl: float = price_ttl
+		self.error_ttl: float = error_ttl
+
+		self._entries: OrderedDict[str, Entry] = OrderedDict()
+		self._bytes: int = 0
+		self._lock = threading.Lock()
+
+		self.hits: int = 0
+		self.misses: int = 0
+		self.price_refreshes: int = 0
+		self.evictions: int = 0
+
+	def get(self, symbol: str) -> Optional[Entry]:
+		"""
+		Get entry, if its fundamentals are still fresh. Entry becomes most recently used
+
+		@param symbol: Ticker symbol
+		@return: Entry or None on miss
+		"""
+		with self._lock:
+			entry = self._entries.get(symbol)
+			if entry is not None and time.monotonic() >= entry.fundamentals_expire:
+				self.__remove(symbol)
+				entry = None
+			if entry is None:
+				self.misses += 1
+				return None
+			self._entries.move_to_end(symbol)
+			self.hits += 1
+			return entry
+
+	def peek(self, symbol: str) -> Optional[Entry]:
+		"""
+		Get entry without counting lookup, and without making it most recently used
+
+		@param symbol: Ticker symbol
+		@return: Entry, None if there is none or it expired
+		"""
+		with self._lock:
+			entry = self._entries.get(symbol)
+			if entry is None or time.monotonic() >= entry.fundamentals_expire:
+				return None
+			return entry
+
+	def put(self, symbol: str, result: elements.Result, code: int, error: bool = False) -> None:
+		"""
+		Put result in cache, least recently used entries are evicted to stay within budget
+
+		@param symbol: Ticker symbol
+		@param result: Assembled result
+		@param code: Http code of result
+		@param error: If result is an error, it is then kept only for C{error_ttl}
+		"""
+		size = len(result.to_json())
+		now = time.monotonic()
+		ttl = self.error_ttl if error else self.fundamentals_ttl
+		entry = Entry(result, code, size, now + ttl, now + min(ttl, self.price_ttl))
+		with self._lock:
+			if symbol in self._entries:
+				self.__remove(symbol)
+			if size > self.max_bytes:
+				return
+			self._entries[symbol] = entry
+			self._bytes += size
+			while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+				self.__remove(next(iter(self._entries)))
+				self.evictions += 1
+
+	def price_refreshed(self, symbol: str) -> None:
+		"""
+		Mark price of entry as refreshed
+
+		@param symbol: Ticker symbol
+		"""
+		with self._lock:
+			entry = self._entries.get(symbol)
+			if entry is not None:
+				entry.price_expire = min(time.monotonic() + self.price_ttl, entry.fundamentals_expire)
+				self.price_refreshes += 1
+
+	def clear(self) -> None:
+		"""
+		Remove all entries, counters are kept
+		"""
+		with self._lock:
+			self._entries.clear()
+			self._bytes = 0
+
+	def stats(self) -> dict:
+		"""
+		Counters and usage of cache
+
+		@return: Dictionary with counters
+		"""
+		with self._lock:
+			lookups = self.hits + self.misses
+			return {
+				"entries": len(self._entries),
+				"bytes": self._bytes,
+				"max_entries": self.max_entries,
+				"max_bytes": self.max_bytes,
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+				"price_refreshes": self.price_refreshes,
+				"evictions": self.evictions,
+			}
+
+	def __remove(self, symbol: str) -> None:
+		"""
+		Remove entry, lock has to be held
+
+		@param symbol: Ticker symbol
+		"""
+		entry = self._entries.pop(symbol)
+		self._bytes -= entry.size
+
+	def __contains__(self, symbol: str) -> bool:
+		with self._lock:
+			return symbol in self._entries
+
+	def __len__(self) -> int:
+		return len(self._entries)
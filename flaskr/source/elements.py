@@ -2,13 +2,35 @@
 Classes for sourcing, and parsing results.
 
 """
+from __future__ import annotations
+
+import abc
 import asyncio
-from typing import Any, Optional, Tuple, Type
+from typing import TYPE_CHECKING, Any, Optional, Tuple, Type
 
-import aiohttp
-import random
 import logging
 import json
+import os
+import time
+import urllib.parse
+
+from flaskr.source.breaker import CircuitBreaker
+from flaskr.source.flight import SingleFlight
+from flaskr.source.session import SessionPool
+from flaskr.source.store import PayloadStore, StoredResponse
+
+if TYPE_CHECKING:
+	import aiohttp
+
+try:  # Faster JSON backend is optional
+	import orjson
+	loads = orjson.loads
+	
+	def dumps(obj: Any) -> str:
+		return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+except ImportError:
+	loads = json.loads
+	dumps = json.dumps
 
 logger = logging.getLogger("IsThisStockGood")
 
@@ -17,9 +39,26 @@ class Data:
 	"""
 	Class with data from source
 	
-	It is here to ease potential future changes
+	It is here to ease potential future changes. Subclasses declare their fields in C{__slots__}, results of
+	many tickers are kept in memory at once
 	"""
-	pass
+	__slots__ = ()
+
+
+class Scanner(abc.ABC):
+	"""
+	Incremental scanner of body, fed with chunks as they arrive
+	"""
+	
+	@abc.abstractmethod
+	def feed(self, chunk: bytes) -> Optional[Any]:
+		"""
+		Scan next chunk of body
+		
+		@param chunk: Next part of body
+		
+		@return: Value, once it is found. None while it is not found yet
+		"""
 
 
 class Source:
@@ -34,11 +73,36 @@ class Source:
 	@type error: Optional[Tuple[int, str]]
 	@param data: Class with data fetched from the source. May contain values calculated from acquired data
 	@type data: Type[Data] | Data
-	@param response: Response from request call
-	@type response: Optional[requests.Response]
+	@param response: Response from request call, or its copy read back from payload store
+	@type response: Optional[aiohttp.ClientResponse | StoredResponse]
+	@param status: State of fetch: ok, error, timeout or late. None if source was not fetched yet
+	@type status: Optional[str]
+	@param elapsed: Seconds fetch took
+	@type elapsed: Optional[float]
+	@param max_age: Seconds for which stored payload is used, None for C{_STORE_MAX_AGE} of source,
+		0 to always call upstream, f.ex to refresh price. Offline mode serves stored payloads anyway
+	@type max_age: Optional[float]
 	
 	@param _USER_AGENTS: List of 5 user agents for requests calls
 	@type _USER_AGENTS: Tuple[str, str, str, str, str]
+	
+	@param pool: Sessions shared by all sources, user agent is chosen once per pooled session
+	@type pool: SessionPool
+	
+	@param store: Persistent store of raw payloads, shared by all sources
+	@type store: PayloadStore
+	
+	@param flights: Requests in flight, concurrent calls for the same url share one request
+	@type flights: SingleFlight
+	
+	@param breakers: Circuit breakers of sources, by name of source class
+	@type breakers: dict[str, CircuitBreaker]
+	
+	@param _STORE_MAX_AGE: Seconds for which stored payload is used instead of calling upstream
+	@type _STORE_MAX_AGE: float
+	
+	@param _CHUNK_SIZE: Bytes read at once from body, when it is scanned
+	@type _CHUNK_SIZE: int
 	"""
 	
 	_USER_AGENTS = (
@@ -51,6 +115,17 @@ class Source:
 		"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/83.0.4103.97 Safari/537.36",
 	)
 	
+	pool: SessionPool = SessionPool(_USER_AGENTS)
+	store: PayloadStore = PayloadStore.from_env()
+	flights: SingleFlight = SingleFlight()
+	breakers: dict[str, CircuitBreaker] = {}
+	
+	upstream: Optional[str] = os.environ.get("UPSTREAM_BASE_URL") or None
+	"""Base url that all upstream calls are sent to instead, f.ex local stub for offline runs"""
+	
+	_STORE_MAX_AGE: float = 24 * 3600
+	_CHUNK_SIZE: int = 16 * 1024
+	
 	def __init__(self, symbol: str):
 		"""
 			@param symbol: Ticker symbol of company
@@ -59,11 +134,61 @@ class Source:
 		self.symbol: str = symbol
 		self.error: Optional[Tuple[int, str]] = None
 		self.data: Type[Data] | Data = Data()
-		self.response: Optional[aiohttp.ClientResponse] = None
+		self.response: Optional[aiohttp.ClientResponse | StoredResponse] = None
+		self.status: Optional[str] = None
+		self.elapsed: Optional[float] = None
+		self.max_age: Optional[float] = None
+		self._payload: Any = None
+		self._payload_of: Optional[aiohttp.ClientResponse | StoredResponse] = None
+	
+	async def payload(self) -> Any:
+		"""
+		Json body of response, decoded only once per response, with faster backend if it is installed
+		
+		@return: Decoded body, None if there is no response
+		"""
+		if self.response is None:
+			return None
+		if self._payload_of is not self.response:
+			# Body is already read, aiohttp refuses to read() it again once connection is released
+			self._payload = loads(await self.response.text(encoding="utf-8"))
+			self._payload_of = self.response
+		return self._payload
+	
+	@classmethod
+	def breaker(cls) -> CircuitBreaker:
+		"""
+		Circuit breaker of source class, created on first use
+		
+		@return: Breaker guarding upstream of source
+		"""
+		name = cls.__name__
+		if name not in Source.breakers:
+			Source.breakers[name] = CircuitBreaker(name)
+		return Source.breakers[name]
+	
+	def state(self) -> dict:
+		"""
+		State of fetch, for status block of result
+		
+		@return: Dictionary with status, error code and reason, and time of fetch in milliseconds
+		"""
+		code, reason = self.error if self.error else (None, None)
+		return {
+			"status": self.status,
+			"code": code,
+			"reason": reason,
+			"elapsed_ms": round(self.elapsed * 1000) if self.elapsed is not None else None,
+		}
 
-	async def _get(self, url: str, *args, **kwargs) -> aiohttp.ClientResponse:
+	async def _get(self, url: str, *args, **kwargs) -> aiohttp.ClientResponse | StoredResponse:
 		"""
-		Asynchronous method for get calls with user agent in session
+		Asynchronous method for get calls with pooled session, connections are kept alive between calls
+		
+		Payload stored recently enough is served from payload store, without network. Successful responses
+		are written to store. In offline mode, only stored payloads are served, regardless of their age.
+		Concurrent calls for the same url share one request, and get the same response. When circuit of source
+		is open, call fails fast with 503 response, without calling upstream
 
 		@param url: url for C{get} call
 		@type url: str
@@ -74,18 +199,125 @@ class Source:
 		
 		@return: response from url
 		"""
+		response, _, _ = await self.__call(url, None, *args, **kwargs)
+		return response
+	
+	async def _scan(self, url: str, scanner: Scanner, *args, **kwargs) \
+			-> Tuple[aiohttp.ClientResponse | StoredResponse, bytes, Optional[Any]]:
+		"""
+		Asynchronous method for get calls, that feeds body to scanner as it arrives, and stops reading it
+		as soon as scanner finds its value. Connection is released then, without the rest of body
+		
+		Payload store, shared requests and circuit breaker work as in C{_get}. Only the part of body that was read
+		is stored, so stored body has to be read by scanner again
+		
+		@param url: url for C{get} call
+		@type url: str
+		@param scanner: Scanner looking for value in body
+		@type scanner: Scanner
+		
+		@return: response from url, part of body that was read, and value found by scanner or None
+		"""
+		return await self.__call(url, scanner, *args, **kwargs)
+	
+	async def __call(self, url: str, scanner: Optional[Scanner], *args, **kwargs) \
+			-> Tuple[aiohttp.ClientResponse | StoredResponse, bytes, Optional[Any]]:
+		"""
+		Serve call from payload store, or from upstream
 		
-		async with aiohttp.ClientSession(headers={
-			'User-Agent': random.choice(self._USER_AGENTS)
-		}) as session:
-			async with session.get(*args, url=url, **kwargs) as response:
+		@param url: url for C{get} call
+		@param scanner: Scanner looking for value in body, None to read whole body
+		
+		@return: response from url, body, and value found by scanner
+		"""
+		source = type(self).__name__
+		max_age = self._STORE_MAX_AGE if self.max_age is None else self.max_age
+		stored = None
+		if self.store.offline or max_age > 0:
+			stored = await self.store.get_async(source, url, max_age=None if self.store.offline else max_age)
+		if stored is not None:
+			logger.debug(f"{url} served from payload store, fetched at {stored.fetched_at}")
+			return stored, stored.body, scanner.feed(stored.body) if scanner else None
+		if self.store.offline:
+			logger.warning(f"{url} is not in payload store")
+			return StoredResponse(url, 504, "Not in payload store", b"", 0.0), b"", None
+		
+		key = url if scanner is None else ("scan", url)
+		return await self.flights.run(key, lambda: self.__request(source, url, scanner, *args, **kwargs))
+	
+	async def __request(self, source: str, url: str, scanner: Optional[Scanner], *args, **kwargs) \
+			-> Tuple[aiohttp.ClientResponse | StoredResponse, bytes, Optional[Any]]:
+		"""
+		Call upstream with pooled session and store successful response
+		
+		@param source: Name of source
+		@param url: url for C{get} call
+		@param scanner: Scanner looking for value in body, None to read whole body
+		
+		@return: response from url, body that was read, and value found by scanner
+		"""
+		breaker = self.breaker()
+		if not breaker.allow():
+			logger.warning(f"{url} not called, circuit of {source} is open")
+			return StoredResponse(url, 503, "Circuit open", b"", 0.0), b"", None
+		
+		start = time.monotonic()
+		ok: Optional[bool] = False
+		try:
+			session = await self.pool.session()
+			async with session.get(*args, url=self.__upstream_url(url), **kwargs) as response:
+				ok = response.status < 500 and response.status != 429
 				if not response.ok:
 					logger.warning(f"{response.url} returned code {response.status} : {response.reason}")
-					return response
+					return response, b"", None
 				
 				logger.debug(f"{response.url} returned: {response.content}")
-				await response.read()
-				return response
+				value = None
+				if scanner is None:
+					body = await response.read()
+				else:
+					body, value = await self.__read_until_found(response, scanner)
+				self.store.put_background(source, url, self.symbol, response.status, response.reason, body)
+				return response, body, value
+		except asyncio.CancelledError:
+			# Abandoned calls count as failures only when they were slow already, f.ex timed out
+			ok = None if time.monotonic() - start < breaker.slow_call else False
+			raise
+		finally:
+			breaker.record(ok, time.monotonic() - start)
+	
+	@staticmethod
+	def __upstream_url(url: str) -> str:
+		"""
+		Url to call for upstream url, host of upstream becomes first part of path when C{upstream} is set
+		
+		@param url: Upstream url
+		
+		@return: Url to call
+		"""
+		if not Source.upstream:
+			return url
+		parts = urllib.parse.urlsplit(url)
+		return f"{Source.upstream.rstrip('/')}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+	
+	async def __read_until_found(self, response: aiohttp.ClientResponse,
+	                             scanner: Scanner) -> Tuple[bytes, Optional[Any]]:
+		"""
+		Read body in chunks, until scanner finds its value
+		
+		@param response: Response to read
+		@param scanner: Scanner looking for value
+		
+		@return: Part of body that was read, and value found by scanner or None
+		"""
+		chunks = []
+		async for chunk in response.content.iter_chunked(self._CHUNK_SIZE):
+			chunks.append(chunk)
+			value = scanner.feed(chunk)
+			if value is not None:
+				logger.debug(f"{response.url} value found after {sum(len(c) for c in chunks)} bytes")
+				return b"".join(chunks), value
+		return b"".join(chunks), None
 
 
 class Color:
@@ -173,6 +405,8 @@ class Property:
 	@param value: Value of property
 	@type value: Any
 	"""
+	__slots__ = ("color", "value")
+	
 	def __init__(self, value: Any):
 		"""
 		
@@ -199,19 +433,66 @@ class Property:
 		"""
 		self.color = Color.zero_based_range(self.value, range_list)
 	
+	def to_dict(self) -> dict:
+		"""
+		Plain dictionary of property
+		
+		@return: Dictionary with property's color and value
+		"""
+		return {"color": self.color, "value": self.value}
+	
 	def to_json(self) -> str:
 		"""
 		Converts class to json string
 		
 		@return: json string of property's value and color
 		"""
-		return json.dumps(self, default=lambda o: o.__dict__)
+		return dumps(self.to_dict())
+
+
+class Trend:
+	"""
+	Trend of historical series, as least squares line through its yearly values. Has no color, it is not
+	shown as indicator
+	
+	@param slope: Change of value per year
+	@type slope: Optional[float]
+	@param r_squared: Coefficient of determination, how well the line fits series, from 0 to 1
+	@type r_squared: Optional[float]
+	"""
+	__slots__ = ("slope", "r_squared")
+	
+	def __init__(self, slope: Optional[float] = None, r_squared: Optional[float] = None):
+		"""
+		
+		@param slope: Change of value per year
+		@param r_squared: Coefficient of determination
+		"""
+		self.slope: Optional[float] = slope
+		self.r_squared: Optional[float] = r_squared
+	
+	def to_dict(self) -> dict:
+		"""
+		Plain dictionary of trend
+		
+		@return: Dictionary with slope and r_squared
+		"""
+		return {"slope": self.slope, "r_squared": self.r_squared}
 	
 	
 class Result:
 	"""
-	# TODO: Finish docstring
+	Assembled data of ticker, as shown on page
+	
+	Plain dictionary of result is built once, and kept until result is changed, see L{changed}
 	"""
+	__slots__ = ("ticker", "name", "shortName", "address", "industry", "profile",
+	             "roic", "equity", "eps", "sales", "cash",
+	             "roic_trend", "equity_trend", "eps_trend", "sales_trend", "cash_trend",
+	             "total_debt", "free_cash_flow", "debt_payoff_time", "debt_equity_ratio", "margin_of_safety_price",
+	             "current_price", "sticker_price", "payback_time", "average_volume", "shares_to_hold",
+	             "error", "sources", "_dict")
+	
 	def __init__(self):
 		self.ticker: Optional[str] = None
 		self.name: Optional[str] = None
@@ -226,6 +507,12 @@ class Result:
 		self.sales: list[Property] = [Property(None) for p in range(4)]
 		self.cash: list[Property] = [Property(None) for p in range(4)]
 		
+		self.roic_trend: Trend = Trend()
+		self.equity_trend: Trend = Trend()
+		self.eps_trend: Trend = Trend()
+		self.sales_trend: Trend = Trend()
+		self.cash_trend: Trend = Trend()
+		
 		self.total_debt: Property = Property(None)
 		self.free_cash_flow: Property = Property(None)
 		self.debt_payoff_time: Property = Property(None)
@@ -238,6 +525,9 @@ class Result:
 		self.shares_to_hold: Property = Property(None)
 		
 		self.error: Optional[tuple[int, str]] = None
+		self.sources: dict[str, dict] = {}
+		
+		self._dict: Optional[dict] = None
 	
 	def colour(self) -> None:
 		"""
@@ -284,10 +574,56 @@ class Result:
 		for item in nones:
 			getattr(self, item).color = None
 	
+	def changed(self) -> None:
+		"""
+		Drop cached dictionary, has to be called after result is changed once it was served
+		"""
+		self._dict = None
+	
+	def to_dict(self) -> dict:
+		"""
+		Plain dictionary of result, made of dictionaries, lists and values only. It is built on first call and
+		shared by later ones, so it must not be modified
+		
+		@return: Dictionary of result
+		"""
+		if self._dict is None:
+			self._dict = {
+				"ticker": self.ticker,
+				"name": self.name,
+				"shortName": self.shortName,
+				"address": self.address,
+				"industry": self.industry,
+				"profile": self.profile.to_dict() if self.profile is not None else None,
+				"roic": [p.to_dict() for p in self.roic] if self.roic is not None else None,
+				"equity": [p.to_dict() for p in self.equity] if self.equity is not None else None,
+				"eps": [p.to_dict() for p in self.eps] if self.eps is not None else None,
+				"sales": [p.to_dict() for p in self.sales] if self.sales is not None else None,
+				"cash": [p.to_dict() for p in self.cash] if self.cash is not None else None,
+				"roic_trend": self.roic_trend.to_dict(),
+				"equity_trend": self.equity_trend.to_dict(),
+				"eps_trend": self.eps_trend.to_dict(),
+				"sales_trend": self.sales_trend.to_dict(),
+				"cash_trend": self.cash_trend.to_dict(),
+				"total_debt": self.total_debt.to_dict(),
+				"free_cash_flow": self.free_cash_flow.to_dict(),
+				"debt_payoff_time": self.debt_payoff_time.to_dict(),
+				"debt_equity_ratio": self.debt_equity_ratio.to_dict(),
+				"margin_of_safety_price": self.margin_of_safety_price.to_dict(),
+				"current_price": self.current_price.to_dict(),
+				"sticker_price": self.sticker_price.to_dict(),
+				"payback_time": self.payback_time.to_dict(),
+				"average_volume": self.average_volume.to_dict(),
+				"shares_to_hold": self.shares_to_hold.to_dict(),
+				"error": list(self.error) if isinstance(self.error, tuple) else self.error,
+				"sources": self.sources,
+			}
+		return self._dict
+	
 	def to_json(self) -> str:
 		"""
 		Json representation of result
 		
 		@return: JSON string
 		"""
-		return json.dumps(self, default=lambda o: o.__dict__)
+		return dumps(self.to_dict())
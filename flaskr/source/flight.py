@@ -0,0 +1,95 @@
+"""
+Single-flight coalescing of concurrent calls.
+
+When many callers ask for the same key at once, only the first one starts the work,
+and all of them await its one shared task.
+
+@see SingleFlight: for registry of calls in flight
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger("IsThisStockGood")
+
+
+class SingleFlight:
+	"""
+	Registry of calls in flight, keyed by anything hashable
+
+	Exception raised by shared task is raised to every caller. Caller that is cancelled stops waiting,
+	but task keeps running for others. It is cancelled only when no caller waits for it anymore.
+
+	@param leaders: Number of calls that started work
+	@type leaders: int
+
+	@param followers: Number of calls that joined work already in flight
+	@type followers: int
+	"""
+
+	def __init__(self):
+		"""
+		Prepare empty registry
+		"""
+		self._tasks: dict[Hashable, asyncio.Task] = {}
+		self._waiters: dict[asyncio.Task, int] = {}
+		self.leaders: int = 0
+		self.followers: int = 0
+
+	async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+		"""
+		Await result of call with given key, work is started only if it is not in flight already
+
+		@param key: Key of call
+		@param factory: Function returning awaitable that does the work
+		@return: Result of work
+
+		@raise Exception: Any exception raised by work
+		"""
+		loop = asyncio.get_running_loop()
+		task = self._tasks.get(key)
+		if task is None or task.done() or task.get_loop() is not loop:
+			task = loop.create_task(factory())
+			self._tasks[key] = task
+			self._waiters[task] = 0
+			task.add_done_callback(lambda done: self.__forget(key, done))
+			self.leaders += 1
+		else:
+			self.followers += 1
+
+		self._waiters[task] += 1
+		try:
+			return await asyncio.shield(task)
+		except asyncio.CancelledError:
+			if not task.done() and self._waiters.get(task, 0) <= 1:
+				logger.debug(f"Nobody waits for {key} anymore, cancelling it")
+				task.cancel()
+			raise
+		finally:
+			if task in self._waiters:
+				self._waiters[task] -= 1
+
+	def __forget(self, key: Hashable, task: asyncio.Task) -> None:
+		"""
+		Remove finished task from registry
+
+		@param key: Key of call
+		@param task: Finished task
+		"""
+		if self._tasks.get(key) is task:
+			del self._tasks[key]
+		self._waiters.pop(task, None)
+		if not task.cancelled() and task.exception() is not None:
+			logger.debug(f"Call {key} failed: {task.exception()!r}")
+
+	def __len__(self) -> int:
+		return len(self._tasks)
+
+	def stats(self) -> dict:
+		"""
+		@return: Dictionary with counters of calls
+		"""
+		return {"in_flight": len(self._tasks), "leaders": self.leaders, "followers": self.followers}
@@ -0,0 +1,132 @@
+"""
+Planning which sources, and which quoteSummary modules, are needed for requested fields of result.
+
+Every field of C{Result} depends on some sources, and for YahooQuoteSummary on some of its modules.
+Caller that needs only few fields gets plan with only those fetches, instead of the whole fan-out.
+
+@see plan: for making plan of fields
+@see Plan: for plan itself
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+ALWAYS: frozenset[str] = frozenset({"ticker", "error", "sources"})
+"""Fields that are in every result, and do not depend on any source"""
+
+_MARGIN_OF_SAFETY = {"MSNMoney": (), "StockRow": (), "YahooAnalysis": (), "YahooQuoteSummary": ("defaultKeyStatistics",)}
+
+DEPENDENCIES: dict[str, dict[str, tuple[str, ...]]] = {
+	"name": {"MSNMoney": ()},
+	"shortName": {"MSNMoney": ()},
+	"industry": {"MSNMoney": (), "YahooQuoteSummary": ("assetProfile",)},
+	"address": {"YahooQuoteSummary": ("assetProfile",)},
+	"profile": {"YahooQuoteSummary": ("assetProfile",)},
+	"roic": {"StockRow": (), "YahooQuoteSummary": ("incomeStatementHistory", "balanceSheetHistory")},
+	"equity": {"StockRow": ()},
+	"eps": {"StockRow": ()},
+	"sales": {"StockRow": ()},
+	"cash": {"StockRow": ()},
+	"roic_trend": {"StockRow": ()},
+	"equity_trend": {"StockRow": ()},
+	"eps_trend": {"StockRow": ()},
+	"sales_trend": {"StockRow": ()},
+	"cash_trend": {"StockRow": ()},
+	"total_debt": {"StockRow": ()},
+	"free_cash_flow": {"StockRow": ()},
+	"debt_payoff_time": {"StockRow": ()},  # Colored with free cash flow, also from StockRow
+	"debt_equity_ratio": {"StockRow": ()},
+	"margin_of_safety_price": _MARGIN_OF_SAFETY,
+	"sticker_price": _MARGIN_OF_SAFETY,
+	"current_price": {**_MARGIN_OF_SAFETY,  # Colored against margin of safety price
+	                  "YahooQuoteSummary": ("defaultKeyStatistics", "financialData")},
+	"payback_time": {"StockRow": (), "YahooAnalysis": (),  # Growth rate, as for margin of safety
+	                 "YahooQuoteSummary": ("incomeStatementHistory", "summaryDetail")},
+	"average_volume": {},
+	"shares_to_hold": {},
+}
+"""Sources, and their quoteSummary modules, every field of result depends on"""
+
+SOURCES: tuple[str, ...] = ("MSNMoney", "StockRow", "YahooAnalysis", "YahooQuoteSummary")
+
+MODULES: tuple[str, ...] = ("assetProfile", "incomeStatementHistory", "balanceSheetHistory", "financialData",
+                            "defaultKeyStatistics", "summaryDetail")
+"""quoteSummary modules any field depends on, in order they are requested in"""
+
+
+class Plan:
+	"""
+	Fields of result, and fetches they need
+
+	@param fields: Requested fields, along with those always present
+	@type fields: frozenset[str]
+
+	@param sources: Needed sources, with quoteSummary modules for YahooQuoteSummary
+	@type sources: dict[str, tuple[str, ...]]
+
+	@param full: If all fields are requested
+	@type full: bool
+	"""
+
+	def __init__(self, fields: frozenset[str], sources: dict[str, tuple[str, ...]]):
+		self.fields: frozenset[str] = fields
+		self.sources: dict[str, tuple[str, ...]] = sources
+		self.full: bool = fields >= set(DEPENDENCIES)
+
+	def needs(self, source: str) -> bool:
+		"""
+		@param source: Name of source class
+		@return: If source has to be fetched
+		"""
+		return source in self.sources
+
+	def key(self, symbol: str) -> str:
+		"""
+		Key of symbol with this plan, for caches and coalescing of lookups
+
+		@param symbol: Ticker symbol
+		@return: Symbol alone for full plan, otherwise symbol with fields
+		"""
+		if self.full:
+			return symbol
+		return f"{symbol}?fields={','.join(sorted(self.fields - ALWAYS))}"
+
+	def project(self, data: dict) -> dict:
+		"""
+		Leave only planned fields in result dictionary
+
+		@param data: Result dictionary
+		@return: Projected dictionary
+		"""
+		if self.full:
+			return data
+		return {key: value for key, value in data.items() if key in self.fields}
+
+
+def plan(fields: Optional[Iterable[str]] = None) -> Plan:
+	"""
+	Make plan for requested fields
+
+	@param fields: Names of fields of result, None or empty for all
+	@return: Plan
+
+	@raise ValueError: Some field is unknown
+	"""
+	fields = frozenset(f.strip() for f in fields or () if f.strip()) - ALWAYS
+	unknown = fields - set(DEPENDENCIES)
+	if unknown:
+		raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+	if not fields:
+		fields = frozenset(DEPENDENCIES)
+
+	sources: dict[str, set[str]] = {}
+	for field in fields:
+		for source, modules in DEPENDENCIES[field].items():
+			sources.setdefault(source, set()).update(modules)
+	return Plan(fields | ALWAYS, {source: tuple(m for m in MODULES if m in sources[source])
+	                              for source in SOURCES if source in sources})
+
+
+FULL: Plan = plan()
+"""Plan with all fields"""
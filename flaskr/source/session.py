@@ -0,0 +1,130 @@
+"""
+Pooled HTTP sessions shared by every source.
+
+One C{aiohttp.ClientSession} is kept per event loop, so connections, TLS sessions and DNS answers
+are reused between calls instead of being set up again for every single GET.
+
+@see SessionPool: for pool itself
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+if TYPE_CHECKING:
+	import aiohttp
+
+logger = logging.getLogger("IsThisStockGood")
+
+
+class SessionPool:
+	"""
+	Lifecycle-managed pool of client sessions, one per running event loop.
+
+	Every session has its own connector with keep-alive, limits of connections in total and per host,
+	and cached DNS answers. User agent is chosen once, when session is created, and stays the same
+	for all calls made with it.
+
+	@param user_agents: User agents to choose from when session is created
+	@type user_agents: Sequence[str]
+
+	@param limit: Limit of simultaneous connections in total
+	@type limit: int
+
+	@param limit_per_host: Limit of simultaneous connections to single host
+	@type limit_per_host: int
+
+	@param dns_ttl: Time in seconds to keep DNS answers in cache
+	@type dns_ttl: int
+
+	@param keepalive_timeout: Time in seconds to keep idle connection open
+	@type keepalive_timeout: float
+
+	@param timeout: Total timeout of single call in seconds
+	@type timeout: float
+	"""
+
+	def __init__(self, user_agents: Sequence[str], limit: int = 120, limit_per_host: int = 30, dns_ttl: int = 300,
+	             keepalive_timeout: float = 30.0, timeout: float = 30.0):
+		"""
+		Prepare pool. Sessions are created lazily, on first use in given loop
+
+		@param user_agents: User agents to choose from
+		@param limit: Limit of connections in total
+		@param limit_per_host: Limit of connections per host
+		@param dns_ttl: DNS cache time to live in seconds
+		@param keepalive_timeout: Idle connection keep-alive in seconds
+		@param timeout: Total timeout of single call in seconds
+		"""
+		self.user_agents: Sequence[str] = user_agents
+		self.limit: int = limit
+		self.limit_per_host: int = limit_per_host
+		self.dns_ttl: int = dns_ttl
+		self.keepalive_timeout: float = keepalive_timeout
+		self.timeout: float = timeout
+		self._sessions: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+	async def session(self) -> aiohttp.ClientSession:
+		"""
+		Get session bound to currently running loop, create one if there is none yet
+
+		@return: Pooled session
+		"""
+		loop = asyncio.get_running_loop()
+		session = self._sessions.get(loop)
+		if session is not None and not session.closed:
+			return session
+
+		self.__forget_closed_loops()
+		import aiohttp  # Imported with first session, app starts and serves pages without it
+		connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+		                                 use_dns_cache=True, ttl_dns_cache=self.dns_ttl,
+		                                 keepalive_timeout=self.keepalive_timeout)
+		session = aiohttp.ClientSession(connector=connector,
+		                                headers={'User-Agent': random.choice(self.user_agents)},
+		                                timeout=aiohttp.ClientTimeout(total=self.timeout))
+		self._sessions[loop] = session
+		logger.debug(f"New pooled session for loop {id(loop)}")
+		return session
+
+	async def preconnect(self, urls: Iterable[str], timeout: float = 5.0) -> dict[str, str]:
+		"""
+		Open kept-alive connections to hosts of urls in advance, so first calls to them skip DNS lookup, and TCP and
+		TLS handshakes. Every url is requested with HEAD, its response is not used
+
+		@param urls: Urls on upstream hosts
+		@param timeout: Seconds to wait for single host
+		@return: Status of response, or error, for every url
+		"""
+		import aiohttp
+		session = await self.session()
+
+		async def connect(url: str) -> str:
+			try:
+				async with session.head(url, allow_redirects=False, timeout=aiohttp.ClientTimeout(total=timeout)) \
+						as response:
+					return str(response.status)
+			except Exception as e:
+				logger.warning(f"Connection to {url} could not be opened: {e!r}")
+				return type(e).__name__
+
+		urls = list(urls)
+		return dict(zip(urls, await asyncio.gather(*(connect(url) for url in urls))))
+
+	async def close(self) -> None:
+		"""
+		Close session bound to currently running loop, along with its connections
+		"""
+		session = self._sessions.pop(asyncio.get_running_loop(), None)
+		if session is not None and not session.closed:
+			await session.close()
+
+	def __forget_closed_loops(self) -> None:
+		"""
+		Drop sessions of loops that were already closed. Their connections can not be used anymore
+		"""
+		for loop in [loop for loop in self._sessions if loop.is_closed()]:
+			self._sessions.pop(loop)
@@ -9,12 +9,13 @@ Get data about company, along with couple values.
 from __future__ import annotations
 
 from typing import Optional, Tuple
-import json
 import asyncio
 import logging
+import os
 import traceback
 
 import flaskr.source.elements as src
+from flaskr.source.store import SymbolMap
 
 logger = logging.getLogger("IsThisStockGood")
 
@@ -40,7 +41,11 @@ class Data(src.Data):
 	
 	@param pe_low: Lowest price-to-earnings ratio
 	@type pe_low: Optional[int]
+	
+	@param symbol: Symbol of asset, as MSN Money has it
+	@type symbol: Optional[str]
 	"""
+	__slots__ = ("displayName", "shortName", "industry", "market", "pe_high", "pe_low", "symbol")
 	
 	def __init__(self):
 		super().__init__()
@@ -51,6 +56,7 @@ class Data(src.Data):
 		self.market: Optional[str] = None
 		self.pe_high: Optional[int] = None
 		self.pe_low: Optional[int] = None
+		self.symbol: Optional[str] = None
 
 
 class MSNMoney(src.Source):
@@ -69,12 +75,17 @@ class MSNMoney(src.Source):
 	@param url_ratios: Url for data about asset
 	@type url_ratios: str
 	
+	@param ids: Persistent map of symbols to ids of assets, pre-populated from C{MSN_SEC_ID_FILE} if set
+	@type ids: SymbolMap
+	
 	@param __KEY_RATIOS_YEAR_SPAN: Years of ratios span
 	@type __KEY_RATIOS_YEAR_SPAN: int
 	"""
 	url_id = "https://services.bingapis.com/contentservices-finance.csautosuggest/api/v1/Query?query={ticker}&market=en-us"
 	url_ratios = "https://services.bingapis.com/contentservices-finance.financedataservice/api/v1/KeyRatios?stockId={id}"
 	
+	ids = SymbolMap(src.Source.store, "msn_sec_id", seed_path=os.environ.get("MSN_SEC_ID_FILE"))
+	
 	__KEY_RATIOS_YEAR_SPAN = 5
 	
 	def __init__(self, symbol: str):
@@ -92,11 +103,19 @@ class MSNMoney(src.Source):
 	@classmethod
 	async def setup(cls, symbol):
 		self = MSNMoney(symbol)
-		self.__id = await self.__stock_id()
+		await self.set_id()
 		return self
 		
 	async def set_id(self):
-		self.__id: Optional[str] = await self.__stock_id()
+		"""
+		Sets id of asset, from persistent map if known, otherwise by looking it up
+		"""
+		sec_id = await MSNMoney.ids.get_async(self.symbol)
+		if sec_id is SymbolMap.UNKNOWN:
+			sec_id = await self.__stock_id()
+			if not self.error:
+				MSNMoney.ids.put_background(self.symbol, sec_id)
+		self.__id: Optional[str] = sec_id
 		
 	async def fetch(self) -> MSNMoney:
 		"""
@@ -117,7 +136,7 @@ class MSNMoney(src.Source):
 		self.data.pe_low, self.data.pe_high = await self.__pe_ratios()
 		
 		try:
-			data = await self.response.json()
+			data = await self.payload()
 			
 			self.data.displayName = data.get("displayName", None)
 			self.data.industry = data.get("industry", None)
@@ -141,11 +160,11 @@ class MSNMoney(src.Source):
 		if not response.ok:
 			self.error = (response.status, response.reason)
 			return None
-		content = await response.text()
+		content = await response.text(encoding="utf-8")
 		try:
-			content = json.loads(content)
+			content = src.loads(content)
 			for data in content.get('data', {}).get('stocks', []):
-				data = json.loads(data)
+				data = src.loads(data)
 				if data.get('RT00S', '').upper() == self.symbol.upper():
 					return data.get('SecId', '')
 		except Exception as e:
@@ -160,7 +179,7 @@ class MSNMoney(src.Source):
 
 		@return: lowest pe-ratios, highest pe-ratios
 		"""
-		json_result = await self.response.json()
+		json_result = await self.payload()
 		recent_pe_ratios = [
 			                   year.get('priceToEarningsRatio', None)
 			                   for year in json_result.get('companyMetrics', [])
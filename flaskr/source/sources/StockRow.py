@@ -30,9 +30,15 @@ class Data(src.Data):
 	@param roic_averages: List of roic averages
 	@type roic_averages: Optional[list]
 	
+	@param revenue: Yearly revenue, oldest first
+	@type revenue: Optional[list]
+	
 	@param revenue_growth_rates: List of revenue growth rates
 	@type revenue_growth_rates: Optional[list]
 	
+	@param eps: Yearly Earnings/Sh, oldest first
+	@type eps: Optional[list]
+	
 	@param eps_growth_rates: List of Earnings/Sh rates
 	@type eps_growth_rates: Optional[list]
 	
@@ -64,13 +70,18 @@ class Data(src.Data):
 	@type last_year_net_income: Optional[int]
 
 	"""
+	__slots__ = ("roic", "roic_averages", "revenue", "revenue_growth_rates", "eps", "eps_growth_rates",
+	             "debt_equity_ratio", "total_debt", "debt_payoff_time", "equity", "equity_growth_rates",
+	             "free_cash_flow", "free_cash_flow_growth_rates", "recent_free_cash_flow", "last_year_net_income")
 	
 	def __init__(self):
 		super().__init__()
 		
 		self.roic: Optional[int] = None
 		self.roic_averages: Optional[list] = None
+		self.revenue: Optional[list] = None
 		self.revenue_growth_rates: Optional[list] = None
+		self.eps: Optional[list] = None
 		self.eps_growth_rates: Optional[list] = None
 		
 		self.debt_equity_ratio: Optional[int] = None
@@ -148,7 +159,7 @@ class StockRow(src.Source):
 		"""
 		try:
 			data_dict = {}
-			data = await self.response.json()
+			data = await self.payload()
 			
 			rows = data.get("fundamentals", {}).get("rows", [])
 			_add_list_of_dicts_to_dict(rows, data_dict, "label")
@@ -167,13 +178,13 @@ class StockRow(src.Source):
 			if not self.data.roic_averages:
 				logging.error('Failed to parse ROIC')
 			
-			revenue = _get_nested_values_for_key(data_dict, "Revenue")
-			self.data.revenue_growth_rates = compute_growth_rates_for_data(revenue)
+			self.data.revenue = _get_nested_values_for_key(data_dict, "Revenue")
+			self.data.revenue_growth_rates = compute_growth_rates_for_data(self.data.revenue)
 			if not self.data.revenue_growth_rates:
 				logging.error('Failed to parse Revenue growth rates')
 			
-			eps = _get_nested_values_for_key(data_dict, "Earnings/Sh")
-			self.data.eps_growth_rates = compute_growth_rates_for_data(eps)
+			self.data.eps = _get_nested_values_for_key(data_dict, "Earnings/Sh")
+			self.data.eps_growth_rates = compute_growth_rates_for_data(self.data.eps)
 			if not self.data.eps_growth_rates:
 				logging.error('Failed to parse EPS growth rates')
 			
@@ -12,7 +12,6 @@ from __future__ import annotations
 
 from typing import Any, Optional
 import re
-from lxml import html
 import logging
 
 import flaskr.source.elements as src
@@ -27,11 +26,56 @@ class Data(src.Data):
 	@param five_year_growth_rate: Growth rate of five years
 	@type five_year_growth_rate: Optional[int]
 	"""
+	__slots__ = ("five_year_growth_rate",)
 	
 	def __init__(self):
 		self.five_year_growth_rate: Optional[int] = None
 
 
+class GrowthRateScanner(src.Scanner):
+	"""
+	Finds five year growth rate in page as it is streamed, without building its tree
+	
+	Looks for element with 'Next 5 Years (per annum)' text, and then for first text starting with percentage.
+	Only short tail of previous chunks is kept, in case marker or percentage is split between chunks
+	
+	@param __MARKER: Text of element preceding growth rate
+	@type __MARKER: bytes
+	
+	@param __PERCENTAGE: Pattern of text starting with percentage
+	@type __PERCENTAGE: re.Pattern
+	"""
+	__MARKER = b">Next 5 Years (per annum)<"
+	__PERCENTAGE = re.compile(rb">(\d+(?:\.\d+)?)%")
+	__TAIL = 32
+	
+	def __init__(self):
+		self.__window: bytes = b""
+		self.__marker_found: bool = False
+	
+	def feed(self, chunk: bytes) -> Optional[str]:
+		"""
+		Scan next chunk of page
+		
+		@param chunk: Next part of page
+		
+		@return: Growth rate without percent sign, once it is found
+		"""
+		window = self.__window + chunk
+		if not self.__marker_found:
+			index = window.find(self.__MARKER)
+			if index < 0:
+				self.__window = window[-(len(self.__MARKER) - 1):]
+				return None
+			self.__marker_found = True
+			window = window[index + len(self.__MARKER):]
+		match = self.__PERCENTAGE.search(window)
+		if match:
+			return match.group(1).decode()
+		self.__window = window[-self.__TAIL:]
+		return None
+
+
 class YahooAnalysis(src.Source):
 	"""
 	Source from MSNMoney
@@ -61,13 +105,16 @@ class YahooAnalysis(src.Source):
 
 		@return: Self for fluent style chaining
 		"""
-		self.response = await self._get(YahooAnalysis.__url.format(ticker=self.symbol))
+		self.response, body, five_year_growth_rate = await self._scan(YahooAnalysis.__url.format(ticker=self.symbol),
+		                                                              GrowthRateScanner())
 		if not self.response.ok:
 			self.error = (self.response.status, self.response.reason)
 			return self
 		
-		text = await self.response.text()
-		self.data.five_year_growth_rate = self.__parse_five_year_growth_rate(text)
+		if five_year_growth_rate is None:  # Page layout may have changed, parse whole tree
+			logger.info(f"Growth rate of {self.symbol} not found in stream, parsing whole page")
+			five_year_growth_rate = self.__parse_five_year_growth_rate(body)
+		self.data.five_year_growth_rate = five_year_growth_rate
 		if not self.data.five_year_growth_rate:
 			self.error = (404, "Could not parse five year growth rate")
 			return self
@@ -106,16 +153,19 @@ class YahooAnalysis(src.Source):
 		except StopIteration:  # End of iteration
 			return None
 	
-	def __parse_five_year_growth_rate(self, content: str) -> bool | int:
+	def __parse_five_year_growth_rate(self, content: bytes) -> bool | int:
 		"""
 		Scraps page for single piece of data
 		
 		@param content: Page to scrap
-		@type content: str
+		@type content: bytes
 		
 		@return: Five year growth rate or None if not found
 		"""
-		tree = html.fromstring(bytes(content, encoding='utf8'))
+		if not content:
+			return False
+		from lxml import html  # Imported on first page, it is needed only for scraping
+		tree = html.fromstring(content)
 		tree_iterator = tree.iter()
 		five_year_growth_rate = None
 		for element in tree_iterator:
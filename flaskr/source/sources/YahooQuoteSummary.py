@@ -57,6 +57,8 @@ class Profile:
 	@param companyOfficers: List of details about company officers
 	@type companyOfficers: Optional[list]
 	"""
+	__slots__ = ("address1", "city", "state", "country", "website", "industryDisp", "sector", "longBusinessSummary",
+	             "fullTimeEmployees", "companyOfficers")
 	
 	def __init__(self):
 		"""
@@ -90,6 +92,25 @@ class Profile:
 			if attr_name in data.keys():
 				attr = data[attr_name]
 			setattr(self, attr_name, attr)
+	
+	def to_dict(self) -> dict:
+		"""
+		Plain dictionary of profile, ready for JSON
+		
+		@return: Dictionary of profile details
+		"""
+		return {
+			"address1": self.address1,
+			"city": self.city,
+			"state": self.state,
+			"country": self.country,
+			"website": self.website,
+			"industryDisp": self.industryDisp,
+			"sector": self.sector,
+			"longBusinessSummary": self.longBusinessSummary,
+			"fullTimeEmployees": self.fullTimeEmployees,
+			"companyOfficers": self.companyOfficers,
+		}
 
 
 class Data(src.Data):
@@ -119,7 +140,15 @@ class Data(src.Data):
 	
 	@param trailingEps: Trailing Eps
 	@type trailingEps: Optional[int]
+	
+	@param marketCap: Market capitalization
+	@type marketCap: Optional[int]
+	
+	@param netIncome: Net income of most recent year
+	@type netIncome: Optional[int]
 	"""
+	__slots__ = ("profile", "roic_history", "roic_average_3", "roic_average_1", "currentPrice", "totalDebt",
+	             "debtToEquity", "trailingEps", "marketCap", "netIncome")
 	
 	def __init__(self):
 		self.profile: Profile = Profile()
@@ -131,6 +160,8 @@ class Data(src.Data):
 		self.totalDebt: Optional[int] = None
 		self.debtToEquity: Optional[int] = None
 		self.trailingEps: Optional[int] = None
+		self.marketCap: Optional[int] = None
+		self.netIncome: Optional[int] = None
 
 
 # TODO: This may be deleted?
@@ -182,9 +213,14 @@ class YahooQuoteSummary(src.Source):
 	
 	@param modules: Modules available during fetch
 	@type modules: str
+	
+	@param _STORE_MAX_AGE: Stored payloads are kept shorter than other sources', as they contain current price
+	@type _STORE_MAX_AGE: float
 	"""
 	__url = "https://query1.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules={modules}"
 	
+	_STORE_MAX_AGE = 15 * 60
+	
 	__MODULES = [
 		"assetProfile",  # Company info/background
 		"incomeStatementHistory",
@@ -195,6 +231,7 @@ class YahooQuoteSummary(src.Source):
 		"cashFlowStatementHistoryQuarterly",
 		"defaultKeyStatistics",
 		"financialData",
+		"summaryDetail",  # Market cap
 		"calendarEvents",  # Contains ex-dividend date
 		"secFilings",  # SEC filing links
 		"recommendationTrend",
@@ -229,13 +266,13 @@ class YahooQuoteSummary(src.Source):
 	@property
 	async def values(self) -> Any:
 		"""
-		Allows for easier access to response values
+		Allows for easier access to response values, response is decoded only once
 		
 		@return: Better accessible dictionary
 		"""
 		if not self.response:
 			return None
-		result = await self.response.json()
+		result = await self.payload()
 		return result["quoteSummary"]["result"][0]
 	
 	async def fetch(self) -> YahooQuoteSummary:
@@ -253,7 +290,7 @@ class YahooQuoteSummary(src.Source):
 		values = await self.values
 		self.data.profile.fill(["address1", "city", "state", "country", "website", "industryDisp",
 		                        "sector", "longBusinessSummary", "fullTimeEmployees", "companyOfficers"],
-		                       values["assetProfile"])
+		                       values.get("assetProfile", {}))
 	
 		financial_data = values.get("financialData", {})
 		self.data.currentPrice = financial_data.get("currentPrice", {}).get("raw", None)
@@ -261,6 +298,14 @@ class YahooQuoteSummary(src.Source):
 		self.data.debtToEquity = financial_data.get("debtToEquity", {}).get("raw", None)
 		
 		self.data.trailingEps = values.get("defaultKeyStatistics", {}).get("trailingEps", {}).get("raw", None)
+		self.data.marketCap = values.get("summaryDetail", {}).get("marketCap", {}).get("raw", None)
+		
+		statements = values.get("incomeStatementHistory", {}).get("incomeStatementHistory", [])
+		self.data.netIncome = statements[0].get("netIncome", {}).get("raw", None) if statements else None
+		
+		modules = self.modules.split(",")
+		if "incomeStatementHistory" not in modules or "balanceSheetHistory" not in modules:
+			return self  # Roic needs both histories, plan may request only one, f.ex net income for payback time
 		
 		self.data.roic_history = await self.__roic_history()
 		
@@ -0,0 +1,421 @@
+"""
+Persistent on-disk store of raw upstream payloads.
+
+Bodies fetched by sources are kept compressed in SQLite database, keyed by source, url and symbol,
+along with time they were fetched. After restart, sources parse stored bodies again instead of
+calling upstream, and with offline mode the network is not used at all.
+
+Location of database is taken from C{PAYLOAD_STORE_PATH} environment variable, and offline mode
+is enabled with C{PAYLOAD_STORE_OFFLINE=1}.
+
+Sources read and write payloads and mappings on single thread of store, see L{PayloadStore.get_async}
+and L{SymbolMap.get_async}, so disk, compression and lock never block the event loop.
+
+Long-lived mappings of symbols, f.ex to ids used by upstream, are kept in the same database.
+
+@see PayloadStore: for store itself
+@see StoredResponse: for response read back from store
+@see SymbolMap: for mappings of symbols
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import csv
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("IsThisStockGood")
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "isthisstockgood", "payloads.sqlite3")
+
+
+class StoredResponse:
+	"""
+	Response read back from store. Has the part of C{aiohttp.ClientResponse} interface sources use
+
+	@param url: Url of request
+	@type url: str
+
+	@param status: Http status code
+	@type status: int
+
+	@param reason: Http reason
+	@type reason: str
+
+	@param body: Raw body
+	@type body: bytes
+
+	@param fetched_at: Unix time of fetch from upstream
+	@type fetched_at: float
+	"""
+
+	def __init__(self, url: str, status: int, reason: str, body: bytes, fetched_at: float):
+		self.url: str = url
+		self.status: int = status
+		self.reason: str = reason
+		self.body: bytes = body
+		self.fetched_at: float = fetched_at
+
+	@property
+	def ok(self) -> bool:
+		"""
+		@return: If status is below 400
+		"""
+		return self.status < 400
+
+	async def read(self) -> bytes:
+		"""
+		@return: Raw body
+		"""
+		return self.body
+
+	async def text(self, encoding: str = "utf-8") -> str:
+		"""
+		@param encoding: Encoding of body
+		@return: Decoded body
+		"""
+		return self.body.decode(encoding, errors="replace")
+
+	async def json(self, loads: Callable[[str], Any] = json.loads, **kwargs) -> Any:
+		"""
+		@param loads: Function to decode json with
+		@return: Decoded json body
+		"""
+		return loads(self.body.decode("utf-8"))
+
+
+class PayloadStore:
+	"""
+	SQLite store of compressed raw payloads
+
+	@param path: Path to database file
+	@type path: str
+
+	@param offline: If sources should only read from store, and never call upstream
+	@type offline: bool
+	"""
+
+	def __init__(self, path: str = DEFAULT_PATH, offline: bool = False):
+		"""
+		Open (and create if needed) database
+
+		@param path: Path to database file
+		@param offline: Serve only from store
+		"""
+		self.path: str = path
+		self.offline: bool = offline
+		self._lock = threading.Lock()
+		self._connection: Optional[sqlite3.Connection] = None
+		self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+		self._executor_pid: Optional[int] = None
+
+	@classmethod
+	def from_env(cls) -> PayloadStore:
+		"""
+		Create store configured with environment variables
+
+		@return: Store
+		"""
+		return cls(os.environ.get("PAYLOAD_STORE_PATH", DEFAULT_PATH),
+		           os.environ.get("PAYLOAD_STORE_OFFLINE", "") in ("1", "true", "yes"))
+
+	@property
+	def connection(self) -> sqlite3.Connection:
+		"""
+		Connection to database, opened on first use. Lock has to be held
+
+		@return: SQLite connection
+		"""
+		if self._connection is None:
+			if os.path.dirname(self.path):
+				os.makedirs(os.path.dirname(self.path), exist_ok=True)
+			self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+			self._connection.execute("PRAGMA journal_mode=WAL")
+			self._connection.execute(
+				"CREATE TABLE IF NOT EXISTS payloads ("
+				"source TEXT NOT NULL, url TEXT NOT NULL, symbol TEXT NOT NULL, fetched_at REAL NOT NULL, "
+				"status INTEGER NOT NULL, reason TEXT, body BLOB NOT NULL, PRIMARY KEY (source, url))")
+			self._connection.execute("CREATE INDEX IF NOT EXISTS payloads_symbol ON payloads (symbol)")
+			self._connection.execute(
+				"CREATE TABLE IF NOT EXISTS symbol_map ("
+				"namespace TEXT NOT NULL, symbol TEXT NOT NULL, value TEXT, fetched_at REAL NOT NULL, "
+				"PRIMARY KEY (namespace, symbol))")
+		return self._connection
+
+	@property
+	def executor(self) -> concurrent.futures.ThreadPoolExecutor:
+		"""
+		Single thread of store, created on first use, and again in forked process, where thread of parent is gone
+
+		@return: Executor
+		"""
+		if self._executor is None or self._executor_pid != os.getpid():
+			self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="payload-store")
+			self._executor_pid = os.getpid()
+		return self._executor
+
+	def get(self, source: str, url: str, max_age: Optional[float] = None) -> Optional[StoredResponse]:
+		"""
+		Read payload from store
+
+		@param source: Name of source
+		@param url: Url of request
+		@param max_age: Maximal age in seconds, None for any age
+
+		@return: Stored response, None if there is no payload or it is too old
+		"""
+		try:
+			with self._lock:
+				row = self.connection.execute(
+					"SELECT status, reason, body, fetched_at FROM payloads WHERE source = ? AND url = ?",
+					(source, url)).fetchone()
+		except sqlite3.Error as e:
+			logger.warning(f"Payload store read failed: {e}")
+			return None
+		if row is None:
+			return None
+		status, reason, body, fetched_at = row
+		if max_age is not None and time.time() - fetched_at > max_age:
+			return None
+		return StoredResponse(url, status, reason, zlib.decompress(body), fetched_at)
+
+	def put(self, source: str, url: str, symbol: str, status: int, reason: str, body: bytes) -> None:
+		"""
+		Write payload to store, replacing previous one
+
+		@param source: Name of source
+		@param url: Url of request
+		@param symbol: Ticker symbol
+		@param status: Http status code
+		@param reason: Http reason
+		@param body: Raw body
+		"""
+		compressed = zlib.compress(body, 6)  # Before lock, so readers do not wait for it
+		try:
+			with self._lock:
+				self.connection.execute(
+					"INSERT OR REPLACE INTO payloads (source, url, symbol, fetched_at, status, reason, body) "
+					"VALUES (?, ?, ?, ?, ?, ?, ?)",
+					(source, url, symbol.upper(), time.time(), status, reason, compressed))
+		except sqlite3.Error as e:
+			logger.warning(f"Payload store write failed: {e}")
+
+	async def get_async(self, source: str, url: str, max_age: Optional[float] = None) -> Optional[StoredResponse]:
+		"""
+		Read payload from store on thread of store, it is read after every write submitted before
+
+		@param source: Name of source
+		@param url: Url of request
+		@param max_age: Maximal age in seconds, None for any age
+
+		@return: Stored response, None if there is no payload or it is too old
+		"""
+		return await asyncio.get_running_loop().run_in_executor(self.executor, self.get, source, url, max_age)
+
+	def put_background(self, source: str, url: str, symbol: str, status: int, reason: str,
+	                   body: bytes) -> concurrent.futures.Future:
+		"""
+		Write payload to store on thread of store, without waiting for it
+
+		@param source: Name of source
+		@param url: Url of request
+		@param symbol: Ticker symbol
+		@param status: Http status code
+		@param reason: Http reason
+		@param body: Raw body
+
+		@return: Future of write
+		"""
+		return self.executor.submit(self.put, source, url, symbol, status, reason, body)
+
+	def get_mapping(self, namespace: str, symbol: str) -> Optional[tuple[Optional[str], float]]:
+		"""
+		Read value of symbol in mapping
+
+		@param namespace: Name of mapping
+		@param symbol: Ticker symbol, upper case
+
+		@return: Value and Unix time it was set, None if symbol is not mapped
+		"""
+		with self._lock:
+			return self.connection.execute(
+				"SELECT value, fetched_at FROM symbol_map WHERE namespace = ? AND symbol = ?",
+				(namespace, symbol)).fetchone()
+
+	def put_mappings(self, namespace: str, rows: list[tuple[str, Optional[str], float]]) -> None:
+		"""
+		Write values of symbols in mapping, replacing previous ones
+
+		@param namespace: Name of mapping
+		@param rows: Symbol, upper case, its value and Unix time it was set
+		"""
+		with self._lock:
+			self.connection.executemany(
+				"INSERT OR REPLACE INTO symbol_map (namespace, symbol, value, fetched_at) VALUES (?, ?, ?, ?)",
+				[(namespace, *row) for row in rows])
+
+	def symbols(self) -> list[str]:
+		"""
+		@return: Symbols with any stored payload
+		"""
+		with self._lock:
+			return [row[0] for row in self.connection.execute("SELECT DISTINCT symbol FROM payloads ORDER BY symbol")]
+
+	def purge(self, older_than: float) -> int:
+		"""
+		Remove payloads older than given age
+
+		@param older_than: Age in seconds
+		@return: Number of removed payloads
+		"""
+		with self._lock:
+			cursor = self.connection.execute("DELETE FROM payloads WHERE fetched_at < ?", (time.time() - older_than,))
+			return cursor.rowcount
+
+	def close(self) -> None:
+		"""
+		Close connection, it is opened again on next use
+		"""
+		with self._lock:
+			if self._connection is not None:
+				self._connection.close()
+				self._connection = None
+
+
+class SymbolMap:
+	"""
+	Persistent mapping of symbols to values, within namespace of store. Negative results, symbols known
+	to have no value, are kept too, but for shorter time
+
+	Sources use L{get_async} and L{put_background}, so database and seed file are read on thread of store
+
+	@param store: Store with database
+	@type store: PayloadStore
+
+	@param namespace: Name of mapping
+	@type namespace: str
+
+	@param ttl: Seconds to keep values for
+	@type ttl: float
+
+	@param negative_ttl: Seconds to keep negative results for
+	@type negative_ttl: float
+
+	@param seed_path: CSV file with "symbol,value" rows, loaded on first use. Empty value is negative result
+	@type seed_path: Optional[str]
+	"""
+
+	UNKNOWN = object()
+	"""Returned for symbols that are not mapped, or whose mapping expired"""
+
+	def __init__(self, store: PayloadStore, namespace: str, ttl: float = 90 * 24 * 3600,
+	             negative_ttl: float = 24 * 3600, seed_path: Optional[str] = None):
+		self.store: PayloadStore = store
+		self.namespace: str = namespace
+		self.ttl: float = ttl
+		self.negative_ttl: float = negative_ttl
+		self.seed_path: Optional[str] = seed_path
+		self._memory: dict[str, tuple[Optional[str], float]] = {}
+
+	def get(self, symbol: str) -> Optional[str] | object:
+		"""
+		Get value of symbol
+
+		@param symbol: Ticker symbol
+
+		@return: Value, None for negative result, or C{UNKNOWN}
+		"""
+		if self.seed_path is not None:
+			path, self.seed_path = self.seed_path, None
+			self.load(path)
+		symbol = symbol.upper()
+		if symbol not in self._memory:
+			try:
+				row = self.store.get_mapping(self.namespace, symbol)
+			except sqlite3.Error as e:
+				logger.warning(f"Symbol map read failed: {e}")
+				return self.UNKNOWN
+			if row is None:
+				return self.UNKNOWN
+			self._memory[symbol] = row
+		value, fetched_at = self._memory[symbol]
+		if time.time() - fetched_at > (self.ttl if value is not None else self.negative_ttl):
+			self._memory.pop(symbol)
+			return self.UNKNOWN
+		return value
+
+	async def get_async(self, symbol: str) -> Optional[str] | object:
+		"""
+		Get value of symbol. Values in memory are returned right away, database and seed file are read
+		on thread of store
+
+		@param symbol: Ticker symbol
+
+		@return: Value, None for negative result, or C{UNKNOWN}
+		"""
+		if self.seed_path is None and symbol.upper() in self._memory:
+			return self.get(symbol)
+		return await asyncio.get_running_loop().run_in_executor(self.store.executor, self.get, symbol)
+
+	def put_background(self, symbol: str, value: Optional[str]) -> concurrent.futures.Future:
+		"""
+		Set value of symbol on thread of store, without waiting for it
+
+		@param symbol: Ticker symbol
+		@param value: Value, None for negative result
+
+		@return: Future of write
+		"""
+		return self.store.executor.submit(self.put, symbol, value)
+
+	def put(self, symbol: str, value: Optional[str]) -> None:
+		"""
+		Set value of symbol
+
+		@param symbol: Ticker symbol
+		@param value: Value, None for negative result
+		"""
+		self.put_many([(symbol, value)])
+
+	def put_many(self, items: list[tuple[str, Optional[str]]]) -> None:
+		"""
+		Set values of many symbols at once
+
+		@param items: Pairs of symbol and value, None value for negative result
+		"""
+		now = time.time()
+		rows = [(symbol.upper(), value or None, now) for symbol, value in items]
+		try:
+			self.store.put_mappings(self.namespace, rows)
+		except sqlite3.Error as e:
+			logger.warning(f"Symbol map write failed: {e}")
+		for symbol, value, fetched_at in rows:
+			self._memory[symbol] = (value, fetched_at)
+
+	def load(self, path: str) -> int:
+		"""
+		Pre-populate mapping from CSV file with "symbol,value" rows. Empty value is negative result
+
+		@param path: Path to CSV file
+
+		@return: Number of loaded symbols
+		"""
+		try:
+			with open(path, newline="") as file:
+				items = [(row[0].strip(), row[1].strip() if len(row) > 1 else None)
+				         for row in csv.reader(file) if row and row[0].strip() and not row[0].startswith("#")]
+		except OSError as e:
+			logger.warning(f"Symbol map {self.namespace} could not be loaded from {path}: {e}")
+			return 0
+		self.put_many(items)
+		logger.info(f"Symbol map {self.namespace} loaded {len(items)} symbols from {path}")
+		return len(items)
@@ -0,0 +1,261 @@
+"""
+Compact struct-of-arrays container of many results.
+
+Values and colors of properties, and trends, of all results are kept in few NumPy arrays instead of
+thousands of small objects, f.ex for batch screening. Any row is turned back to dictionary of exactly
+the shape C{Result.to_dict} has, and whole columns can be taken as arrays for batch calculations.
+
+@see ResultTable: for container itself
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+import flaskr.source.elements as elements
+from flaskr.source.sources.YahooQuoteSummary import Profile
+
+TEXTS: tuple[str, ...] = ("ticker", "name", "shortName", "address", "industry")
+"""Text fields of result"""
+
+HISTORIES: tuple[str, ...] = ("roic", "equity", "eps", "sales", "cash")
+"""Fields of result with list of properties"""
+
+HISTORY_LENGTH = 4
+"""Number of properties in history kept in arrays, longer histories are kept as objects"""
+
+TRENDS: tuple[str, ...] = tuple(f"{history}_trend" for history in HISTORIES)
+"""Trend fields of result"""
+
+VALUES: tuple[str, ...] = ("total_debt", "free_cash_flow", "debt_payoff_time", "debt_equity_ratio",
+                           "margin_of_safety_price", "current_price", "sticker_price", "payback_time",
+                           "average_volume", "shares_to_hold")
+"""Single property fields of result"""
+
+_COLUMNS: dict[str, int] = {name: i for i, name in enumerate(
+	VALUES + tuple(f"{history}_{i}" for history in HISTORIES for i in range(HISTORY_LENGTH)))}
+"""Column of every property in value arrays"""
+
+_MAX_EXACT = 2 ** 53
+"""Integers above it do not survive conversion to float"""
+
+
+class ResultTable:
+	"""
+	Results of many tickers, kept column-wise
+
+	Property values are floats with NaN for None, integral ones are flagged so they are given back as
+	integers. Colors are indices to palette. Fields that do not fit arrays, f.ex text values, are kept
+	as objects aside, so every result is given back unchanged.
+
+	@param capacity: Number of rows to allocate at first, arrays double when full
+	@type capacity: int
+	"""
+
+	def __init__(self, capacity: int = 1024):
+		"""
+		Prepare empty table
+
+		@param capacity: Number of rows to allocate at first
+		"""
+		capacity = max(capacity, 1)
+		self._length: int = 0
+		self._values: np.ndarray = np.full((capacity, len(_COLUMNS)), np.nan)
+		self._integral: np.ndarray = np.zeros((capacity, len(_COLUMNS)), dtype=bool)
+		self._colors: np.ndarray = np.zeros((capacity, len(_COLUMNS)), dtype=np.uint8)
+		self._lengths: np.ndarray = np.zeros((capacity, len(HISTORIES)), dtype=np.int8)
+		self._trends: np.ndarray = np.full((capacity, len(TRENDS), 2), np.nan)
+
+		self._texts: list[tuple] = []
+		self._profiles: list[Optional[tuple]] = []
+		self._errors: list[Any] = []
+		self._sources: list[tuple] = []
+		self._objects: dict[tuple[int, str], Any] = {}
+
+		self._palette: list[Optional[str]] = [None]
+		self._palette_index: dict[Optional[str], int] = {None: 0}
+		self._keys: list[tuple[str, ...]] = []
+		self._keys_index: dict[tuple[str, ...], int] = {}
+
+	def append(self, result: elements.Result) -> int:
+		"""
+		Add result as new row
+
+		@param result: Result to add
+		@return: Index of row
+		"""
+		row = self._length
+		if row == len(self._values):
+			self.__grow(2 * row)
+		self._length += 1
+
+		self._texts.append(tuple(getattr(result, name) for name in TEXTS))
+		if result.profile is None:
+			self._profiles.append(None)
+		elif isinstance(result.profile, Profile):
+			self._profiles.append(tuple(getattr(result.profile, name) for name in Profile.__slots__))
+		else:
+			self._profiles.append(None)
+			self._objects[(row, "profile")] = result.profile.to_dict()
+		self._errors.append(list(result.error) if isinstance(result.error, tuple) else result.error)
+		self._sources.append(tuple((name, self.__keys(tuple(state)), tuple(state.values()))
+		                           for name, state in result.sources.items()))
+
+		for name in VALUES:
+			if not self.__put(row, _COLUMNS[name], getattr(result, name)):
+				self._objects[(row, name)] = getattr(result, name).to_dict()
+		for h, name in enumerate(HISTORIES):
+			history = getattr(result, name)
+			if history is None:
+				self._lengths[row, h] = -1
+			elif len(history) > HISTORY_LENGTH or \
+					not all(self.__put(row, _COLUMNS[f"{name}_{i}"], prop) for i, prop in enumerate(history)):
+				self._lengths[row, h] = -1
+				self._objects[(row, name)] = [prop.to_dict() for prop in history]
+			else:
+				self._lengths[row, h] = len(history)
+		for t, name in enumerate(TRENDS):
+			trend = getattr(result, name)
+			if all(value is None or type(value) is float for value in (trend.slope, trend.r_squared)):
+				self._trends[row, t] = (np.nan if trend.slope is None else trend.slope,
+				                        np.nan if trend.r_squared is None else trend.r_squared)
+			else:
+				self._objects[(row, name)] = trend.to_dict()
+		return row
+
+	def extend(self, results: Iterable[elements.Result]) -> None:
+		"""
+		Add results as new rows
+
+		@param results: Results to add
+		"""
+		for result in results:
+			self.append(result)
+
+	def column(self, name: str) -> np.ndarray:
+		"""
+		Values of field in all rows, NaN for missing ones. Rows whose field is kept as object are NaN too
+
+		@param name: Name of single property field, history, or trend
+		@return: Array of values of single property, rows by history length array for history, and rows by
+			slope and R² array for trend
+		"""
+		if name in TRENDS:
+			return self._trends[:self._length, TRENDS.index(name)].copy()
+		if name in HISTORIES:
+			start = _COLUMNS[f"{name}_0"]
+			return self._values[:self._length, start:start + HISTORY_LENGTH].copy()
+		if name in VALUES:
+			return self._values[:self._length, _COLUMNS[name]].copy()
+		raise KeyError(name)
+
+	def __getitem__(self, row: int) -> dict:
+		"""
+		Dictionary of row, the same as C{Result.to_dict} of added result
+
+		@param row: Index of row
+		@return: Dictionary of result
+		"""
+		if row < 0:
+			row += self._length
+		if not 0 <= row < self._length:
+			raise IndexError(row)
+		data = dict(zip(TEXTS, self._texts[row]))
+		profile = self._profiles[row]
+		data["profile"] = dict(zip(Profile.__slots__, profile)) if profile is not None else \
+			self._objects.get((row, "profile"))
+		for h, name in enumerate(HISTORIES):
+			length = self._lengths[row, h]
+			data[name] = [self.__get(row, _COLUMNS[f"{name}_{i}"]) for i in range(length)] if length >= 0 else \
+				self._objects.get((row, name))
+		for t, name in enumerate(TRENDS):
+			if (row, name) in self._objects:
+				data[name] = self._objects[(row, name)]
+			else:
+				slope, r_squared = self._trends[row, t]
+				data[name] = {"slope": None if np.isnan(slope) else float(slope),
+				              "r_squared": None if np.isnan(r_squared) else float(r_squared)}
+		for name in VALUES:
+			data[name] = self._objects[(row, name)] if (row, name) in self._objects else \
+				self.__get(row, _COLUMNS[name])
+		data["error"] = self._errors[row]
+		data["sources"] = {name: dict(zip(self._keys[keys], values)) for name, keys, values in self._sources[row]}
+		return data
+
+	def __iter__(self) -> Iterator[dict]:
+		for row in range(self._length):
+			yield self[row]
+
+	def __len__(self) -> int:
+		return self._length
+
+	def __put(self, row: int, column: int, prop: elements.Property) -> bool:
+		"""
+		Store property in arrays
+
+		@param row: Index of row
+		@param column: Column of property
+		@param prop: Property
+		@return: If property fits arrays, False if it has to be kept as object
+		"""
+		value = prop.value
+		if value is None:
+			pass
+		elif type(value) is int and abs(value) <= _MAX_EXACT:
+			self._values[row, column] = value
+			self._integral[row, column] = True
+		elif isinstance(value, float) and not np.isnan(value):
+			self._values[row, column] = value
+		else:
+			return False
+		if prop.color not in self._palette_index:
+			if len(self._palette) > np.iinfo(np.uint8).max:
+				return False
+			self._palette_index[prop.color] = len(self._palette)
+			self._palette.append(prop.color)
+		self._colors[row, column] = self._palette_index[prop.color]
+		return True
+
+	def __get(self, row: int, column: int) -> dict:
+		"""
+		Dictionary of property stored in arrays
+
+		@param row: Index of row
+		@param column: Column of property
+		@return: Dictionary with color and value
+		"""
+		value = self._values[row, column]
+		if np.isnan(value):
+			value = None
+		elif self._integral[row, column]:
+			value = int(value)
+		else:
+			value = float(value)
+		return {"color": self._palette[self._colors[row, column]], "value": value}
+
+	def __keys(self, keys: tuple[str, ...]) -> int:
+		"""
+		Index of shared tuple of keys, source states of all rows have mostly the same keys
+
+		@param keys: Keys of dictionary
+		@return: Index to C{_keys}
+		"""
+		if keys not in self._keys_index:
+			self._keys_index[keys] = len(self._keys)
+			self._keys.append(keys)
+		return self._keys_index[keys]
+
+	def __grow(self, capacity: int) -> None:
+		"""
+		Reallocate arrays for more rows
+
+		@param capacity: New number of rows
+		"""
+		for name, fill in (("_values", np.nan), ("_integral", False), ("_colors", 0), ("_lengths", 0),
+		                   ("_trends", np.nan)):
+			array = getattr(self, name)
+			grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+			grown[:len(array)] = array
+			setattr(self, name, grown)
@@ -0,0 +1,154 @@
+"""
+In-memory universe of listed symbols, loaded from local listing file.
+
+Symbols are kept in sorted array, so symbols starting with prefix are found with binary search, and
+in set for membership. Unknown symbols are then rejected before any upstream call is made.
+
+Listing is read from file in C{SYMBOL_LISTING_FILE} environment variable. It is either pipe delimited,
+as listings of Nasdaq Trader (C{nasdaqlisted.txt}, C{otherlisted.txt}), or CSV, with symbol in first
+column and name of security in second. Several files can be given, separated by C{os.pathsep}.
+
+@see SymbolUniverse: for universe itself
+"""
+
+from __future__ import annotations
+
+import bisect
+import csv
+import logging
+import os
+import threading
+from typing import Iterable, Optional
+
+logger = logging.getLogger("IsThisStockGood")
+
+
+class SymbolUniverse:
+	"""
+	Sorted index of listed symbols and names of their securities
+
+	Universe without any symbol is not loaded, and knows every symbol, so app without listing file works
+	as before.
+
+	@param paths: Listing files, loaded on first use
+	@type paths: list[str]
+	"""
+
+	def __init__(self, paths: Optional[Iterable[str]] = None):
+		"""
+		Prepare universe, listing files are read on first use
+
+		@param paths: Listing files
+		"""
+		self.paths: list[str] = list(paths or [])
+		self._symbols: list[str] = []
+		self._names: list[str] = []
+		self._members: frozenset[str] = frozenset()
+		self._loaded: bool = not self.paths
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_env(cls) -> SymbolUniverse:
+		"""
+		Create universe of listing files in C{SYMBOL_LISTING_FILE} environment variable
+
+		@return: Universe
+		"""
+		return cls(path for path in os.environ.get("SYMBOL_LISTING_FILE", "").split(os.pathsep) if path)
+
+	@property
+	def loaded(self) -> bool:
+		"""
+		@return: If universe has any symbol
+		"""
+		self.__ensure()
+		return bool(self._members)
+
+	def load(self, listing: Iterable[tuple[str, str]]) -> int:
+		"""
+		Replace universe with symbols of listing
+
+		@param listing: Pairs of symbol and name of security
+		@return: Number of symbols
+		"""
+		entries = dict(sorted((symbol.strip().upper(), name.strip()) for symbol, name in listing if symbol.strip()))
+		with self._lock:
+			self._symbols = list(entries)
+			self._names = list(entries.values())
+			self._members = frozenset(entries)
+			self._loaded = True
+		return len(entries)
+
+	def suggest(self, prefix: str, limit: int = 10) -> list[tuple[str, str]]:
+		"""
+		Symbols starting with prefix, in alphabetical order. Exact match is always first
+
+		@param prefix: Start of symbol, any case
+		@param limit: Maximal number of symbols
+		@return: Pairs of symbol and name of security
+		"""
+		self.__ensure()
+		prefix = prefix.strip().upper()
+		if not prefix or limit <= 0:
+			return []
+		symbols, names = self._symbols, self._names
+		start = bisect.bisect_left(symbols, prefix)
+		end = bisect.bisect_left(symbols, prefix + "\U0010ffff", start, min(start + limit, len(symbols)))
+		return list(zip(symbols[start:end], names[start:end]))
+
+	def __contains__(self, symbol: str) -> bool:
+		"""
+		@param symbol: Ticker symbol, any case. Class separator can be dot or dash, f.ex C{BRK.B} or C{BRK-B}
+		@return: If symbol is listed, or universe is not loaded
+		"""
+		self.__ensure()
+		if not self._members:
+			return True
+		symbol = symbol.upper()
+		return symbol in self._members or symbol.replace("-", ".") in self._members or \
+			symbol.replace(".", "-") in self._members
+
+	def __len__(self) -> int:
+		self.__ensure()
+		return len(self._symbols)
+
+	def __ensure(self) -> None:
+		"""
+		Load listing files, if they were not loaded yet
+		"""
+		if self._loaded:
+			return
+		listing: list[tuple[str, str]] = []
+		for path in self.paths:
+			listing.extend(read_listing(path))
+		count = self.load(listing)
+		logger.info(f"Symbol universe loaded {count} symbols from {', '.join(self.paths)}")
+
+
+def read_listing(path: str) -> list[tuple[str, str]]:
+	"""
+	Read listing file. Test issues, and footer of Nasdaq Trader listings, are skipped
+
+	@param path: Path to listing file, pipe delimited or CSV
+	@return: Pairs of symbol and name of security, empty if file can not be read
+	"""
+	try:
+		with open(path, newline="", encoding="utf-8") as file:
+			header = file.readline()
+			delimiter = "|" if "|" in header else ","
+			columns = [column.strip().lower() for column in header.split(delimiter)]
+			if not any(column in ("symbol", "act symbol", "ticker") for column in columns):
+				file.seek(0)  # No header
+				columns = []
+			test = columns.index("test issue") if "test issue" in columns else None
+			listing = []
+			for row in csv.reader(file, delimiter=delimiter):
+				if not row or not row[0].strip() or row[0].startswith(("#", "File Creation Time")):
+					continue
+				if test is not None and len(row) > test and row[test].strip() == "Y":
+					continue
+				listing.append((row[0], row[1] if len(row) > 1 else ""))
+			return listing
+	except OSError as e:
+		logger.warning(f"Symbol listing could not be read from {path}: {e}")
+		return []
@@ -0,0 +1,227 @@
+"""
+Popularity-driven warming of result cache.
+
+Every interactive lookup counts towards popularity of its symbol, and the counts decay over time, so
+symbols that are popular now rank highest. In background, most popular symbols are refreshed shortly
+before their cached results expire, so their visitors are served from cache, without cold fetch.
+
+@see Popularity: for decaying counters
+@see CacheWarmer: for background refreshes
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("IsThisStockGood")
+
+
+class Popularity:
+	"""
+	Exponentially decaying counters of requests per symbol
+
+	Counters are kept scaled to fixed reference time instead of decaying all of them on every hit,
+	they are rescaled only when the scale grows too large.
+
+	@param half_life: Seconds after which count of request is worth half
+	@type half_life: float
+
+	@param max_symbols: Maximal number of tracked symbols, the least popular half is dropped above it
+	@type max_symbols: int
+	"""
+
+	def __init__(self, half_life: float = 3600.0, max_symbols: int = 10000, clock: Callable[[], float] = time.monotonic):
+		"""
+		Prepare empty counters
+
+		@param half_life: Seconds after which count is worth half
+		@param max_symbols: Maximal number of tracked symbols
+		@param clock: Function returning current time in seconds
+		"""
+		self.half_life: float = half_life
+		self.max_symbols: int = max_symbols
+		self._clock: Callable[[], float] = clock
+		self._rate: float = math.log(2) / half_life
+		self._reference: float = clock()
+		self._scores: dict[str, float] = {}
+		self._lock = threading.Lock()
+
+	def hit(self, symbol: str, weight: float = 1.0) -> None:
+		"""
+		Count request for symbol
+
+		@param symbol: Ticker symbol
+		@param weight: Weight of request
+		"""
+		with self._lock:
+			exponent = (self._clock() - self._reference) * self._rate
+			if exponent > 50:
+				self.__rescale(exponent)
+				exponent = 0.0
+			self._scores[symbol] = self._scores.get(symbol, 0.0) + weight * math.exp(exponent)
+			if len(self._scores) > self.max_symbols:
+				keep = heapq.nlargest(self.max_symbols // 2, self._scores.items(), key=lambda item: item[1])
+				self._scores = dict(keep)
+
+	def top(self, n: int) -> list[tuple[str, float]]:
+		"""
+		Most popular symbols
+
+		@param n: Number of symbols
+		@return: Symbols with their current decayed counts, most popular first
+		"""
+		with self._lock:
+			scale = math.exp(-(self._clock() - self._reference) * self._rate)
+			return [(symbol, score * scale) for symbol, score in
+			        heapq.nlargest(n, self._scores.items(), key=lambda item: item[1])]
+
+	def __rescale(self, exponent: float) -> None:
+		"""
+		Move reference time to now, lock has to be held
+
+		@param exponent: Exponent of current scale
+		"""
+		scale = math.exp(-exponent)
+		self._scores = {symbol: score * scale for symbol, score in self._scores.items() if score * scale > 1e-6}
+		self._reference = self._clock()
+
+	def __len__(self) -> int:
+		return len(self._scores)
+
+
+class CacheWarmer:
+	"""
+	Background loop refreshing results of most popular symbols before they expire
+
+	Refreshes are rate limited, and the loop backs off while interactive traffic is busy, so it never
+	competes with it for upstream connections.
+
+	@param popularity: Counters of requests
+	@type popularity: Popularity
+
+	@param warm: Coroutine function refreshing symbol if its result expires soon. It returns what was
+		refreshed, f.ex "full" or "price", or None if nothing had to be
+	@type warm: Callable[[str], Awaitable[Optional[str]]]
+
+	@param busy: Function telling if interactive traffic is busy at the moment
+	@type busy: Callable[[], bool]
+
+	@param top_n: Number of most popular symbols to keep warm
+	@type top_n: int
+
+	@param interval: Seconds between rounds
+	@type interval: float
+
+	@param rate: Maximal number of refreshes per second
+	@type rate: float
+	"""
+
+	def __init__(self, popularity: Popularity, warm: Callable[[str], Awaitable[Optional[str]]],
+	             busy: Callable[[], bool] = lambda: False, top_n: int = 50, interval: float = 60.0, rate: float = 1.0):
+		"""
+		Prepare stopped warmer
+
+		@param popularity: Counters of requests
+		@param warm: Coroutine function refreshing symbol if needed
+		@param busy: Function telling if interactive traffic is busy
+		@param top_n: Number of symbols to keep warm
+		@param interval: Seconds between rounds
+		@param rate: Maximal refreshes per second
+		"""
+		self.popularity: Popularity = popularity
+		self.warm: Callable[[str], Awaitable[Optional[str]]] = warm
+		self.busy: Callable[[], bool] = busy
+		self.top_n: int = top_n
+		self.interval: float = interval
+		self.rate: float = rate
+		self._task: Optional[asyncio.Task] = None
+
+		self.rounds: int = 0
+		self.checked: int = 0
+		self.refreshes: dict[str, int] = {}
+		self.failures: int = 0
+		self.busy_pauses: int = 0
+		self.last_round: Optional[float] = None
+		self.last_round_ms: Optional[int] = None
+
+	def start(self) -> asyncio.Task:
+		"""
+		Start background loop in running loop, if it is not running already
+
+		@return: Task of background loop
+		"""
+		if self._task is None or self._task.done():
+			self._task = asyncio.ensure_future(self.run())
+		return self._task
+
+	def stop(self) -> None:
+		"""
+		Cancel background loop
+		"""
+		if self._task is not None:
+			self._task.cancel()
+			self._task = None
+
+	async def run(self) -> None:
+		"""
+		Run rounds forever, every C{interval} seconds
+		"""
+		while True:
+			await asyncio.sleep(self.interval)
+			try:
+				await self.round()
+			except Exception as e:
+				logger.error(f"Cache warmer round failed: {e!r}")
+
+	async def round(self) -> None:
+		"""
+		Check most popular symbols once, refreshing those that expire soon
+		"""
+		start = time.monotonic()
+		gap = 1.0 / self.rate if self.rate > 0 else 0.0
+		for symbol, _ in self.popularity.top(self.top_n):
+			while self.busy():
+				self.busy_pauses += 1
+				await asyncio.sleep(max(gap, 1.0))
+			self.checked += 1
+			try:
+				refreshed = await self.warm(symbol)
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.warning(f"Cache warmer failed to refresh {symbol}: {e!r}")
+				self.failures += 1
+				await asyncio.sleep(gap)
+				continue
+			if refreshed is not None:
+				self.refreshes[refreshed] = self.refreshes.get(refreshed, 0) + 1
+				await asyncio.sleep(gap)
+		self.rounds += 1
+		self.last_round = time.time()
+		self.last_round_ms = round((time.monotonic() - start) * 1000)
+
+	def stats(self, top: int = 10) -> dict:
+		"""
+		Activity of warmer
+
+		@param top: Number of most popular symbols to list
+		@return: Dictionary with counters, and most popular symbols with their counts
+		"""
+		return {
+			"running": self._task is not None and not self._task.done(),
+			"tracked_symbols": len(self.popularity),
+			"top": {symbol: round(score, 3) for symbol, score in self.popularity.top(top)},
+			"rounds": self.rounds,
+			"checked": self.checked,
+			"refreshes": dict(self.refreshes),
+			"failures": self.failures,
+			"busy_pauses": self.busy_pauses,
+			"last_round": self.last_round,
+			"last_round_ms": self.last_round_ms,
+		}
@@ -1,18 +1,25 @@
 """
 This is backend flask app for page
 
+App is created by L{create_app}. Heavy modules are imported on first use, not at start: previews with
+Pillow and fonts on first preview, sources with aiohttp, lxml and numpy on first lookup. Cache warmer is
+started by first request, so importing this module starts nothing. Compiled templates are kept in bytecode
+cache, in directory from C{TEMPLATE_CACHE_DIR} environment variable, empty value disables it.
 """
 import logging
 import json
-import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
 
-import flaskr.source as source
-
-import flaskr.preview as preview
+from flaskr.jsonprovider import FastJSONProvider
 
 from datetime import date
-from flask import Flask, request, render_template, send_file
+from flask import Flask, request, render_template
 import flask
+import jinja2
 
 logging.basicConfig(format='%(name)s - %(levelname)s : %(message)s')
 
@@ -20,35 +27,132 @@ logger = logging.getLogger("IsThisStockGood")
 
 logger.level = logging.ERROR
 
-app = Flask(__name__, static_folder='assets')
+pages = flask.Blueprint("pages", __name__)
+
+TEMPLATE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "isthisstockgood", "templates")
+
+_warmer_started = False
+_warmer_lock = threading.Lock()
+
+
+def create_app() -> Flask:
+	"""
+	Create app with its pages, JSON provider and template cache. It has no side effects, so it can be called
+	again, f.ex by tests; cache warmer is started by first request of any app
+
+	@return: App
+	"""
+	app = Flask(__name__, static_folder='assets')
+	app.json = FastJSONProvider(app)
+	directory = os.environ.get("TEMPLATE_CACHE_DIR", TEMPLATE_CACHE_DIR)
+	if directory:
+		try:
+			os.makedirs(directory, exist_ok=True)
+			app.jinja_options = {**app.jinja_options, "bytecode_cache": jinja2.FileSystemBytecodeCache(directory)}
+		except OSError as e:
+			logger.warning(f"Template cache could not be created in {directory}: {e}")
+	app.register_blueprint(pages)
+	return app
 
 
-@app.route("/<ticker>/preview.jpg")
+@pages.before_app_request
+def _start_warmer() -> None:
+	"""
+	Start cache warmer once per process, on first request, unless C{CACHE_WARMER} environment variable disables it
+	"""
+	global _warmer_started
+	if _warmer_started:
+		return
+	with _warmer_lock:
+		if _warmer_started:
+			return
+		_warmer_started = True
+	if os.environ.get("CACHE_WARMER", "1") not in ("0", "false", "no"):
+		import flaskr.runner as runner
+		import flaskr.source as source
+		runner.loop_thread.loop.call_soon_threadsafe(source.warmer.start)
+
+
+def compile_templates(app: Flask) -> int:
+	"""
+	Compile every page template, and keep it in app and in bytecode cache, so no request compiles it
+
+	@param app: App
+	@return: Number of templates
+	"""
+	names = app.jinja_env.list_templates(extensions=["html"])
+	for name in names:
+		app.jinja_env.get_template(name)
+	return len(names)
+
+
+@pages.route("/<ticker>/preview.jpg")
 def symbol_preview(ticker: str = None):
 	"""
 	Generate jpg file with symbol preview for thumbnails.
 
+	Previews are cached by content hash of what they show, which is also their ETag, so conditional
+	requests of crawlers are answered with 304 without rendering. When render pool is full, 503 is returned.
+	Size variant, f.ex C{og} or C{thumbnail}, is chosen with C{size} query argument
+
 	@param ticker: Ticker symbol
 	@return: JPG image
 	"""
+	import flaskr.preview as preview
+	import flaskr.runner as runner
 	if request.environ['HTTP_HOST'].endswith('.appspot.com'):  # Redirect the appspot url to the custom url
 		return flask.redirect(f"http://isthisstockgood.com/{ticker}/preview.jpg", code=302)
 	
-	ticker = ticker.upper()
+	size = request.args.get("size") or None
+	if size is not None and size not in preview.SIZES:
+		return {"error": f"Unknown size, use one of: {', '.join(preview.SIZES)}"}, 400
+	
+	try:
+		key, body, error = runner.run(_preview(ticker.upper(), size, request.if_none_match.contains))
+	except preview.Saturated:
+		return flask.Response("Previews are busy, please try again later", status=503, mimetype="text/plain",
+		                      headers={"Retry-After": "1", "Cache-Control": "no-store"})
 	
+	response = flask.Response(status=304) if body is None else flask.Response(body, mimetype="image/jpeg")
+	response.set_etag(key)
+	response.cache_control.public = True
+	cache = preview.image_cache
+	response.cache_control.max_age = int(cache.error_ttl if error else min(cache.ttl, 3600))
+	return response
+
+
+async def _preview(ticker: str, size: Optional[str], fresh: Callable[[str], bool]) \
+		-> tuple[str, Optional[bytes], bool]:
+	"""
+	Look ticker up, as search does, and get its preview from cache or render it on render pool
+
+	@param ticker: Ticker symbol, upper case
+	@param size: Name of size variant, None for master size
+	@param fresh: Function telling if client has preview with given key already
+	@return: Key of preview, encoded preview or None if client has it, and if it is error preview
+
+	@raise preview.Saturated: Render pool is full
+	"""
+	import flaskr.preview as preview
+	import flaskr.source as source
 	if source.check(ticker):
-		data, code = source.ticker(ticker)
+		data, code = await source.ticker(ticker)
 		if data["error"]:
-			img = preview.error(ticker, code, data["error"])
+			key, error = preview.error_key(ticker, code, data["error"], size=size), True
+			render = lambda: preview.error(ticker, code, data["error"], size=size).getvalue()
 		else:
-			img = preview.ticker(ticker, data)
+			key, error = preview.key(ticker, data, size), False
+			render = lambda: preview.ticker(ticker, data, size).getvalue()
 	else:
-		img = preview.error(ticker, 400, "Invalid ticker",
-		                    "Provided ticker is invalid. \nPlease check and correct, then try again.")
-	return send_file(img, mimetype='image/jpeg')
+		description = "Provided ticker is invalid. \nPlease check and correct, then try again."
+		key, error = preview.error_key(ticker, 400, "Invalid ticker", description, size), True
+		render = lambda: preview.error(ticker, 400, "Invalid ticker", description, size).getvalue()
+	if fresh(key):
+		return key, None, error
+	return key, await preview.cached(key, render, error), error
 
 
-@app.route("/<ticker>")
+@pages.route("/<ticker>")
 def company_page(ticker: str = None):
 	"""
 	Page with ticker loading
@@ -64,7 +168,7 @@ def company_page(ticker: str = None):
 	return render_template('home.html', **vals)
 
 
-@app.route("/")
+@pages.route("/")
 def homepage():
 	"""
 	Main page without data
@@ -82,18 +186,60 @@ def homepage():
 	return render_template('home.html', **vals)
 
 
-@app.route("/favourites")
+def _favourite_tickers() -> list:
+	"""
+	Favourite tickers of request, from C{ticker} query arguments, or from cookie
+
+	@return: List of tickers
+	"""
+	if request.args.getlist("ticker"):
+		return request.args.getlist("ticker")
+	try:
+		favs = json.loads(flask.request.cookies.get('favourite-tickers', "[]"))
+	except ValueError:
+		return []
+	return [t for t in favs if isinstance(t, str)] if isinstance(favs, list) else []
+
+
+@pages.route("/favourites")
 def favourites():
-	loop = asyncio.new_event_loop()
-	favs: list = json.loads(flask.request.cookies.get('favourite-tickers', "[]"))
-	result: dict[str, dict] = loop.run_until_complete(source.favourites(favs))
-	
-	loop.run_until_complete(asyncio.sleep(0))
-	loop.close()
+	import flaskr.runner as runner
+	import flaskr.source as source
+	favs: list = _favourite_tickers()
+	result: dict[str, dict] = runner.run(source.favourites(favs))
 	return result
 
 
-@app.route("/me/favourites")
+@pages.route("/favourites/stream")
+def favourites_stream():
+	"""
+	Stream data of favourite tickers, every ticker as soon as its lookup finishes
+
+	Every item is object with C{ticker}, C{code} and C{data}. It is sent as line of json (NDJSON), or as
+	server-sent event if client accepts C{text/event-stream} or C{format=sse} is requested
+
+	@return: Streamed response
+	"""
+	import flaskr.runner as runner
+	import flaskr.source as source
+	sse = request.args.get("format") == "sse" or \
+		request.accept_mimetypes.best_match(["application/x-ndjson", "text/event-stream"]) == "text/event-stream"
+	favs: list = _favourite_tickers()
+	dumps = flask.current_app.json.dumps
+
+	def generate():
+		for symbol, data, code in runner.iterate(source.favourites_stream(favs)):
+			item = dumps({"ticker": symbol, "code": code, "data": data})
+			yield f"event: ticker\ndata: {item}\n\n" if sse else f"{item}\n"
+		if sse:
+			yield "event: end\ndata: {}\n\n"
+
+	headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+	return flask.Response(generate(), mimetype="text/event-stream" if sse else "application/x-ndjson",
+	                      headers=headers)
+
+
+@pages.route("/me/favourites")
 def favourite():
 	"""
 	Page with favourite tickers and their details
@@ -111,28 +257,133 @@ def favourite():
 	return render_template('favourites.html', **vals)
 
 
-@app.route("/search/<ticker>")
+@pages.route("/search/<ticker>")
 def search(ticker: str):
 	"""
-	Return json with data acquired with ticker
+	Return json with data acquired with ticker. With C{fields} query argument, f.ex C{?fields=name,current_price},
+	only these fields are returned, and only sources they depend on are fetched
 
 	@param ticker: Symbol of company
 	@return: Json data
 	"""
+	import flaskr.runner as runner
+	import flaskr.source as source
 	if request.environ['HTTP_HOST'].endswith('.appspot.com'):  # Redirect the appspot url to the custom url
 		return flask.redirect(f"http://isthisstockgood.com/search/{ticker}", code=302)
 	
 	if not source.check(ticker):
 		return {"error": "Invalid ticker"}, 400
 	
-	loop = asyncio.new_event_loop()
-	ticker = ticker.upper()
-	data, code = loop.run_until_complete(source.ticker(ticker))
-	
-	loop.run_until_complete(asyncio.sleep(0))
-	loop.close()
+	fields = request.args.get("fields", "").split(",") if request.args.get("fields") else None
+	if fields:
+		import flaskr.source.planner as planner
+		try:
+			planner.plan(fields)
+		except ValueError as e:
+			return {"error": str(e)}, 400
+	data, code = runner.run(source.ticker(ticker.upper(), fields=fields))
 	return data, code
 
 
+@pages.route("/suggest/<prefix>")
+def suggest(prefix: str):
+	"""
+	Symbols starting with prefix, from local symbol universe. Number of symbols is set by C{limit} query
+	argument, 10 by default and 50 at most
+
+	@param prefix: Start of symbol
+	@return: Json with list of symbols and names of their securities
+	"""
+	import flaskr.source as source
+	limit = min(request.args.get("limit", 10, type=int), 50)
+	suggestions = [{"symbol": symbol, "name": name} for symbol, name in source.universe.suggest(prefix, limit)]
+	return {"prefix": prefix.upper(), "suggestions": suggestions}, 200, {"Cache-Control": "public, max-age=3600"}
+
+
+@pages.route("/_ah/warmup")
+def warmup():
+	"""
+	Warm instance up before it gets traffic: previews are loaded with their fonts, templates are compiled,
+	modules of sources are imported, connections to their hosts are opened, and hot tickers from C{WARMUP_TICKERS}
+	environment variable, separated by commas, are fetched into cache. App Engine requests it when it starts
+	instance
+
+	@return: Json with seconds every phase took, and its outcome
+	"""
+	import flaskr.runner as runner
+	import flaskr.source as source
+	tickers = [symbol.strip() for symbol in os.environ.get("WARMUP_TICKERS", "").split(",") if symbol.strip()]
+	app = flask.current_app
+
+	def previews() -> None:
+		import flaskr.preview as preview
+		preview.preload()
+
+	phases: dict[str, Callable[[], object]] = {
+		"previews": previews,
+		"templates": lambda: compile_templates(app),
+		"sources": source.preload,
+		"connections": lambda: runner.run(source.preconnect()),
+		"tickers": lambda: runner.run(source.prefetch(tickers)),
+	}
+	report: dict[str, dict] = {}
+	for name, phase in phases.items():
+		start = time.perf_counter()
+		outcome = phase()
+		report[name] = {"seconds": round(time.perf_counter() - start, 3)}
+		if outcome is not None:
+			report[name]["result"] = outcome
+	timings = ", ".join(f"{name} in {phase['seconds']} s" for name, phase in report.items())
+	logger.info(f"Instance warmed up: {timings}")
+	return report
+
+
+@pages.route("/status/cache")
+def cache_status():
+	"""
+	Counters of result cache
+
+	@return: Json with hits, misses and usage of cache
+	"""
+	import flaskr.source as source
+	return source.result_cache.stats()
+
+
+@pages.route("/status/previews")
+def previews_status():
+	"""
+	Counters of preview cache
+
+	@return: Json with hits, renders and usage of cache, and usage of render pool
+	"""
+	import flaskr.preview as preview
+	return {**preview.image_cache.stats(), "pool": preview.render_pool.stats()}
+
+
+@pages.route("/status/warmer")
+def warmer_status():
+	"""
+	Activity of cache warmer
+
+	@return: Json with counters of warmer, and most popular tickers
+	"""
+	import flaskr.source as source
+	return source.warmer.stats()
+
+
+@pages.route("/status/breakers")
+def breakers_status():
+	"""
+	State of circuit breakers of sources
+
+	@return: Json with state and counters of breaker for every source
+	"""
+	import flaskr.source as source
+	return {name: breaker.stats() for name, breaker in source.elements.Source.breakers.items()}
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
 	app.run(host='127.0.0.1', port=8080, debug=True)
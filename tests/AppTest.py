@@ -0,0 +1,45 @@
+"""Tests for creation of app in main.py, and start of cache warmer."""
+
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+os.environ.setdefault("CACHE_WARMER", "0")
+
+import flaskr.runner as runner
+import main
+
+class AppTest(unittest.TestCase):
+
+  def test_import_should_not_load_sources_or_start_threads(self):
+    code = "import sys, threading, main; print(sorted({'flaskr.source', 'flaskr.runner'} & set(sys.modules)), " \
+           "threading.active_count())"
+    output = subprocess.run([sys.executable, '-c', code], cwd=app_path, capture_output=True, text=True,
+                            env={**os.environ, 'CACHE_WARMER': '1'}, check=True).stdout
+    self.assertEqual(output.split(), ['[]', '1'])
+
+  def test_warmer_should_start_once_on_first_request_of_any_app(self):
+    loop_thread = mock.Mock()
+    with mock.patch.object(main, '_warmer_started', False), mock.patch.object(runner, 'loop_thread', loop_thread), \
+         mock.patch.dict(os.environ, {'CACHE_WARMER': '1'}):
+      first, second = main.create_app(), main.create_app()
+      loop_thread.loop.call_soon_threadsafe.assert_not_called()
+      for app in (first, second, first):
+        self.assertEqual(app.test_client().get('/status/warmer').status_code, 200)
+    loop_thread.loop.call_soon_threadsafe.assert_called_once()
+
+  def test_warmer_should_not_start_when_disabled(self):
+    loop_thread = mock.Mock()
+    with mock.patch.object(main, '_warmer_started', False), mock.patch.object(runner, 'loop_thread', loop_thread), \
+         mock.patch.dict(os.environ, {'CACHE_WARMER': '0'}):
+      main.create_app().test_client().get('/status/warmer')
+    loop_thread.loop.call_soon_threadsafe.assert_not_called()
+
+if __name__ == '__main__':
+  unittest.main()
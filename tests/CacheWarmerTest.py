@@ -0,0 +1,79 @@
+"""Tests for the flaskr/source/warmer.py Popularity and CacheWarmer."""
+
+
+import asyncio
+import os
+import sys
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.warmer import CacheWarmer, Popularity
+
+class Clock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+class CacheWarmerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.clock = Clock()
+    self.popularity = Popularity(half_life=60, clock=self.clock)
+
+  def test_counts_should_halve_after_half_life(self):
+    self.popularity.hit('AAPL')
+    self.popularity.hit('AAPL')
+    self.clock.now = 60
+    self.assertAlmostEqual(self.popularity.top(1)[0][1], 1.0)
+
+  def test_recent_requests_should_outrank_old_ones(self):
+    for _ in range(3):
+      self.popularity.hit('MSFT')
+    self.clock.now = 240
+    self.popularity.hit('AAPL')
+    self.assertEqual([symbol for symbol, _ in self.popularity.top(2)], ['AAPL', 'MSFT'])
+
+  def test_counts_should_survive_rescaling(self):
+    self.popularity.hit('AAPL')
+    self.clock.now = 60 * 100
+    self.popularity.hit('MSFT')
+    self.assertEqual(self.popularity.top(1)[0][0], 'MSFT')
+    self.assertAlmostEqual(self.popularity.top(1)[0][1], 1.0)
+
+  def test_least_popular_symbols_should_be_dropped(self):
+    popularity = Popularity(max_symbols=4, clock=self.clock)
+    for i, symbol in enumerate(['A', 'B', 'C', 'D']):
+      for _ in range(i + 1):
+        popularity.hit(symbol)
+    popularity.hit('E')
+    self.assertEqual(len(popularity), 2)
+    self.assertEqual([symbol for symbol, _ in popularity.top(2)], ['D', 'C'])
+
+  def test_round_should_warm_most_popular_symbols(self):
+    for symbol, hits in [('AAPL', 3), ('MSFT', 2), ('META', 1)]:
+      for _ in range(hits):
+        self.popularity.hit(symbol)
+    warmed = []
+    async def warm(symbol):
+      warmed.append(symbol)
+      return 'full' if symbol == 'AAPL' else None
+    warmer = CacheWarmer(self.popularity, warm, top_n=2, rate=1000)
+    asyncio.run(warmer.round())
+    self.assertEqual(warmed, ['AAPL', 'MSFT'])
+    stats = warmer.stats()
+    self.assertEqual(stats['refreshes'], {'full': 1})
+    self.assertEqual(stats['checked'], 2)
+    self.assertEqual(stats['rounds'], 1)
+
+  def test_round_should_count_failures(self):
+    self.popularity.hit('AAPL')
+    async def warm(symbol):
+      raise RuntimeError('upstream down')
+    warmer = CacheWarmer(self.popularity, warm, rate=1000)
+    asyncio.run(warmer.round())
+    self.assertEqual(warmer.stats()['failures'], 1)
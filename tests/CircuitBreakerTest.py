@@ -0,0 +1,77 @@
+"""Tests for the flaskr/source/breaker.py CircuitBreaker."""
+
+
+import os
+import sys
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.breaker import CircuitBreaker
+
+class Clock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+class CircuitBreakerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.clock = Clock()
+    self.breaker = CircuitBreaker('DUMMY', failure_threshold=3, window=60, slow_call=5,
+                                  reset_timeout=30, clock=self.clock)
+
+  def _fail(self, times):
+    for _ in range(times):
+      self.assertTrue(self.breaker.allow())
+      self.breaker.record(False)
+
+  def test_should_open_after_threshold_of_failures(self):
+    self._fail(2)
+    self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+    self._fail(1)
+    self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+    self.assertFalse(self.breaker.allow())
+    self.assertEqual(self.breaker.stats()['rejected_calls'], 1)
+
+  def test_should_forget_failures_outside_of_window(self):
+    self._fail(2)
+    self.clock.now = 61
+    self._fail(1)
+    self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+  def test_slow_calls_should_count_as_failures(self):
+    for _ in range(3):
+      self.breaker.allow()
+      self.breaker.record(True, elapsed=6)
+    self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+  def test_half_open_should_let_single_probe_through(self):
+    self._fail(3)
+    self.clock.now = 31
+    self.assertTrue(self.breaker.allow())
+    self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+    self.assertFalse(self.breaker.allow())
+    self.breaker.record(True, elapsed=0.1)
+    self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+    self.assertTrue(self.breaker.allow())
+
+  def test_failed_probe_should_open_circuit_again(self):
+    self._fail(3)
+    self.clock.now = 31
+    self.assertTrue(self.breaker.allow())
+    self.breaker.record(False)
+    self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+    self.clock.now = 45
+    self.assertFalse(self.breaker.allow())
+
+  def test_abandoned_probe_should_free_probe_slot(self):
+    self._fail(3)
+    self.clock.now = 31
+    self.assertTrue(self.breaker.allow())
+    self.breaker.record(None)
+    self.assertTrue(self.breaker.allow())
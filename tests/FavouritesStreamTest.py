@@ -0,0 +1,66 @@
+"""Tests for the /favourites/stream handler of main.py."""
+
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+os.environ.setdefault("CACHE_WARMER", "0")
+
+import flaskr.source as source
+import main
+
+_DELAYS = {'AAPL': 0.2, 'MSFT': 0.0, 'GOOG': 0.1}
+
+async def _ticker(symbol, *args, **kwargs):
+  await asyncio.sleep(_DELAYS[symbol])
+  if symbol == 'GOOG':
+    return {'error': 'Not found'}, 404
+  return {'ticker': symbol}, 200
+
+class FavouritesStreamTest(unittest.TestCase):
+
+  def setUp(self):
+    self.client = main.app.test_client()
+    patcher = mock.patch.object(source, 'ticker', _ticker)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def _get(self, headers=None, **query):
+    tickers = [('ticker', ticker) for ticker in ('AAPL', '$$$', 'MSFT', 'GOOG', 'AAPL')]
+    return self.client.get('/favourites/stream', query_string=tickers + list(query.items()), headers=headers)
+
+  def test_ndjson_should_send_line_per_ticker_in_completion_order(self):
+    response = self._get()
+    self.assertEqual(response.mimetype, 'application/x-ndjson')
+    self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+    body = response.get_data(as_text=True)
+    self.assertTrue(body.endswith('\n'))
+    items = [json.loads(line) for line in body.splitlines()]
+    self.assertEqual([(item['ticker'], item['code']) for item in items],
+                     [('$$$', 400), ('MSFT', 200), ('GOOG', 404), ('AAPL', 200)])
+    self.assertEqual(items[1]['data'], {'ticker': 'MSFT'})
+    self.assertEqual(items[2]['data'], {'error': 'Not found'})
+
+  def test_sse_should_send_ticker_events_and_end_event(self):
+    for kwargs in ({'headers': {'Accept': 'text/event-stream'}}, {'format': 'sse'}):
+      response = self._get(**kwargs)
+      self.assertEqual(response.mimetype, 'text/event-stream')
+      events = response.get_data(as_text=True).split('\n\n')
+      self.assertEqual(events[-2:], ['event: end\ndata: {}', ''])
+      tickers = []
+      for event in events[:-2]:
+        kind, data = event.split('\n')
+        self.assertEqual(kind, 'event: ticker')
+        self.assertTrue(data.startswith('data: '))
+        tickers.append(json.loads(data[len('data: '):])['ticker'])
+      self.assertEqual(tickers, ['$$$', 'MSFT', 'GOOG', 'AAPL'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,50 @@
+"""Tests for the flaskr/jsonprovider.py FastJSONProvider."""
+
+
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+import flask
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.jsonprovider as jsonprovider
+
+_DATA = {'ticker': 'AAPL', 'name': 'Apple', 'roic': [{'value': 1.5, 'color': '#89e051'}], 'error': None}
+
+class JSONProviderTest(unittest.TestCase):
+
+  def setUp(self):
+    self.app = flask.Flask(__name__)
+    self.app.json = jsonprovider.FastJSONProvider(self.app)
+
+  def _backends(self):
+    yield 'orjson'
+    with mock.patch.object(jsonprovider, 'orjson', None):
+      yield 'json'
+
+  def test_dumps_should_keep_key_order_of_dictionaries(self):
+    for backend in self._backends():
+      text = self.app.json.dumps(_DATA)
+      self.assertEqual(list(json.loads(text)), ['ticker', 'name', 'roic', 'error'], backend)
+      self.assertLess(text.index('"value"'), text.index('"color"'), backend)
+
+  def test_dumps_should_sort_keys_when_asked(self):
+    for backend in self._backends():
+      self.assertEqual(list(json.loads(self.app.json.dumps(_DATA, sort_keys=True))),
+                       ['error', 'name', 'roic', 'ticker'], backend)
+
+  def test_response_should_keep_key_order_of_dictionaries(self):
+    for backend in self._backends():
+      with self.app.app_context():
+        response = self.app.json.response(_DATA)
+      self.assertEqual(response.mimetype, 'application/json')
+      self.assertEqual(list(json.loads(response.get_data())), ['ticker', 'name', 'roic', 'error'], backend)
+      self.assertEqual(self.app.json.loads(response.get_data()), _DATA, backend)
+
+if __name__ == '__main__':
+  unittest.main()
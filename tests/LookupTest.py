@@ -0,0 +1,165 @@
+"""Tests for lookups of the flaskr/source/__init__.py package: cache, warm refresh and deadline."""
+
+
+import asyncio
+import gc
+import os
+import sys
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.screener as screener
+import flaskr.source as source
+import flaskr.source.elements as elements
+from flaskr.source.cache import ResultCache
+from flaskr.source.sources import MSNMoney, StockRow, YahooAnalysis, YahooQuoteSummary
+from flaskr.source.warmer import Popularity
+
+class LookupTest(unittest.TestCase):
+
+  def setUp(self):
+    for name, value in (('result_cache', ResultCache()), ('popularity', Popularity())):
+      patcher = mock.patch.object(source, name, value)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def test_ticker_should_not_wait_for_warm_refresh_of_cached_symbol(self):
+    result = elements.Result()
+    result.ticker = 'AAPL'
+    source.result_cache.put('AAPL', result, 200)
+
+    async def scenario():
+      started = asyncio.Event()
+
+      async def slow_fetch(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(10)
+
+      with mock.patch.object(source, '_fetch', slow_fetch), mock.patch.object(source, 'WARMER_LEAD_TIME', 1e9):
+        warming = asyncio.ensure_future(source.warm('AAPL'))
+        await started.wait()
+        try:
+          return await asyncio.wait_for(source.ticker('AAPL'), 0.5)
+        finally:
+          warming.cancel()
+
+    data, code = asyncio.run(scenario())
+    self.assertEqual(code, 200)
+    self.assertEqual(data['ticker'], 'AAPL')
+
+  def test_projected_lookup_should_count_cache_hit_or_miss_once(self):
+    result = elements.Result()
+    result.ticker = 'AAPL'
+    source.result_cache.put('AAPL', result, 200)
+
+    async def lookup(*args, **kwargs):
+      return [], []
+
+    with mock.patch.object(source, '_fetch', lookup), \
+         mock.patch.object(source, '_assemble', lambda symbol, *sources: (elements.Result(), 200)):
+      asyncio.run(source.ticker('AAPL', fields=['payback_time']))
+      asyncio.run(source.ticker('MSFT', fields=['payback_time']))
+      asyncio.run(source.ticker('MSFT', fields=['payback_time']))
+    stats = source.result_cache.stats()
+    self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+  def test_price_refresh_should_not_be_served_from_payload_store(self):
+    result = elements.Result()
+    result.ticker = 'AAPL'
+    source.result_cache.put('AAPL', result, 200)
+    max_ages = []
+
+    async def fetch(self):
+      max_ages.append(self.max_age)
+      self.data.currentPrice = 123.0
+      return self
+
+    with mock.patch.object(YahooQuoteSummary, 'fetch', fetch):
+      asyncio.run(source._refresh_price('AAPL', result))
+    self.assertEqual(max_ages, [0])
+    self.assertEqual(result.current_price.value, 123.0)
+
+  def test_late_source_should_leave_fields_null_and_complete_in_background(self):
+    async def fast(self):
+      return self
+
+    async def slow(self):
+      await asyncio.sleep(0.2)
+      self.data.eps_growth_rates = [10.0, 12.0]
+      return self
+
+    async def scenario():
+      data, code = await source.ticker('AAPL', deadline=0.05)
+      partial = source.result_cache.peek('AAPL').result.sources['StockRow']['status']
+      await asyncio.gather(*source._background)
+      return data, code, partial, source.result_cache.peek('AAPL').result
+
+    patches = [mock.patch.object(MSNMoney, 'set_id', fast), mock.patch.object(MSNMoney, 'fetch', fast),
+               mock.patch.object(YahooAnalysis, 'fetch', fast), mock.patch.object(YahooQuoteSummary, 'fetch', fast),
+               mock.patch.object(StockRow, 'fetch', slow)]
+    for patcher in patches:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+    data, code, partial, complete = asyncio.run(scenario())
+    self.assertEqual(code, 200)
+    self.assertEqual([eps['value'] for eps in data['eps']], [None] * 4)
+    self.assertIsNone(data['debt_payoff_time']['value'])
+    self.assertEqual({name: state['status'] for name, state in data['sources'].items()},
+                     {'MSNMoney': 'ok', 'StockRow': 'late', 'YahooAnalysis': 'ok', 'YahooQuoteSummary': 'ok'})
+    self.assertEqual(data['sources']['StockRow']['code'], 504)
+    self.assertEqual(partial, 'late')
+    self.assertEqual(complete.sources['StockRow']['status'], 'ok')
+    self.assertEqual([eps.value for eps in complete.eps], [10.0, 12.0])
+
+  def test_ticker_should_count_popularity_unless_asked_not_to(self):
+    async def lookup(symbol, *args, **kwargs):
+      return elements.Result(), 200
+
+    with mock.patch.object(source, '_lookup', lookup):
+      asyncio.run(source.ticker('AAPL'))
+      asyncio.run(source.ticker('MSFT', count=False))
+    self.assertEqual([symbol for symbol, score in source.popularity.top(10)], ['AAPL'])
+
+  def test_screener_lookup_should_not_count_popularity(self):
+    with mock.patch.object(source, 'ticker', mock.AsyncMock(return_value=({}, 200))) as ticker:
+      asyncio.run(screener._lookup('AAPL'))
+    self.assertFalse(ticker.call_args.kwargs['count'])
+
+  def test_background_completion_should_retrieve_failure_of_late_source(self):
+    errors = []
+
+    async def fetch(symbol, deadline, plan=None):
+      async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('late source broke')
+      return [elements.Source(symbol)], {0: asyncio.ensure_future(failing())}
+
+    async def scenario():
+      asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+      await source.ticker('AAPL')
+      await asyncio.gather(*source._background)
+
+    with mock.patch.object(source, '_fetch', fetch), \
+         mock.patch.object(source, '_assemble', lambda symbol, *sources: (elements.Result(), 200)):
+      asyncio.run(scenario())
+    gc.collect()
+    self.assertEqual(errors, [])
+
+  def test_cancelled_background_completion_should_cancel_and_await_late_sources(self):
+    async def scenario():
+      late = asyncio.ensure_future(asyncio.sleep(10))
+      completion = asyncio.ensure_future(source._complete('AAPL', [elements.Source('AAPL')], {0: late}))
+      await asyncio.sleep(0)
+      completion.cancel()
+      with self.assertRaises(asyncio.CancelledError):
+        await completion
+      return late.cancelled()
+
+    self.assertTrue(asyncio.run(scenario()))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,106 @@
+"""Tests for the flaskr/source/store.py PayloadStore, and sources served from it."""
+
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.source.elements as elements
+from flaskr.source.store import PayloadStore, StoredResponse, SymbolMap
+
+_URL = 'https://example.com/quote/AAPL'
+
+class _Source(elements.Source):
+  pass
+
+class PayloadStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.store = PayloadStore(os.path.join(self.directory.name, 'payloads.sqlite3'))
+
+  def tearDown(self):
+    self.store.close()
+    self.directory.cleanup()
+
+  def test_put_and_get_should_round_trip_payload(self):
+    self.store.put('Yahoo', _URL, 'aapl', 200, 'OK', b'{"price": 1}')
+    stored = self.store.get('Yahoo', _URL)
+    self.assertEqual((stored.status, stored.reason, stored.body), (200, 'OK', b'{"price": 1}'))
+    self.assertTrue(stored.ok)
+    self.assertEqual(self.store.symbols(), ['AAPL'])
+    self.assertIsNone(self.store.get('MSN', _URL))
+
+  def test_get_should_skip_payload_older_than_max_age(self):
+    self.store.put('Yahoo', _URL, 'AAPL', 200, 'OK', b'body')
+    self.assertIsNotNone(self.store.get('Yahoo', _URL, max_age=60))
+    with mock.patch('time.time', return_value=time.time() + 120):
+      self.assertIsNone(self.store.get('Yahoo', _URL, max_age=60))
+      self.assertIsNotNone(self.store.get('Yahoo', _URL))
+
+  def test_background_write_should_be_read_by_async_get(self):
+    async def round_trip():
+      self.store.put_background('Yahoo', _URL, 'AAPL', 200, 'OK', b'body')
+      return await self.store.get_async('Yahoo', _URL)
+    self.assertEqual(asyncio.run(round_trip()).body, b'body')
+
+  def test_source_should_be_served_from_store_without_upstream(self):
+    self.store.put('_Source', _URL, 'AAPL', 200, 'OK', b'stored')
+    source = _Source('AAPL')
+    source.store = self.store
+    with mock.patch.object(elements.Source, 'pool') as pool:
+      response = asyncio.run(source._get(_URL))
+    self.assertEqual(asyncio.run(response.read()), b'stored')
+    pool.session.assert_not_called()
+
+  def test_source_with_max_age_0_should_call_upstream_despite_stored_payload(self):
+    self.store.put('_Source', _URL, 'AAPL', 200, 'OK', b'stored')
+    source = _Source('AAPL')
+    source.store = self.store
+    source.max_age = 0
+    upstream = StoredResponse(_URL, 200, 'OK', b'upstream', 0.0)
+    with mock.patch.object(elements.Source, '_Source__request',
+                           mock.AsyncMock(return_value=(upstream, b'upstream', None))) as request:
+      response = asyncio.run(source._get(_URL))
+    self.assertIs(response, upstream)
+    request.assert_called_once()
+
+  def test_offline_source_should_not_call_upstream_for_missing_payload(self):
+    source = _Source('AAPL')
+    source.store = PayloadStore(self.store.path, offline=True)
+    self.addCleanup(source.store.close)
+    with mock.patch.object(elements.Source, 'pool') as pool:
+      response = asyncio.run(source._get(_URL))
+    self.assertEqual(response.status, 504)
+    pool.session.assert_not_called()
+
+  def test_symbol_map_should_load_seed_and_write_off_event_loop(self):
+    seed = os.path.join(self.directory.name, 'ids.csv')
+    with open(seed, 'w') as file:
+      file.write('# symbol,id\naapl,a1xzim\nGONE,\n')
+    ids = SymbolMap(self.store, 'ids', seed_path=seed)
+    threads = []
+    load = ids.load
+    ids.load = lambda path: threads.append(threading.current_thread()) or load(path)
+
+    async def lookups():
+      values = [await ids.get_async(symbol) for symbol in ('AAPL', 'GONE', 'MSFT')]
+      await asyncio.wrap_future(ids.put_background('MSFT', 'a2m1'))
+      return values
+
+    self.assertEqual(asyncio.run(lookups()), ['a1xzim', None, SymbolMap.UNKNOWN])
+    self.assertEqual(len(threads), 1)
+    self.assertIsNot(threads[0], threading.current_thread())
+    self.assertEqual(asyncio.run(SymbolMap(self.store, 'ids').get_async('msft')), 'a2m1')
+    self.assertIs(SymbolMap(self.store, 'other').get('MSFT'), SymbolMap.UNKNOWN)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,78 @@
+"""Tests for the flaskr/source/planner.py plans."""
+
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.source.planner as planner
+from flaskr.source.sources import YahooQuoteSummary
+from flaskr.source.store import StoredResponse
+
+_MODULES = {
+  'assetProfile': {'country': 'United States'},
+  'incomeStatementHistory': {'incomeStatementHistory': [{'netIncome': {'raw': 100 - 10 * i}} for i in range(4)]},
+  'balanceSheetHistory': {'balanceSheetStatements': [
+    {'cash': {'raw': 10}, 'longTermDebt': {'raw': 50}, 'totalStockholderEquity': {'raw': 500 - 50 * i}}
+    for i in range(4)]},
+  'financialData': {'currentPrice': {'raw': 150.0}},
+  'defaultKeyStatistics': {'trailingEps': {'raw': 6.0}},
+  'summaryDetail': {'marketCap': {'raw': 2000}},
+}
+
+def _fetch_quote_summary(plan):
+  """Fetch YahooQuoteSummary of plan, from payload with only modules plan requests"""
+  modules = plan.sources['YahooQuoteSummary']
+  body = json.dumps({'quoteSummary': {'result': [{module: _MODULES[module] for module in modules}]}}).encode()
+  quote_summary = YahooQuoteSummary('AAPL', list(modules))
+  response = StoredResponse('https://query1.finance.yahoo.com', 200, 'OK', body, 0.0)
+  with mock.patch.object(YahooQuoteSummary, '_get', mock.AsyncMock(return_value=response)):
+    return asyncio.run(quote_summary.fetch())
+
+class PlannerTest(unittest.TestCase):
+
+  def test_full_plan_should_request_every_module_once(self):
+    plan = planner.plan()
+    self.assertTrue(plan.full)
+    self.assertEqual(list(plan.sources), ['MSNMoney', 'StockRow', 'YahooAnalysis', 'YahooQuoteSummary'])
+    modules = plan.sources['YahooQuoteSummary']
+    self.assertEqual(len(modules), len(set(modules)))
+    self.assertIn('balanceSheetHistory', modules)
+    self.assertEqual(plan.key('AAPL'), 'AAPL')
+
+  def test_plan_should_need_only_sources_of_fields(self):
+    plan = planner.plan(['address'])
+    self.assertFalse(plan.full)
+    self.assertEqual(plan.sources, {'YahooQuoteSummary': ('assetProfile',)})
+    self.assertFalse(plan.needs('StockRow'))
+    self.assertEqual(planner.plan(['eps', 'sales']).sources, {'StockRow': ()})
+
+  def test_plan_key_should_not_depend_on_order_of_fields(self):
+    self.assertEqual(planner.plan(['name', 'eps']).key('AAPL'), planner.plan(['eps', 'name']).key('AAPL'))
+    self.assertNotEqual(planner.plan(['name']).key('AAPL'), 'AAPL')
+
+  def test_plan_should_reject_unknown_fields(self):
+    self.assertRaises(ValueError, planner.plan, ['name', 'nope'])
+
+  def test_project_should_keep_fields_always_present(self):
+    data = {'ticker': 'AAPL', 'error': None, 'sources': {}, 'name': 'Apple', 'eps': []}
+    self.assertEqual(planner.plan(['name']).project(data),
+                     {'ticker': 'AAPL', 'error': None, 'sources': {}, 'name': 'Apple'})
+
+  def test_fetch_should_parse_payload_of_projected_plan(self):
+    for field in planner.DEPENDENCIES:
+      plan = planner.plan([field])
+      if 'YahooQuoteSummary' in plan.sources:
+        self.assertIsNone(_fetch_quote_summary(plan).error, field)
+    quote_summary = _fetch_quote_summary(planner.plan(['payback_time']))
+    self.assertEqual((quote_summary.data.netIncome, quote_summary.data.marketCap), (100, 2000))
+    self.assertTrue(_fetch_quote_summary(planner.plan(['roic'])).data.roic_history)
+
+if __name__ == '__main__':
+  unittest.main()
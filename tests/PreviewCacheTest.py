@@ -0,0 +1,105 @@
+"""Tests for the flaskr/preview/cache.py PreviewCache, and keys of previews."""
+
+
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.preview as preview
+from flaskr.preview.cache import PreviewCache
+from flaskr.preview.pool import RenderPool
+
+class _Renderer:
+  def __init__(self, body=b'jpeg'):
+    self.body = body
+    self.calls = 0
+
+  def __call__(self):
+    self.calls += 1
+    return self.body
+
+class PreviewCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.addCleanup(self.directory.cleanup)
+
+  def test_get_should_render_once_and_then_serve_from_memory(self):
+    cache = PreviewCache(directory=None)
+    render = _Renderer()
+    self.assertEqual(cache.get('a' * 32, render), b'jpeg')
+    self.assertEqual(cache.get('a' * 32, render), b'jpeg')
+    self.assertEqual(render.calls, 1)
+    self.assertEqual(cache.stats()['memory_hits'], 1)
+
+  def test_previews_should_survive_on_disk(self):
+    PreviewCache(directory=self.directory.name).get('b' * 32, _Renderer())
+    render = _Renderer()
+    cache = PreviewCache(directory=self.directory.name)
+    self.assertEqual(cache.get('b' * 32, render), b'jpeg')
+    self.assertEqual(render.calls, 0)
+    self.assertEqual(cache.stats()['disk_hits'], 1)
+
+  def test_error_previews_should_stay_in_memory_for_error_ttl(self):
+    cache = PreviewCache(directory=self.directory.name, error_ttl=0.01)
+    render = _Renderer()
+    cache.get('c' * 32, render, error=True)
+    self.assertEqual(os.listdir(self.directory.name), [])
+    time.sleep(0.02)
+    cache.get('c' * 32, render, error=True)
+    self.assertEqual(render.calls, 2)
+
+  def test_memory_should_stay_within_byte_budget(self):
+    cache = PreviewCache(directory=None, max_bytes=10)
+    for key in ('d', 'e', 'f'):
+      cache.get(key * 32, _Renderer(b'12345'))
+    self.assertEqual(len(cache), 2)
+    self.assertEqual(cache.stats()['evictions'], 1)
+
+  def test_cached_should_read_disk_off_event_loop(self):
+    PreviewCache(directory=self.directory.name).get('d' * 32, _Renderer(b'on disk'))
+    cache = PreviewCache(directory=self.directory.name)
+    read = PreviewCache._PreviewCache__read
+    threads = []
+
+    def spy(self, key):
+      threads.append(threading.current_thread())
+      return read(self, key)
+
+    render = _Renderer()
+    with mock.patch.object(preview, 'image_cache', cache), mock.patch.object(preview, 'render_pool', RenderPool(1)), \
+        mock.patch.object(PreviewCache, '_PreviewCache__read', spy):
+      self.assertEqual(asyncio.run(preview.cached('d' * 32, render)), b'on disk')
+    self.assertEqual(render.calls, 0)
+    self.assertNotIn(threading.main_thread(), threads)
+    self.assertEqual(cache.stats()['disk_hits'], 1)
+
+  def test_key_should_change_only_with_shown_data(self):
+    data = {'shortName': 'Apple', 'industry': 'Electronics', 'profile': {'country': 'US'},
+            'roic': [{'color': 'green', 'value': 1}], 'current_price': {'color': 'red', 'value': 1}}
+    key = preview.key('AAPL', data)
+    self.assertEqual(key, preview.key('AAPL', dict(data, sources={'StockRow': {'elapsed_ms': 5}})))
+    self.assertNotEqual(key, preview.key('AAPL', dict(data, current_price={'color': 'green', 'value': 2})))
+    self.assertNotEqual(key, preview.key('MSFT', data))
+    self.assertNotEqual(preview.error_key('AAPL', 404, 'Not found'), preview.error_key('AAPL', 504, 'Not found'))
+    self.assertNotEqual(key, preview.key('AAPL', data, 'thumbnail'))
+
+  def test_size_variants_should_have_their_dimensions(self):
+    data = {'shortName': 'Apple', 'industry': 'Electronics', 'profile': {'country': 'US'},
+            'roic': [{'color': 'green', 'value': 1}], 'current_price': {'color': 'red', 'value': 1}}
+    for size, dimensions in preview.SIZES.items():
+      self.assertEqual(Image.open(preview.ticker('AAPL', data, size)).size, dimensions)
+      self.assertEqual(Image.open(preview.error('AAPL', 404, 'Not found', size=size)).size, dimensions)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,56 @@
+"""Tests for the flaskr/preview/pool.py RenderPool."""
+
+
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.preview.pool import RenderPool, Saturated
+
+class RenderPoolTest(unittest.TestCase):
+
+  def test_run_should_return_result_of_worker(self):
+    pool = RenderPool(workers=2)
+    self.assertEqual(asyncio.run(pool.run(lambda x: x * 2, 21)), 42)
+    self.assertEqual(pool.stats()['completed'], 1)
+    self.assertEqual(len(pool), 0)
+
+  def test_run_should_reject_when_saturated(self):
+    pool = RenderPool(workers=1, queue=1)
+    release = threading.Event()
+
+    async def scenario():
+      first = asyncio.ensure_future(pool.run(release.wait))
+      second = asyncio.ensure_future(pool.run(release.wait))
+      await asyncio.sleep(0.01)
+      with self.assertRaises(Saturated):
+        await pool.run(release.wait)
+      release.set()
+      await asyncio.gather(first, second)
+      return await pool.run(lambda: 'again')
+
+    self.assertEqual(asyncio.run(scenario()), 'again')
+    self.assertEqual(pool.stats()['rejected'], 1)
+
+  def test_slot_should_be_held_until_render_ends_even_if_caller_is_cancelled(self):
+    pool = RenderPool(workers=1, queue=0)
+    release = threading.Event()
+
+    async def scenario():
+      task = asyncio.ensure_future(pool.run(release.wait))
+      await asyncio.sleep(0.01)
+      task.cancel()
+      await asyncio.sleep(0.01)
+      with self.assertRaises(Saturated):
+        await pool.run(release.wait)
+      release.set()
+
+    asyncio.run(scenario())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,68 @@
+"""Tests for the flaskr/source/cache.py ResultCache."""
+
+
+import os
+import sys
+import time
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.cache import ResultCache
+from flaskr.source.elements import Result
+
+def _result(symbol):
+  result = Result()
+  result.ticker = symbol
+  return result
+
+class ResultCacheTest(unittest.TestCase):
+
+  def test_get_should_count_hits_and_misses(self):
+    cache = ResultCache()
+    self.assertIsNone(cache.get('AAPL'))
+    cache.put('AAPL', _result('AAPL'), 200)
+    self.assertEqual(cache.get('AAPL').result.ticker, 'AAPL')
+    stats = cache.stats()
+    self.assertEqual(stats['hits'], 1)
+    self.assertEqual(stats['misses'], 1)
+
+  def test_put_should_evict_least_recently_used_entry(self):
+    cache = ResultCache(max_entries=2)
+    cache.put('AAPL', _result('AAPL'), 200)
+    cache.put('MSFT', _result('MSFT'), 200)
+    cache.get('AAPL')
+    cache.put('META', _result('META'), 200)
+    self.assertIn('AAPL', cache)
+    self.assertNotIn('MSFT', cache)
+    self.assertEqual(cache.stats()['evictions'], 1)
+
+  def test_put_should_stay_within_byte_budget(self):
+    size = len(_result('AAPL').to_json())
+    cache = ResultCache(max_bytes=size * 2)
+    for symbol in ['AAPL', 'MSFT', 'META']:
+      cache.put(symbol, _result(symbol), 200)
+    self.assertEqual(len(cache), 2)
+    self.assertLessEqual(cache.stats()['bytes'], size * 2)
+
+  def test_get_should_miss_when_fundamentals_expired(self):
+    cache = ResultCache(fundamentals_ttl=0)
+    cache.put('AAPL', _result('AAPL'), 200)
+    self.assertIsNone(cache.get('AAPL'))
+    self.assertEqual(len(cache), 0)
+
+  def test_price_should_expire_before_fundamentals(self):
+    cache = ResultCache(price_ttl=0.01)
+    cache.put('AAPL', _result('AAPL'), 200)
+    time.sleep(0.02)
+    entry = cache.get('AAPL')
+    self.assertIsNotNone(entry)
+    self.assertFalse(entry.price_fresh)
+    cache.price_refreshed('AAPL')
+    self.assertTrue(cache.get('AAPL').price_fresh)
+
+  def test_errors_should_use_error_ttl(self):
+    cache = ResultCache(error_ttl=0)
+    cache.put('NOPE', _result('NOPE'), 404, error=True)
+    self.assertIsNone(cache.get('NOPE'))
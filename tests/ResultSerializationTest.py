@@ -0,0 +1,69 @@
+"""Tests for direct serialization of flaskr/source/elements.py Result, and flaskr/jsonprovider.py."""
+
+
+import json
+import os
+import sys
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flask import Flask
+
+from flaskr.jsonprovider import FastJSONProvider
+from flaskr.source.elements import Property, Result, Trend
+from flaskr.source.sources.YahooQuoteSummary import Profile
+
+def _result():
+  result = Result()
+  result.ticker = 'AAPL'
+  result.name = 'Apple Inc.'
+  result.profile = Profile()
+  result.profile.fill(['city', 'fullTimeEmployees', 'companyOfficers'],
+                      {'city': 'Cupertino', 'fullTimeEmployees': 164000, 'companyOfficers': [{'name': 'Tim'}]})
+  result.roic = [Property(v) for v in (30.5, 28.1, None, 25.0)]
+  result.eps_trend = Trend(0.32, 0.9641)
+  result.current_price.value = 180.5
+  result.payback_time.value = 9
+  result.sources = {'StockRow': {'status': 'ok', 'code': None, 'reason': None, 'elapsed_ms': 12}}
+  result.colour()
+  return result
+
+def _fields(o):
+  return {name: getattr(o, name) for name in o.__slots__ if not name.startswith('_')}
+
+def _round_trip(result):
+  return json.loads(json.dumps(result, default=_fields))
+
+class ResultSerializationTest(unittest.TestCase):
+
+  def test_to_dict_should_match_json_round_trip(self):
+    result = _result()
+    expected = _round_trip(result)
+    self.assertEqual(result.to_dict(), expected)
+    self.assertEqual(list(result.to_dict()), list(expected))
+    self.assertEqual(json.loads(result.to_json()), expected)
+
+  def test_to_dict_should_be_cached_until_changed(self):
+    result = _result()
+    data = result.to_dict()
+    self.assertIs(result.to_dict(), data)
+    result.current_price.value = 190.0
+    result.changed()
+    self.assertIsNot(result.to_dict(), data)
+    self.assertEqual(result.to_dict()['current_price']['value'], 190.0)
+
+  def test_provider_should_encode_like_default_provider(self):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    data = _result().to_dict()
+    with app.app_context():
+      response = app.json.response(data)
+      self.assertEqual(response.mimetype, 'application/json')
+      self.assertEqual(json.loads(response.get_data()), data)
+      self.assertEqual(app.json.loads(app.json.dumps(data)), data)
+      self.assertEqual(json.loads(app.json.dumps(data, separators=(',', ':'))), data)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,70 @@
+"""Tests for the flaskr/source/table.py ResultTable."""
+
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.elements import Property, Result, Trend
+from flaskr.source.sources.YahooQuoteSummary import Profile
+from flaskr.source.table import ResultTable
+
+def _result(i):
+  result = Result()
+  result.ticker = f'T{i}'
+  result.name = f'Company {i}'
+  result.profile = Profile()
+  result.profile.fill(['city', 'companyOfficers'], {'city': 'Cupertino', 'companyOfficers': [{'name': 'Tim'}]})
+  result.roic = [Property(v) for v in (30.5, 28, None, 25.25)]
+  result.eps = None
+  result.eps_trend = Trend(0.32, 0.9641)
+  result.current_price.value = 180.5 + i
+  result.payback_time.value = i
+  result.sources = {'StockRow': {'status': 'ok', 'code': None, 'reason': None, 'elapsed_ms': i}}
+  result.colour()
+  return result
+
+class ResultTableTest(unittest.TestCase):
+
+  def test_rows_should_equal_dictionaries_of_results(self):
+    results = [_result(i) for i in range(5)]
+    table = ResultTable(capacity=2)
+    table.extend(results)
+    self.assertEqual(len(table), 5)
+    for row, result in zip(table, results):
+      self.assertEqual(row, result.to_dict())
+      self.assertEqual(list(row), list(result.to_dict()))
+    self.assertEqual(table[-1]['ticker'], 'T4')
+    self.assertIsInstance(table[3]['payback_time']['value'], int)
+    self.assertIsInstance(table[3]['current_price']['value'], float)
+
+  def test_fields_not_fitting_arrays_should_be_kept_as_objects(self):
+    result = _result(1)
+    result.sales = [Property(1.0) for _ in range(6)]
+    result.shares_to_hold.value = 'many'
+    result.cash_trend = Trend(2, None)
+    result.error = (404, 'Ticker not found')
+    result.profile = None
+    table = ResultTable()
+    table.append(result)
+    self.assertEqual(table[0], result.to_dict())
+
+  def test_column_should_give_arrays(self):
+    table = ResultTable()
+    table.extend(_result(i) for i in range(3))
+    np.testing.assert_array_equal(table.column('payback_time'), [0, 1, 2])
+    self.assertTrue(np.isnan(table.column('roic')[:, 2]).all())
+    self.assertEqual(table.column('roic').shape, (3, 4))
+    np.testing.assert_array_equal(table.column('eps_trend')[0], [0.32, 0.9641])
+    with self.assertRaises(KeyError):
+      table.column('profile')
+    with self.assertRaises(IndexError):
+      table[3]
+
+if __name__ == '__main__':
+  unittest.main()
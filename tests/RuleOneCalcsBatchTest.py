@@ -0,0 +1,126 @@
+"""Tests for the batch variants in flaskr/source/RuleOneCalcs.py, against their scalar versions."""
+
+
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.source.RuleOneCalcs as RuleOne
+
+def _values(seed, low, high, special=(None, 0), count=2000):
+  rng = random.Random(seed)
+  return [rng.choice(special) if rng.random() < 0.1 else round(rng.uniform(low, high), 2)
+          for _ in range(count)]
+
+class RuleOneCalcsBatchTest(unittest.TestCase):
+
+  def assertEquivalent(self, batch, scalar, atol=1e-9):
+    self.assertEqual(len(batch), len(scalar))
+    for b, s in zip(batch, scalar):
+      if s is None:
+        self.assertTrue(np.isnan(b), f'{b} is not NaN')
+      else:
+        self.assertAlmostEqual(b, s, delta=atol + abs(s) * 1e-12)
+
+  def test_compound_annual_growth_rate_batch(self):
+    start = _values(2000, -1000, 1000)
+    end = _values(2001, -1000, 1000)
+    years = _values(2002, 1, 10, special=(None, 0))
+    batch = RuleOne.compound_annual_growth_rate_batch(start, end, years)
+    scalar = [RuleOne.compound_annual_growth_rate(*args) for args in zip(start, end, years)]
+    # Rounding to 2 places can differ in the last digit for values exactly between two
+    self.assertEquivalent(batch, scalar, atol=0.0100001)
+
+  def test_compound_annual_growth_rate_batch_special_cases(self):
+    start = [2805000, 108957000, -2805000, 2805000, -2805000, -108957000, 0, 100]
+    end = [108957000, 2805000, 108957000, -108957000, -108957000, -2805000, 100, 0]
+    batch = RuleOne.compound_annual_growth_rate_batch(start, end, 8)
+    np.testing.assert_array_equal(batch[:6], [58.0, -36.71, 59.0, -58.51, -58.0, 36.71])
+    self.assertTrue(np.isnan(batch[6]))
+    self.assertEqual(batch[7], RuleOne.compound_annual_growth_rate(100, 0, 8))
+
+  def test_margin_of_safety_price_batch(self):
+    eps = _values(3000, -5, 20)
+    growth = _values(3001, -0.2, 0.5)
+    low = _values(3002, -10, 40)
+    high = _values(3003, 5, 80)
+    margin, sticker = RuleOne.margin_of_safety_price_batch(eps, growth, low, high)
+    scalar = [RuleOne.margin_of_safety_price(*args) for args in zip(eps, growth, low, high)]
+    self.assertEquivalent(margin, [s[0] for s in scalar])
+    self.assertEquivalent(sticker, [s[1] for s in scalar])
+
+  def test_steps_of_margin_of_safety_price_batch(self):
+    eps, growth = _values(500, -5, 20), _values(501, -0.2, 0.5)
+    low, high = _values(502, 0, 40), _values(503, 5, 80)
+    self.assertEquivalent(RuleOne.calculate_future_eps_batch(eps, growth),
+                          [RuleOne.calculate_future_eps(*args) for args in zip(eps, growth)])
+    self.assertEquivalent(RuleOne.calculate_future_pe_batch(growth, low, high),
+                          [RuleOne.calculate_future_pe(*args) for args in zip(growth, low, high)])
+    self.assertEquivalent(RuleOne.calculate_estimated_future_price_batch(eps, low),
+                          [RuleOne.calculate_estimated_future_price(*args) for args in zip(eps, low)])
+    self.assertEquivalent(RuleOne.calculate_sticker_price_batch(high),
+                          [RuleOne.calculate_sticker_price(value) for value in high])
+    self.assertEquivalent(RuleOne.calculate_margin_of_safety_batch(high, 0.25),
+                          [RuleOne.calculate_margin_of_safety(value, 0.25) for value in high])
+
+  def test_calculate_roic_batch(self):
+    income = _values(4000, -100, 500)
+    cash = _values(4001, 1, 300)
+    debt = _values(4002, 1, 5000)
+    equity = _values(4003, -50, 500)
+    batch = RuleOne.calculate_roic_batch(income, cash, debt, equity)
+    scalar = []
+    for args in zip(income, cash, debt, equity):
+      try:
+        scalar.append(RuleOne.calculate_roic(*args))
+      except ZeroDivisionError:
+        scalar.append(None)
+    self.assertEquivalent(batch, scalar)
+
+  def test_batch_should_accept_scalars_and_none(self):
+    self.assertTrue(np.isnan(RuleOne.calculate_future_eps_batch(None, 0.1)))
+    self.assertEqual(RuleOne.calculate_margin_of_safety_batch(100).item(), 50)
+    self.assertEqual(RuleOne.calculate_estimated_future_price_batch([1.25, None], 3)[0], 3.75)
+
+  def test_payback_time_batch(self):
+    market_cap = _values(5000, -100, 1e6)
+    income = _values(5001, -1000, 1e5)
+    growth = _values(5002, -0.1, 0.4)
+    batch = RuleOne.payback_time_batch(market_cap, income, growth)
+    scalar = [RuleOne.payback_time(*args) for args in zip(market_cap, income, growth)]
+    np.testing.assert_array_equal(batch, scalar)
+    np.testing.assert_array_equal(RuleOne.payback_time_batch([17680, 17680, 17680], [2115, -2115, 2115],
+                                                             [0.12, 0.12, -0.12]), [6, -1, -1])
+
+  def test_least_squares_batch_should_match_polyfit(self):
+    rng = np.random.default_rng(0)
+    series = rng.normal(100, 30, (200, 7)).cumsum(axis=1)
+    series[::5, :3] = np.nan
+    slopes, r_squared = RuleOne.least_squares_batch(series)
+    for row, slope, r2 in zip(series, slopes, r_squared):
+      known = ~np.isnan(row)
+      x, y = np.arange(len(row))[known], row[known]
+      expected_slope, intercept = np.polyfit(x, y, 1)
+      residual = ((y - (expected_slope * x + intercept)) ** 2).sum()
+      self.assertAlmostEqual(slope, expected_slope, places=6)
+      self.assertAlmostEqual(r2, 1 - residual / ((y - y.mean()) ** 2).sum(), places=6)
+
+  def test_least_squares_batch_special_cases(self):
+    slopes, r_squared = RuleOne.least_squares_batch([[5.0, 5.0, 5.0], [1.0, np.nan, np.nan], [np.nan] * 3])
+    self.assertEqual(slopes[0], 0)
+    self.assertEqual(r_squared[0], 1)
+    self.assertTrue(np.isnan(slopes[1:]).all())
+    self.assertTrue(np.isnan(r_squared[1:]).all())
+
+  def test_trends_should_align_histories_by_most_recent_value(self):
+    result = RuleOne.trends([[1.3, 2.5, 3.5, 8.5], [2.0, 4.0], None, [7.0]])
+    self.assertEqual(result[0][0], 2.26)
+    self.assertEqual(result[1], (2.0, 1.0))
+    self.assertEqual(result[2], (None, None))
+    self.assertEqual(result[3], (None, None))
@@ -1,14 +1,15 @@
-"""Tests for the app/RuleOneInvestingCalculations.py functions."""
+"""Tests for the flaskr/source/RuleOneCalcs.py functions."""
 
 
+import math
 import os
 import sys
 import unittest
 
-app_path = os.path.join(os.path.dirname(__file__), "..", 'src')
+app_path = os.path.join(os.path.dirname(__file__), "..")
 sys.path.append(app_path)
 
-import RuleOneInvestingCalculations as RuleOne
+import flaskr.source.RuleOneCalcs as RuleOne
 
 class RuleOneInvestingCalculationsTest(unittest.TestCase):
 
@@ -44,10 +45,13 @@ class RuleOneInvestingCalculationsTest(unittest.TestCase):
     # of the positive growth rate.
     self.assertEqual(growth_rate, 36.71)
 
-  #def test_slope_of_best_fit_line_for_data(self):
-  #  data = [1.3, 2.5, 3.5, 8.5]
-  #  slope = RuleOne.slope_of_best_fit_line_for_data(data)
-  #  self.assertEqual(slope, 2.26)
+  def test_slope_of_best_fit_line_for_data(self):
+    data = [1.3, 2.5, 3.5, 8.5]
+    slope = RuleOne.slope_of_best_fit_line_for_data(data)
+    self.assertEqual(slope, 2.26)
+
+    self.assertIsNone(RuleOne.slope_of_best_fit_line_for_data([1.3]))
+    self.assertEqual(RuleOne.slope_of_best_fit_line_for_data([1.0, None, 3.0]), 1.0)
 
   def test_max_position_size(self):
     share_price = 50.25
@@ -67,6 +71,28 @@ class RuleOneInvestingCalculationsTest(unittest.TestCase):
     invalid_years = RuleOne.payback_time(17680, -2115, 0.12)
     self.assertEqual(invalid_years, -1)
 
+  def test_payback_time_should_match_yearly_summation(self):
+    for market_cap, net_income, growth_rate in [(17680, 2115, 0.12), (1000, 100, 0.01), (5e12, 1e9, 0.3),
+                                                (100, 100, 0.5), (1, 1000, 0.1), (2368.8, 2115, 0.12)]:
+      years, total, income = 0, 0, net_income
+      while total < market_cap:
+        income += income * growth_rate
+        total += income
+        years += 1
+      self.assertEqual(RuleOne.payback_time(market_cap, net_income, growth_rate), years)
+
+  def test_payback_time_should_match_yearly_summation_at_exact_boundary(self):
+    # Incomes and totals are exact in floating point, payback is reached exactly at end of year 6
+    self.assertEqual(RuleOne.payback_time(498.75, 16, 0.5), 6)
+    self.assertEqual(RuleOne.payback_time(math.nextafter(498.75, math.inf), 16, 0.5), 7)
+    self.assertEqual(RuleOne.payback_time(math.nextafter(498.75, 0), 16, 0.5), 6)
+    self.assertEqual(RuleOne.payback_time(math.nextafter(1182.1875, math.inf), 16, 0.5), 9)
+    self.assertEqual(RuleOne.payback_time_batch([498.75, math.nextafter(498.75, math.inf)], 16, 0.5).tolist(), [6, 7])
+
+  def test_payback_time_should_give_up_after_max_years(self):
+    self.assertEqual(RuleOne.payback_time(1e15, 1, 0.0001), -1)
+    self.assertEqual(RuleOne.payback_time(0, 2115, 0.12), 0)
+
   def test_rule_one_margin_of_safety_price(self):
     pass
 
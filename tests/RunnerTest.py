@@ -0,0 +1,57 @@
+"""Tests for the flaskr/runner.py LoopThread."""
+
+
+import asyncio
+import concurrent.futures
+import os
+import sys
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.runner import LoopThread
+
+class RunnerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.loop_thread = LoopThread(name='test-loop')
+
+  def tearDown(self):
+    self.loop_thread.stop()
+
+  def test_run_should_return_result_of_coroutine(self):
+    async def answer():
+      await asyncio.sleep(0)
+      return 42
+    self.assertEqual(self.loop_thread.run(answer()), 42)
+
+  def test_iterate_should_yield_items_as_they_are_ready(self):
+    async def items():
+      for i in range(3):
+        await asyncio.sleep(0.01)
+        yield i
+    self.assertEqual(list(self.loop_thread.iterate(items())), [0, 1, 2])
+
+  def test_iterate_should_raise_error_of_iterator(self):
+    async def items():
+      yield 1
+      raise ValueError('broken')
+    iterator = self.loop_thread.iterate(items())
+    self.assertEqual(next(iterator), 1)
+    self.assertRaises(ValueError, next, iterator)
+
+  def test_closing_iterate_should_cancel_iteration(self):
+    cancelled = concurrent.futures.Future()
+    async def items():
+      try:
+        yield 1
+        await asyncio.sleep(10)
+        yield 2
+      except asyncio.CancelledError:
+        cancelled.set_result(True)
+        raise
+    iterator = self.loop_thread.iterate(items())
+    self.assertEqual(next(iterator), 1)
+    iterator.close()
+    self.assertTrue(cancelled.result(timeout=1))
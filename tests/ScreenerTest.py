@@ -0,0 +1,103 @@
+"""Tests for the flaskr/screener.py bulk screener."""
+
+
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.screener as screener
+import flaskr.source as source
+import flaskr.source.elements as elements
+
+def _data(symbol):
+  return {
+    'ticker': symbol, 'error': None, 'name': symbol + ' Inc',
+    'current_price': {'value': 10.0, 'color': None},
+    'roic': [{'value': 1.5, 'color': None}, {'value': 2.5, 'color': None}],
+    'sources': {'StockRow': {'status': 'timeout', 'code': 504, 'reason': 'Source timed out', 'elapsed_ms': 5},
+                'MSNMoney': {'status': 'ok', 'code': None, 'reason': None, 'elapsed_ms': 5}},
+  }
+
+class ScreenerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.output = os.path.join(self.directory.name, 'results.csv')
+    self.looked_up = []
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  async def _lookup(self, symbol):
+    self.looked_up.append(symbol)
+    return _data(symbol), 200
+
+  def _screen(self, symbols, **kwargs):
+    return screener.screen(symbols, self.output, lookup=self._lookup, progress_every=3600,
+                           out=io.StringIO(), **kwargs)
+
+  def _read(self):
+    with open(self.output, newline='') as file:
+      return list(csv.DictReader(file))
+
+  def test_row_should_flatten_values_and_source_errors(self):
+    row = screener.row('AAPL', _data('AAPL'), 200, 0.25)
+    self.assertEqual(row['current_price'], 10.0)
+    self.assertEqual(row['roic_2'], 2.5)
+    self.assertIsNone(row['roic_3'])
+    self.assertEqual(row['StockRow_status'], 'timeout')
+    self.assertEqual(row['StockRow_error'], '504 Source timed out')
+    self.assertIsNone(row['MSNMoney_error'])
+    self.assertEqual(row['elapsed_ms'], 250)
+    self.assertEqual(list(row), list(screener.COLUMNS))
+
+  def test_screen_should_write_row_for_every_symbol_in_order(self):
+    progress = self._screen(['AAPL', 'MSFT', 'INVALID1'])
+    rows = self._read()
+    self.assertEqual([r['ticker'] for r in rows], ['AAPL', 'MSFT', 'INVALID1'])
+    self.assertEqual(rows[2]['code'], '400')
+    self.assertEqual(sorted(self.looked_up), ['AAPL', 'MSFT'])
+    self.assertEqual(progress.done, 3)
+
+  def test_screen_should_resume_from_checkpoint(self):
+    self._screen(['AAPL', 'MSFT'])
+    self.looked_up = []
+    progress = self._screen(['AAPL', 'MSFT', 'META'])
+    self.assertEqual(self.looked_up, ['META'])
+    self.assertEqual(progress.done, 1)
+    self.assertEqual(len(self._read()), 3)
+
+  def test_screen_should_start_over_without_resume(self):
+    self._screen(['AAPL'])
+    self.looked_up = []
+    self._screen(['AAPL'], resume=False)
+    self.assertEqual(self.looked_up, ['AAPL'])
+
+  def test_screen_should_close_sessions_when_screening_fails(self):
+    with mock.patch.object(source, 'close', mock.AsyncMock()) as close, \
+         mock.patch.object(screener, 'row', side_effect=RuntimeError('broken row')):
+      with self.assertRaises(RuntimeError):
+        self._screen(['AAPL'])
+    close.assert_awaited_once()
+
+  def test_worker_should_close_pooled_session_and_loop_on_exit(self):
+    screener._init_worker(None)
+    loop = screener._worker_loop
+    session = loop.run_until_complete(elements.Source.pool.session())
+    screener._close_worker()
+    self.assertTrue(session.closed)
+    self.assertTrue(loop.is_closed())
+    screener._close_worker()
+
+  def test_read_symbols_should_skip_comments_and_duplicates(self):
+    path = os.path.join(self.directory.name, 'symbols.csv')
+    with open(path, 'w') as file:
+      file.write('# S&P 500\naapl,Apple\nMSFT\n\nAAPL\n')
+    self.assertEqual(screener.read_symbols(path), ['AAPL', 'MSFT'])
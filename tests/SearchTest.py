@@ -0,0 +1,43 @@
+"""Tests for the /search handler of main.py."""
+
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+os.environ.setdefault("CACHE_WARMER", "0")
+
+import flaskr.source as source
+import main
+
+class SearchTest(unittest.TestCase):
+
+  def setUp(self):
+    self.client = main.app.test_client()
+
+  def test_unknown_field_should_be_rejected_before_lookup(self):
+    with mock.patch.object(source, 'ticker', mock.AsyncMock()) as ticker:
+      response = self.client.get('/search/AAPL?fields=name,bogus')
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.json, {'error': 'Unknown fields: bogus'})
+    ticker.assert_not_called()
+
+  def test_fields_should_be_passed_to_lookup(self):
+    with mock.patch.object(source, 'ticker', mock.AsyncMock(return_value=({'name': 'Apple'}, 200))) as ticker:
+      response = self.client.get('/search/aapl?fields=name')
+    self.assertEqual(response.status_code, 200)
+    ticker.assert_called_once_with('AAPL', fields=['name'])
+
+  def test_error_inside_lookup_should_not_be_reported_as_bad_request(self):
+    with mock.patch.object(source, 'ticker', mock.AsyncMock(side_effect=ValueError('could not convert string'))), \
+         mock.patch('logging.Logger.error'):
+      response = self.client.get('/search/AAPL?fields=name')
+    self.assertEqual(response.status_code, 500)
+    self.assertNotIn(b'could not convert', response.data)
+
+if __name__ == '__main__':
+  unittest.main()
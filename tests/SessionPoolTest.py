@@ -0,0 +1,121 @@
+"""Tests for the flaskr/source/session.py SessionPool, against local server."""
+
+
+import asyncio
+import os
+import sys
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.session import SessionPool
+
+class _Upstream:
+  def __init__(self, delay=0.0):
+    self.delay = delay
+    self.peers = []
+    self.running = 0
+    self.most_running = 0
+
+  async def handle(self, request):
+    self.peers.append(request.transport.get_extra_info('peername'))
+    self.running += 1
+    self.most_running = max(self.most_running, self.running)
+    try:
+      await asyncio.sleep(self.delay)
+    finally:
+      self.running -= 1
+    return web.Response(text=request.headers['User-Agent'])
+
+  async def __aenter__(self):
+    app = web.Application()
+    app.router.add_get('/{name}', self.handle)
+    self.server = TestServer(app)
+    await self.server.start_server()
+    return self
+
+  async def __aexit__(self, *exc):
+    await self.server.close()
+
+  def url(self, name='quote'):
+    return str(self.server.make_url('/' + name))
+
+class SessionPoolTest(unittest.TestCase):
+
+  def setUp(self):
+    self.pool = SessionPool(['agent-1', 'agent-2'])
+
+  def test_session_and_connection_should_be_reused_for_host(self):
+    async def scenario():
+      async with _Upstream() as upstream:
+        session = await self.pool.session()
+        agents = []
+        for name in ('quote', 'analysis', 'quote'):
+          self.assertIs(await self.pool.session(), session)
+          async with session.get(upstream.url(name)) as response:
+            agents.append(await response.text())
+        await self.pool.close()
+        return upstream.peers, agents
+
+    peers, agents = asyncio.run(scenario())
+    self.assertEqual(len(set(peers)), 1)
+    self.assertEqual(len(set(agents)), 1)
+    self.assertIn(agents[0], ('agent-1', 'agent-2'))
+
+  def test_limit_per_host_should_bound_concurrent_connections(self):
+    self.pool.limit_per_host = 2
+
+    async def scenario():
+      async with _Upstream(delay=0.05) as upstream:
+        session = await self.pool.session()
+
+        async def get():
+          async with session.get(upstream.url()) as response:
+            return response.status
+
+        statuses = await asyncio.gather(*(get() for _ in range(6)))
+        await self.pool.close()
+        return statuses, upstream
+
+    statuses, upstream = asyncio.run(scenario())
+    self.assertEqual(statuses, [200] * 6)
+    self.assertEqual(upstream.most_running, 2)
+    self.assertEqual(len(set(upstream.peers)), 2)
+
+  def test_close_should_close_session_and_its_connections(self):
+    async def scenario():
+      async with _Upstream() as upstream:
+        session = await self.pool.session()
+        async with session.get(upstream.url()) as response:
+          await response.read()
+        connector = session.connector
+        await self.pool.close()
+        await self.pool.close()
+        replacement = await self.pool.session()
+        await self.pool.close()
+        return session, connector, replacement
+
+    session, connector, replacement = asyncio.run(scenario())
+    self.assertTrue(session.closed)
+    self.assertTrue(connector.closed)
+    self.assertIsNot(replacement, session)
+    self.assertTrue(replacement.closed)
+    self.assertEqual(self.pool._sessions, {})
+
+  def test_every_loop_should_get_and_close_its_own_session(self):
+    async def open_and_close():
+      session = await self.pool.session()
+      await self.pool.close()
+      return session
+
+    first, second = asyncio.run(open_and_close()), asyncio.run(open_and_close())
+    self.assertIsNot(first, second)
+    self.assertTrue(first.closed and second.closed)
+    self.assertEqual(self.pool._sessions, {})
+
+if __name__ == '__main__':
+  unittest.main()
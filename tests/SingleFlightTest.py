@@ -0,0 +1,106 @@
+"""Tests for the flaskr/source/flight.py SingleFlight."""
+
+
+import asyncio
+import os
+import sys
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.flight import SingleFlight
+
+class _Work:
+  def __init__(self, result='done', error=None):
+    self.result = result
+    self.error = error
+    self.calls = 0
+    self.release = asyncio.Event()
+    self.cancelled = False
+
+  async def __call__(self):
+    self.calls += 1
+    try:
+      await self.release.wait()
+    except asyncio.CancelledError:
+      self.cancelled = True
+      raise
+    if self.error is not None:
+      raise self.error
+    return self.result
+
+class SingleFlightTest(unittest.TestCase):
+
+  def setUp(self):
+    self.flights = SingleFlight()
+
+  def test_concurrent_callers_should_share_one_call(self):
+    async def scenario():
+      work = _Work()
+      callers = [asyncio.ensure_future(self.flights.run('AAPL', work)) for _ in range(5)]
+      await asyncio.sleep(0)
+      work.release.set()
+      return work, await asyncio.gather(*callers)
+
+    work, results = asyncio.run(scenario())
+    self.assertEqual(work.calls, 1)
+    self.assertEqual(results, ['done'] * 5)
+    self.assertEqual(self.flights.stats(), {'in_flight': 0, 'leaders': 1, 'followers': 4})
+
+  def test_exception_should_be_raised_to_every_waiter(self):
+    async def scenario():
+      work = _Work(error=ValueError('upstream failed'))
+      callers = [asyncio.ensure_future(self.flights.run('AAPL', work)) for _ in range(3)]
+      await asyncio.sleep(0)
+      work.release.set()
+      return await asyncio.gather(*callers, return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    self.assertEqual([type(error) for error in errors], [ValueError] * 3)
+
+  def test_cancelled_waiter_should_not_cancel_call_of_others(self):
+    async def scenario():
+      work = _Work()
+      first = asyncio.ensure_future(self.flights.run('AAPL', work))
+      second = asyncio.ensure_future(self.flights.run('AAPL', work))
+      await asyncio.sleep(0)
+      first.cancel()
+      await asyncio.sleep(0)
+      work.release.set()
+      return work, first, await second
+
+    work, first, result = asyncio.run(scenario())
+    self.assertTrue(first.cancelled())
+    self.assertFalse(work.cancelled)
+    self.assertEqual(result, 'done')
+
+  def test_call_should_be_cancelled_when_last_waiter_is(self):
+    async def scenario():
+      work = _Work()
+      caller = asyncio.ensure_future(self.flights.run('AAPL', work))
+      await asyncio.sleep(0)
+      caller.cancel()
+      await asyncio.sleep(0.01)
+      return work
+
+    self.assertTrue(asyncio.run(scenario()).cancelled)
+    self.assertEqual(len(self.flights), 0)
+
+  def test_key_should_be_released_after_call_finishes_or_fails(self):
+    async def scenario():
+      failing = _Work(error=ValueError('upstream failed'))
+      failing.release.set()
+      with self.assertRaises(ValueError):
+        await self.flights.run('AAPL', failing)
+      self.assertEqual(len(self.flights), 0)
+      succeeding = _Work('again')
+      succeeding.release.set()
+      result = await self.flights.run('AAPL', succeeding)
+      self.assertEqual(len(self.flights), 0)
+      return failing.calls, succeeding.calls, result
+
+    self.assertEqual(asyncio.run(scenario()), (1, 1, 'again'))
+
+if __name__ == '__main__':
+  unittest.main()
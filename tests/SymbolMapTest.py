@@ -0,0 +1,52 @@
+"""Tests for the flaskr/source/store.py SymbolMap."""
+
+
+import os
+import sys
+import tempfile
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.store import PayloadStore, SymbolMap
+
+class SymbolMapTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, 'payloads.sqlite3')
+    self.store = PayloadStore(self.path)
+
+  def tearDown(self):
+    self.store.close()
+    self.directory.cleanup()
+
+  def test_get_should_return_unknown_for_missing_symbol(self):
+    ids = SymbolMap(self.store, 'test')
+    self.assertIs(ids.get('AAPL'), SymbolMap.UNKNOWN)
+
+  def test_values_should_persist_across_instances(self):
+    SymbolMap(self.store, 'test').put('aapl', 'a1xzim')
+    self.store.close()
+    ids = SymbolMap(PayloadStore(self.path), 'test')
+    self.assertEqual(ids.get('AAPL'), 'a1xzim')
+    self.assertIs(SymbolMap(PayloadStore(self.path), 'other').get('AAPL'), SymbolMap.UNKNOWN)
+
+  def test_negative_results_should_use_negative_ttl(self):
+    ids = SymbolMap(self.store, 'test', negative_ttl=0)
+    ids.put('NOPE', None)
+    ids.put('AAPL', 'a1xzim')
+    self.assertIs(ids.get('NOPE'), SymbolMap.UNKNOWN)
+    self.assertEqual(ids.get('AAPL'), 'a1xzim')
+    ids = SymbolMap(self.store, 'test')
+    self.assertIsNone(ids.get('NOPE'))
+
+  def test_seed_file_should_be_loaded_on_first_use(self):
+    seed = os.path.join(self.directory.name, 'ids.csv')
+    with open(seed, 'w') as file:
+      file.write('# symbol,id\nAAPL,a1xzim\nNOPE,\n')
+    ids = SymbolMap(self.store, 'test', seed_path=seed)
+    self.assertEqual(ids.get('aapl'), 'a1xzim')
+    self.assertIsNone(ids.get('NOPE'))
+    self.assertEqual(ids.load(seed), 2)
@@ -0,0 +1,69 @@
+"""Tests for the flaskr/source/universe.py SymbolUniverse."""
+
+
+import os
+import sys
+import tempfile
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+import flaskr.source as source
+from flaskr.source.universe import SymbolUniverse, read_listing
+
+_NASDAQ_LISTING = """Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares
+AAPL|Apple Inc. - Common Stock|Q|N|N|100|N|N
+AAL|American Airlines Group, Inc. - Common Stock|Q|N|N|100|N|N
+ZAZZT|Tick Pilot Test Stock|G|Y|N|100|N|N
+A|Agilent Technologies, Inc. Common Stock|Q|N|N|100|N|N
+File Creation Time: 1018202608:31|||||||
+"""
+
+class SymbolUniverseTest(unittest.TestCase):
+
+  def setUp(self):
+    file = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+    file.write(_NASDAQ_LISTING)
+    file.close()
+    self.path = file.name
+    self.addCleanup(os.remove, self.path)
+
+  def test_read_listing_should_skip_test_issues_and_footer(self):
+    listing = read_listing(self.path)
+    self.assertEqual([symbol for symbol, _ in listing], ['AAPL', 'AAL', 'A'])
+    self.assertEqual(listing[0][1], 'Apple Inc. - Common Stock')
+    self.assertEqual(read_listing(self.path + '.missing'), [])
+
+  def test_suggest_should_give_symbols_with_prefix_in_order(self):
+    universe = SymbolUniverse([self.path])
+    self.assertEqual(len(universe), 3)
+    self.assertEqual([s for s, _ in universe.suggest('a')], ['A', 'AAL', 'AAPL'])
+    self.assertEqual([s for s, _ in universe.suggest('AA', limit=1)], ['AAL'])
+    self.assertEqual(universe.suggest('B'), [])
+    self.assertEqual(universe.suggest(''), [])
+
+  def test_membership_should_accept_both_class_separators(self):
+    universe = SymbolUniverse()
+    universe.load([('BRK.B', 'Berkshire Hathaway'), ('AAPL', 'Apple')])
+    self.assertIn('aapl', universe)
+    self.assertIn('BRK-B', universe)
+    self.assertNotIn('MSFT', universe)
+
+  def test_universe_without_listing_should_know_every_symbol(self):
+    universe = SymbolUniverse()
+    self.assertFalse(universe.loaded)
+    self.assertIn('ANY', universe)
+
+  def test_check_should_reject_bad_syntax_and_unlisted_symbols(self):
+    self.assertFalse(source.check('BAD1'))
+    self.assertFalse(source.check('TOOLONG'))
+    self.assertTrue(source.check('MSFT'))
+    universe = source.universe
+    self.addCleanup(setattr, source, 'universe', universe)
+    source.universe = SymbolUniverse([self.path])
+    self.assertTrue(source.check('AAPL'))
+    self.assertFalse(source.check('MSFT'))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,36 @@
+"""Tests for the /_ah/warmup handler of main.py."""
+
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+os.environ.setdefault("CACHE_WARMER", "0")
+
+import flaskr.runner as runner
+import flaskr.source as source
+import main
+
+class WarmupTest(unittest.TestCase):
+
+  def setUp(self):
+    self.client = main.app.test_client()
+
+  def test_warmup_should_report_every_phase(self):
+    with mock.patch.object(source, 'UPSTREAM_URLS', ()), mock.patch.dict(os.environ, {'WARMUP_TICKERS': ''}):
+      response = self.client.get('/_ah/warmup')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(list(response.json), ['previews', 'templates', 'sources', 'connections', 'tickers'])
+    self.assertTrue(all(phase['seconds'] >= 0 for phase in response.json.values()))
+    self.assertGreater(response.json['templates']['result'], 0)
+    self.assertEqual(response.json['tickers']['result'], {})
+
+  def test_prefetch_should_skip_invalid_symbols(self):
+    self.assertEqual(runner.run(source.prefetch(['$$$', 'TOO-LONG'])), {})
+
+if __name__ == '__main__':
+  unittest.main()
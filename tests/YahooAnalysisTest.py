@@ -0,0 +1,67 @@
+"""Tests for the flaskr/source/sources/YahooAnalysis.py GrowthRateScanner, and fallback to parsing whole page."""
+
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+app_path = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(app_path)
+
+from flaskr.source.elements import Scanner
+from flaskr.source.sources.YahooAnalysis import GrowthRateScanner, YahooAnalysis
+from flaskr.source.store import PayloadStore
+
+_PAGE = (b'<html><body>' + b'<div class="filler">Earnings estimate</div>' * 20 +
+         b'<table><tr><td>Current Year</td><td>8.40%</td></tr>'
+         b'<tr><td>Next 5 Years (per annum)</td><td><span>12.35%</span></td></tr></table></body></html>')
+
+def _scan(page, size):
+  scanner = GrowthRateScanner()
+  for start in range(0, len(page), size):
+    value = scanner.feed(page[start:start + size])
+    if value is not None:
+      return value
+  return None
+
+class YahooAnalysisTest(unittest.TestCase):
+
+  def test_scanner_should_find_growth_rate_in_whole_page(self):
+    self.assertEqual(_scan(_PAGE, len(_PAGE)), '12.35')
+
+  def test_scanner_should_find_growth_rate_split_between_chunks(self):
+    marker = _PAGE.index(b'Next 5 Years')
+    number = _PAGE.index(b'12.35')
+    for size in (1, 2, 3, 7, 13, 32, 64, 100):
+      self.assertEqual(_scan(_PAGE, size), '12.35', size)
+    for cut in range(marker - 1, number + 5):  # Two chunks, split inside the marker and the number
+      scanner = GrowthRateScanner()
+      self.assertIsNone(scanner.feed(_PAGE[:cut]), cut)
+      self.assertEqual(scanner.feed(_PAGE[cut:]), '12.35', cut)
+
+  def test_scanner_should_not_take_percentage_before_marker(self):
+    self.assertIsNone(_scan(_PAGE.replace(b'Next 5 Years', b'Past 5 Years'), 7))
+
+  def test_scanner_without_feed_should_not_be_created(self):
+    class Incomplete(Scanner):
+      pass
+    with self.assertRaises(TypeError):
+      Incomplete()
+
+  def test_fetch_should_parse_whole_page_when_scanner_finds_nothing(self):
+    page = _PAGE.replace(b'(per annum)', b'&#40;per annum&#41;')  # Entities hide marker from scanner, not from lxml
+    self.assertIsNone(_scan(page, len(page)))
+    with tempfile.TemporaryDirectory() as directory:
+      store = PayloadStore(os.path.join(directory, 'payloads.sqlite3'))
+      store.put('YahooAnalysis', 'https://finance.yahoo.com/quote/AAPL/analysis?p=AAPL', 'AAPL', 200, 'OK', page)
+      source = YahooAnalysis('AAPL')
+      source.store = store
+      asyncio.run(source.fetch())
+      store.close()
+    self.assertIsNone(source.error)
+    self.assertEqual(source.data.five_year_growth_rate, '12.35')
+
+if __name__ == '__main__':
+  unittest.main()